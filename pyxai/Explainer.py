@@ -22,7 +22,7 @@ from pyxai.sources.core.structure.boostedTrees import BoostedTrees
 from pyxai.sources.core.structure.boostedTrees import BoostedTreesRegression
 from pyxai.sources.core.structure.decisionTree import DecisionTree
 from pyxai.sources.core.structure.randomForest import RandomForest
-from pyxai.sources.core.structure.type import TypeReason, TypeStatus, ReasonExpressivity, PreferredReasonMethod, TypeTheory
+from pyxai.sources.core.structure.type import TypeReason, TypeStatus, ReasonExpressivity, PreferredReasonMethod, TypeTheory, TheoryEncoding
 
 def show():
     from pyxai.sources.core.tools.GUIQT import GraphicalInterface
@@ -41,13 +41,14 @@ def boosted_trees(model, instance=None):
     return ExplainerBT(model, instance)
 
 
-def initialize(model, instance=None, features_type=None):
+def initialize(model, instance=None, features_type=None, theory_encoding=None):
     """Return and initialize an explainer according to a model and optionally an instance.
 
     Args:
         model (BoostedTrees, RandomForest, DecisionTree): A model.
         instance (:obj:`list` of :obj:`int`, optional): The instance (an observation) on which explanations must be calculated. Defaults to None.
         features_type (:obj:`dict` containing the keys `numerical`, `categorical` and `binary` | `String`, optional) Either a dict where each key contains a list (["Method*", "CouncilArea*", "Regionname*"]) or a .types file. 
+        theory_encoding (TheoryEncoding, optional): The encoding of the one hot encoded categorical features in the theory (see the set_theory_encoding method). Defaults to PAIRWISE.
     Returns:
         ExplainerDT|ExplainerRF|ExplainerBT: The explainer according to ``model``.
     """
@@ -62,6 +63,8 @@ def initialize(model, instance=None, features_type=None):
         explainer = ExplainerBT(model, instance)
     if isinstance(model, BoostedTreesRegression):
         explainer = ExplainerRegressionBT(model, instance)
+    if theory_encoding is not None:
+        explainer.set_theory_encoding(theory_encoding)
     if features_type is not None:
         explainer.set_features_type(features_type)
 
@@ -96,5 +99,10 @@ WORD_FREQUENCY = PreferredReasonMethod.WordFrequency
 WORD_FREQUENCY_LAYERS = PreferredReasonMethod.WordFrequencyLayers
 INCLUSION_PREFERRED = PreferredReasonMethod.InclusionPreferred
 
+PAIRWISE = TheoryEncoding.PAIRWISE
+SEQUENTIAL_COUNTER = TheoryEncoding.SEQUENTIAL_COUNTER
+LADDER = TheoryEncoding.LADDER
+BITWISE = TheoryEncoding.BITWISE
+
 TIMEOUT = Explainer.TIMEOUT
 
@@ -3,6 +3,7 @@ from operator import index
 from typing import Iterable
 
 from pyxai.sources.core.structure.type import EvaluationMethod, EvaluationOutput, Indexes, SaveFormat, TypeFeature, TypeClassification, MethodToBinaryClassification, TypeEncoder, LearnerType
+from pyxai.sources.core.structure.modelFile import ModelFile
 from pyxai.sources.learning.learner import LearnerInformation, Learner, NoneData
 from pyxai.sources.learning.generic import Generic
 from pyxai.sources.learning.scikitlearn import Scikitlearn
@@ -116,19 +117,23 @@ def import_models(models, feature_names=None):
 
 def load(models_directory, *,tests=False, dataset=NoneData):
     learner = Learner(learner_type=CLASSIFICATION)
-    files = learner.load_get_files(models_directory)
+    native_files = Learner.native_model_files(models_directory)
+    if len(native_files) != 0:
+        # Models saved with learner.save(..., native=True)
+        datas = [ModelFile(native_file).metadata for native_file in native_files]
+    else:
+        datas = []
+        for _, map_file in learner.load_get_files(models_directory):
+            with open(map_file) as f:
+                datas.append(json.loads(json.load(f)))
     learner_names = []
     learner_types = []
     evaluation_outputs = []
 
-    for _, model in enumerate(files):
-        _, map_file = model
-        f = open(map_file)
-        data = json.loads(json.load(f))
+    for data in datas:
         learner_names.append(data['learner_name'])
         learner_types.append(data['learner_type'])
         evaluation_outputs.append(data['evaluation_output'])
-        f.close()
     
     if not all(learner_name == learner_names[-1] for learner_name in learner_names):
         raise ValueError("All learners must have the same learner name.")
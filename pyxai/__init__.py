@@ -5,9 +5,6 @@ import pyxai
 import platform
 import subprocess
 import unittest
-import matplotlib
-
-matplotlib.set_loglevel("critical") #To win a lot of times. 
 
 from pyxai.sources.core.tools.option import Options
 from pyxai.sources.core.tools.utils import set_verbose, check_PyQt6
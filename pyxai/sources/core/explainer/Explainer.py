@@ -1,16 +1,92 @@
+import copy
+import functools
+import itertools
 import random
+import time
 import json
+import os
+from concurrent.futures import ProcessPoolExecutor
 from typing import Iterable
-from collections import OrderedDict
+from collections import OrderedDict, deque
 
+import numpy
+
+from pyxai.sources.core.explainer.explanationCache import ExplanationCache
+from pyxai.sources.core.structure.literalSet import LiteralSet
 from pyxai.sources.core.tools.utils import count_dimensions, check_PyQt6
-from pyxai.sources.core.structure.type import TypeTheory, TypeFeature, OperatorCondition
+from pyxai.sources.core.structure.type import TheoryEncoding, TypeTheory, TypeFeature, OperatorCondition
 from pyxai import Tools
 from pyxai.sources.solvers.SAT.glucoseSolver import GlucoseSolver
 
 
+# The explainer held by each worker process of Explainer.explain_batch.
+_batch_explainer = None
+_batch_method = None
+_batch_options = None
+
+
+def _init_batch_worker(explainer, method, options):
+    global _batch_explainer, _batch_method, _batch_options
+    _batch_explainer = explainer
+    _batch_explainer._do_history = False
+    _batch_method = method
+    _batch_options = options
+
+
+def _explain_batch_instance(instance):
+    _batch_explainer.set_instance(instance)
+    return getattr(_batch_explainer, _batch_method)(**_batch_options)
+
+
+def _explain_batch_chunk(instances):
+    return [_explain_batch_instance(instance) for instance in instances]
+
+
+def cached_explanation(method=None, *, instance=False):
+    """
+    Decorator of the explanation methods: when a cache is activated (see Explainer.activate_cache()), an explanation already computed for
+    the same model, binary representation, excluded literals, theory and parameters is taken from the cache (with its history entries).
+    The explanations reached with a timeout are not cached. The calls made inside an explanation method do not use the cache.
+
+    Use @cached_explanation(instance=True) for the methods that also depend on the values of the instance (e.g. weights computed from the
+    instance): the instance is then part of the key.
+    """
+    if method is None:
+        return functools.partial(cached_explanation, instance=instance)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self._cache is None or self._cache_depth != 0 or self._binary_representation is None:
+            return method(self, *args, **kwargs)
+        instance_key = tuple(self._instance) if instance is True and self._instance is not None else None
+        key = ExplanationCache.key(self.get_model().fingerprint(), self.__class__.__name__, method.__name__, tuple(self._binary_representation),
+                                   instance_key, tuple(self._excluded_literals), self._theory, self._cache_context(), args,
+                                   sorted(kwargs.items()))
+        history_key = (None if self._instance is None else tuple(self._instance), self.target_prediction)
+        found, value = self._cache.get(key)
+        if found:
+            reasons, history = value
+            self._elapsed_time = 0
+            if self._do_history is True and len(history) != 0:
+                self._history.setdefault(history_key, []).extend(history)
+            return reasons
+
+        n_history = len(self._history.get(history_key, []))
+        self._cache_depth += 1
+        try:
+            reasons = method(self, *args, **kwargs)
+        finally:
+            self._cache_depth -= 1
+        if self._elapsed_time != Explainer.TIMEOUT:
+            self._cache.put(key, (reasons, self._history.get(history_key, [])[n_history:]))
+        return reasons
+
+    return wrapper
+
+
 class Explainer:
     TIMEOUT = -1
+    _exact_is_reason = False  # True when is_reason() does not sample the extensions of the reason
 
 
     def __init__(self):
@@ -21,10 +97,29 @@ class Explainer:
         self._excluded_features = []
         self._instance = None
         self._theory = False
+        self._theory_encoding = TheoryEncoding.PAIRWISE  # see set_theory_encoding()
+        self._c_theory = None  # (C++ explainer, clauses) of the theory given to the C++ library, see _load_c_theory()
         self._categorical_features = []
         self._history = OrderedDict()
         self._do_history = True
         self._glucose = None
+        self._implicant_solvers = {}  # target_prediction -> ImplicantSolver, loaded once for all instances
+        self._reason_solvers = {}  # (target_prediction, theory) -> GlucoseSolver, see _is_reason_with_solver()
+        self._cache = None  # ExplanationCache, see activate_cache()
+        self._cache_depth = 0
+
+
+    def __getstate__(self):
+        # Solver handles (C++ capsules, SAT solvers) can not be pickled: they are rebuilt lazily by the explanation methods.
+        state = self.__dict__.copy()
+        for handle in ("_glucose", "c_RF", "c_BT"):
+            if handle in state:
+                state[handle] = None
+        state["_implicant_solvers"] = {}
+        state["_reason_solvers"] = {}
+        state["_c_theory"] = None
+        return state
+
 
     def get_PILImage(self, instance, reason, image=None, time_series=None, contrastive=False):
         feature_names = self.get_feature_names()
@@ -200,6 +295,90 @@ class Explainer:
         self.set_excluded_features(self._excluded_features)
 
 
+    def explain_batch(self, instances, *, method, n_jobs=1, chunksize=16, **method_options):
+        """
+        Computes an explanation for each instance of a batch, possibly using several processes.
+
+        Each worker process receives a copy of this explainer (model, features types, theory and excluded features) once, 
+        and builds its own solver handles. The explanations are yielded in the order of the instances, as soon as they are available.
+        At most 2 * n_jobs chunks of instances are sent to the workers and not yet yielded at the same time. With n_jobs=1, the
+        explanations are computed on a shallow copy of this explainer (that shares its solvers and its cache).
+        In both cases, the instance (and the interval, for regression) of this explainer does not change and the explanations computed
+        this way are not recorded in its history.
+
+        @param instances (Iterable[list[float]]): the instances to be explained.
+        @param method (str): the name of the explanation method to call (e.g. "sufficient_reason", "majoritary_reason").
+        @param n_jobs (int): the number of processes. None or -1 to use all the CPUs, 1 to compute the explanations in this process.
+        @param chunksize (int): the number of instances sent at once to a worker.
+        @param method_options: the parameters given to the explanation method.
+        @return: a generator of explanations, one for each instance.
+        """
+        if not callable(getattr(self, method, None)):
+            raise ValueError("The explainer has no method " + str(method) + ".")
+        if n_jobs is None or n_jobs == -1:
+            n_jobs = os.cpu_count()
+        if n_jobs < 1:
+            raise ValueError("The n_jobs parameter must be a positive integer, -1 or None.")
+        return self._explain_batch(instances, method, n_jobs, chunksize, method_options)
+
+
+    def _explain_batch(self, instances, method, n_jobs, chunksize, method_options):
+        if n_jobs == 1:
+            explainer = copy.copy(self)
+            explainer._do_history = False
+            for instance in instances:
+                explainer.set_instance(instance)
+                yield getattr(explainer, method)(**method_options)
+            return
+
+        instances = iter(instances)
+        pending = deque()  # The futures of the chunks sent to the workers, in the order of the instances
+        executor = ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_batch_worker, initargs=(self, method, method_options))
+        try:
+            while True:
+                chunk = list(itertools.islice(instances, chunksize))
+                if len(chunk) != 0:
+                    pending.append(executor.submit(_explain_batch_chunk, chunk))
+                if len(chunk) == 0 or len(pending) >= 2 * n_jobs:
+                    if len(pending) == 0:
+                        return
+                    yield from pending.popleft().result()
+        finally:
+            # The generator can be closed before the end: the chunks that are not started are cancelled
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+    def _compute_reason_batch(self, c_handle, instances, predictions, *, n_iterations, time_limit, seed, n_threads, intervals=None):
+        # Greedy reasons (see tree_specific_reason and majoritary_reason) computed by the C++ library for a batch of instances,
+        # with n_threads threads and without holding the GIL. intervals (regression) gives the (lower bound, upper bound) of each instance.
+        import c_explainer
+        if n_threads is None or n_threads == -1:
+            n_threads = os.cpu_count()
+        if n_threads < 1:
+            raise ValueError("The n_threads parameter must be a positive integer, -1 or None.")
+        model = self.get_model()
+        signs = model.instances_to_binaries(instances)
+        implicants = signs.astype(numpy.int64) * numpy.arange(1, signs.shape[1] + 1, dtype=numpy.int64)
+        predictions = numpy.ascontiguousarray(predictions, dtype=numpy.int64)
+        excluded_literals = self._excluded_literals
+        if len(excluded_literals) == 0 and len(self._excluded_features) != 0:
+            # No instance is set: the excluded literals are not computed yet (see set_excluded_features())
+            excluded_literals = [id_binary for id_binary in range(1, signs.shape[1] + 1)
+                                 if self.get_feature_names_from_literal(id_binary) in self._excluded_features]
+        excluded_variables = tuple(sorted(abs(lit) for lit in excluded_literals))
+        if intervals is not None:
+            intervals = numpy.ascontiguousarray(intervals, dtype=numpy.float64)
+        self._load_c_theory(c_handle)
+
+        time_used = -time.process_time()
+        reasons = c_explainer.compute_reason_batch(c_handle, implicants, predictions, excluded_variables, n_iterations,
+                                                   0 if time_limit is None else time_limit, -1 if seed is None else seed, n_threads,
+                                                   intervals)
+        time_used += time.process_time()
+        self._elapsed_time = time_used
+        return [Explainer.format(reason) for reason in reasons]
+
+
     def count_features_before_converting(self, features):
         c = set()
         for feature in features:
@@ -397,6 +576,23 @@ class Explainer:
         raise NotImplementedError
 
 
+    def _load_c_theory(self, c_handle):
+        # Give the theory of the model to a C++ explainer (no theory if it is deactivated) only when it changes: the C++ library builds
+        # its propagator once for all the instances, and the clauses are only computed again when the types of the features change
+        import c_explainer
+        clauses = self.get_model().theory_clauses(self._theory_encoding) if self._theory else ()
+        loaded = self._c_theory[1] if self._c_theory is not None and self._c_theory[0] is c_handle else ()
+        if clauses is not loaded and (len(clauses) != 0 or len(loaded) != 0):
+            c_explainer.set_theory(c_handle, clauses)
+        self._c_theory = (c_handle, clauses)
+
+
+    def _theory_clauses_for(self, clauses):
+        # The theory to add to clauses (with the encoding of the explainer): its auxiliary variables come after the variables of clauses
+        top_id = max((abs(lit) for clause in clauses for lit in clause), default=0)
+        return self.get_model().theory_clauses(self._theory_encoding, top_id)
+
+
     def activate_theory(self):
         """
         Add a theory in the resolution method.
@@ -412,6 +608,57 @@ class Explainer:
         self._theory = False
 
 
+    def set_theory_encoding(self, encoding):
+        """
+        Choose how the theory encodes that at most one of the features of a one hot encoded categorical feature is true: Explainer.PAIRWISE
+        (by default, one clause for each pair of features) or, for the features with many categories, a linear encoding with some auxiliary
+        variables: Explainer.SEQUENTIAL_COUNTER, Explainer.LADDER or Explainer.BITWISE. The encodings have the same solutions on the binary
+        variables: the reasons do not depend on it.
+
+        Args:
+            encoding (TheoryEncoding): the encoding.
+        """
+        if not isinstance(encoding, TheoryEncoding):
+            raise ValueError("The encoding must be Explainer.PAIRWISE, Explainer.SEQUENTIAL_COUNTER, Explainer.LADDER or Explainer.BITWISE.")
+        self._theory_encoding = encoding
+        # The solvers loaded with the theory
+        self._glucose = None
+        self._reason_solvers = {}
+
+
+    def activate_cache(self, *, maxsize=1024, directory=None):
+        """
+        Keep the explanations in a cache: an explanation is then computed only once for a model, a binary representation (different
+        instances can have the same one), the excluded features, the theory and the parameters of the explanation method.
+
+        @param maxsize (int | None): the maximal number of explanations kept in memory (the least recently used ones are removed first), None for no limit.
+        @param directory (str | None): a directory where the explanations are also saved, that can be shared by several processes.
+        """
+        self._cache = ExplanationCache(maxsize, directory)
+
+
+    def deactivate_cache(self):
+        """
+        Unset the cache set with the activate_cache method.
+        """
+        self._cache = None
+
+
+    @property
+    def cache(self):
+        """
+        The cache of explanations (None if the cache is not activated).
+        """
+        return self._cache
+
+
+    def _cache_context(self):
+        # The other parameters an explanation depends on.
+        if self._theory is False:
+            return ()
+        return tuple(getattr(self, "_numerical_features", ())), tuple(self._categorical_features), tuple(getattr(self, "_binary_features", ()))
+
+
     def get_feature_names_from_literal(self, literal):
         dict_to_features = self.to_features([literal], eliminate_redundant_features=False, details=True)
         return dict_to_features[tuple(dict_to_features.keys())[0]][0]["name"]
@@ -520,27 +767,59 @@ class Explainer:
             return reason
         if self._glucose is None:
             self._glucose = GlucoseSolver()
-            self._glucose.add_clauses(self.get_model().get_theory(self._binary_representation))
-        return self._glucose.propagate(reason)[1]
+            self._glucose.add_clauses(self.get_model().theory_clauses(self._theory_encoding))
+        # Without the auxiliary variables of the theory
+        return [lit for lit in self._glucose.propagate(reason)[1] if abs(lit) <= len(self._binary_representation)]
 
 
     def is_reason(self, reason, *, n_samples=1000):
         """
         Return if the reason given in parameter is really a reason. Since the process can be time consuming, one limits the
-        number of checks.
+        number of checks: n_samples complete binary representations extending the reason are randomly generated (and checked with the
+        IncrementalImplicant given by the _incremental_implicant() method of each explainer). The decision tree and random forest explainers
+        override this method with an exact check (see _exact_is_reason).
 
         @param reason: (list[float]) The reason to be tested.
         @param n_samples: (int) the number of tests to be done.
         @return: True if the reason is really one reason, False otherwise.
         """
 
+        incremental_implicant = None
         for _ in range(n_samples):
             binary_representation = self.extend_reason_to_complete_representation(reason)
-            if not self.is_implicant(binary_representation):
+            if incremental_implicant is None:
+                incremental_implicant = self._incremental_implicant(binary_representation)
+            else:
+                # Only the trees with a literal that differs from the previous sample are evaluated again
+                incremental_implicant.set_literals(binary_representation)
+            if not incremental_implicant.is_implicant():
                 return False
         return True
 
 
+    def _is_reason_with_solver(self, reason, *, time_limit=None):
+        """
+        Exact check with one SAT call: the reason is a reason iff it is inconsistent with the clauses of _not_target_clauses() (and with the
+        theory, if any). These clauses do not depend on the instance: the solver is loaded once for each target prediction and the reason is
+        given as assumptions.
+
+        Only for the explainers that define _not_target_clauses(), returning the clauses that are satisfiable iff the model does not predict
+        the target prediction (the variables greater than the number of binary variables being auxiliary ones): decision trees and random
+        forests.
+        """
+        key = (self.target_prediction, bool(self._theory))
+        solver = self._reason_solvers.get(key)
+        if solver is None:
+            solver = GlucoseSolver()
+            clauses = self._not_target_clauses()
+            solver.add_clauses(clauses)
+            if self._theory:
+                solver.add_clauses(self._theory_clauses_for(clauses))
+            self._reason_solvers[key] = solver
+        model, _ = solver.solve(time_limit=time_limit, assumptions=list(reason))
+        return model is None
+
+
     def is_sufficient_reason(self, reason, *, n_samples=50):
         """
         Checks if a reason is a sufficient one.
@@ -551,10 +830,17 @@ class Explainer:
         representation is not a reason and put back this literal. The method repeats this operation on every literal of the reason.
         Because this method is based on random generation and a limited number of samples, it is not deterministic (i.e., it is not 100% sure
         to provide the right answer). Therefore, this method can return True, False or None.
+        When is_reason is exact (decision trees and random forests), n_samples is not used and the answer is always True or False.
         @param reason: (list[int]) the reason to be checked.
         @param n_samples: (int) the number of samples done.
         @return: True if it is a ssuficient reason( w.r.t. the number of samples), False if not and None if it is not sure.
         """
+        if self._exact_is_reason:
+            if not self.is_reason(reason):
+                return False
+            # Minimal w.r.t. set inclusion: no literal can be removed
+            return all(not self.is_reason([other for other in reason if other != lit]) for lit in reason)
+
         if not self.is_reason(reason, n_samples=n_samples):
             return False  # We are sure it is not a reason
         tmp = list(reason)
@@ -582,10 +868,12 @@ class Explainer:
         @param reason: the reason to be checked.
         @return: True if it is a contrastive reason, False otherwise.
         """
-        copy_binary_representation = list(self._binary_representation).copy()
+        copy_binary_representation = LiteralSet(self._binary_representation)
         for lit in reason:
-            copy_binary_representation[copy_binary_representation.index(lit)] = -lit
-        return not self.is_implicant(copy_binary_representation)
+            if lit not in copy_binary_representation:
+                raise ValueError(str(lit) + " is not in the binary representation.")
+            copy_binary_representation.add(-lit)  # replaces lit
+        return not self.is_implicant(tuple(copy_binary_representation))
 
 
     def is_contrastive_reason_instance(self, reason):
@@ -612,17 +900,18 @@ class Explainer:
 
 
     def extend_reason_to_complete_representation(self, reason):
-        complete = list(reason).copy()
-        to_add = [literal for literal in self._binary_representation if literal not in complete and -literal not in complete]
-        complete = self.extend_reason_with_theory(complete)
+        reason = LiteralSet(reason, len(self._binary_representation))
+        to_add = [literal for literal in self._binary_representation if reason.sign(abs(literal)) == 0]
+        complete = LiteralSet(self.extend_reason_with_theory(list(reason)), len(self._binary_representation))
         for literal in to_add:
-            if literal in complete or -literal in complete: #This line is too costly: TODO: Create a map 
+            if complete.sign(abs(literal)) != 0:
                 continue
             sign = random.choice([1, -1])
-            complete.append(sign * abs(literal))
-            complete = self.extend_reason_with_theory(complete)
+            complete.add(sign * abs(literal))
+            if self._theory is not False:
+                complete = LiteralSet(self.extend_reason_with_theory(list(complete)), len(self._binary_representation))
         assert len(complete) == len(self._binary_representation)
-        return complete
+        return list(complete)
 
 
     @staticmethod
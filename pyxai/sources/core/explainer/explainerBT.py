@@ -1,16 +1,12 @@
 import random
 import time
 
-import c_explainer
-from pycsp3 import UNSAT, UNKNOWN
+import numpy
 
-from pyxai.sources.core.explainer.Explainer import Explainer
+from pyxai.sources.core.explainer.Explainer import Explainer, cached_explanation
+from pyxai.sources.core.structure.incrementalImplicant import IncrementalImplicantWeights
 from pyxai.sources.core.structure.type import ReasonExpressivity
 from pyxai.sources.core.tools.utils import flatten
-from pyxai.sources.solvers.CSP.AbductiveV1 import AbductiveModelV1
-from pyxai.sources.solvers.CSP.TSMinimalV2 import TSMinimal
-from pyxai.sources.solvers.GRAPH.TreeDecomposition import TreeDecomposition
-from pyxai.sources.solvers.MIP.ContrastiveBT import ContrastiveBT
 
 
 class ExplainerBT(Explainer):
@@ -39,32 +35,35 @@ class ExplainerBT(Explainer):
 
 
     def _theory_clauses(self):
+        # For the MIP solvers, that only know the binary variables: always without auxiliary variables (TheoryEncoding.PAIRWISE)
         return self._boosted_trees.get_theory(self._binary_representation)
 
 
     def is_implicant(self, abductive):
+        min_weights, max_weights = self._boosted_trees.weight_bounds(abductive)
+        return self._is_implicant_weights(min_weights.tolist(), max_weights.tolist())
 
+
+    def _is_implicant_weights(self, min_weights, max_weights):
+        # min_weights, max_weights: lists giving for each tree the minimum and maximum weights reachable by the implicant
         if self._boosted_trees.n_classes == 2:
-            # 2-classes case
-            sum_weights = []
-            for tree in self._boosted_trees.forest:
-                weights = self.compute_weights(tree, tree.root, abductive)
-                worst_weight = min(weights) if self.target_prediction == 1 else max(weights)
-                sum_weights.append(worst_weight)
-
-            sum_weights = sum(sum_weights)
+            # 2-classes case: the worst weights of all trees are summed
+            sum_weights = sum(min_weights if self.target_prediction == 1 else max_weights)
             prediction = 1 if sum_weights > 0 else 0
 
             return self.target_prediction == prediction
         else:
 
             # multi-classes case
-            worst_one = self.compute_weights_class(abductive, self.target_prediction, king="worst")
-            best_ones = [self.compute_weights_class(abductive, cl, king="best") for cl
-                         in self._boosted_trees.classes if cl != self.target_prediction]
+            worst_one = self._sum_weights_class(min_weights, self.target_prediction)
+            best_ones = [self._sum_weights_class(max_weights, cl) for cl in self._boosted_trees.classes if cl != self.target_prediction]
             return all(worst_one > best_one for best_one in best_ones)
 
 
+    def _incremental_implicant(self, implicant):
+        return IncrementalImplicantWeights(self._boosted_trees.compiled_forest, implicant, self._is_implicant_weights)
+
+
     def predict(self, instance):
         return self._boosted_trees.predict_instance(instance)
 
@@ -150,6 +149,7 @@ class ExplainerBT(Explainer):
         return self._boosted_trees.compute_probabilities(self._instance)
 
 
+    @cached_explanation
     def direct_reason(self):
         """The direct reason is the set of conditions used to classified the instance.
 
@@ -172,6 +172,7 @@ class ExplainerBT(Explainer):
         return reason
 
 
+    @cached_explanation
     def sufficient_reason(self, *, n=1, seed=0, time_limit=None):
         """ Compute a sufficient reason using several CSP thanks to pycsp3 models.
         Works only on binary instances for the moment
@@ -186,6 +187,8 @@ class ExplainerBT(Explainer):
         if self._boosted_trees.n_classes > 2:
             raise NotImplementedError
 
+        from pycsp3 import UNSAT, UNKNOWN
+        from pyxai.sources.solvers.CSP.AbductiveV1 import AbductiveModelV1
         cp_solver = AbductiveModelV1()
 
         abductive = list(self._binary_representation).copy()
@@ -210,10 +213,13 @@ class ExplainerBT(Explainer):
         return reasons
 
 
+    @cached_explanation
     def minimal_tree_specific_reason(self, *, time_limit=None, from_reason=None):
         if self._instance is None:
             raise ValueError("Instance is not set")
 
+        from pycsp3 import UNSAT, UNKNOWN
+        from pyxai.sources.solvers.CSP.TSMinimalV2 import TSMinimal
         cp_solver = TSMinimal()
         implicant_id_features = []  # TODO V2 self.implicant_id_features if reason_expressivity == ReasonExpressivity.Features else []
         cp_solver.create_model_minimal_abductive_BT(self._binary_representation, self._boosted_trees, self.target_prediction,
@@ -233,6 +239,7 @@ class ExplainerBT(Explainer):
         return result
 
 
+    @cached_explanation
     def tree_specific_reason(self, *, n_iterations=50, time_limit=None, seed=0, history=True):
         """
         Tree-specific (TS) explanations are abductive explanations that can be computed in polynomial time. While tree-specific explanations are not
@@ -259,20 +266,13 @@ class ExplainerBT(Explainer):
         if time_limit is None:
             time_limit = 0
 
-        if self.c_BT is None:
-            # Preprocessing to give all trees in the c++ library
-            self.c_BT = c_explainer.new_classifier_BT(self._boosted_trees.n_classes)
-
-            for tree in self._boosted_trees.forest:
-                c_explainer.add_tree(self.c_BT, tree.raw_data_for_CPP())
-
-        c_explainer.set_excluded(self.c_BT, tuple(self._excluded_literals))
-        if self._theory:
-            c_explainer.set_theory(self.c_BT, tuple(self._boosted_trees.get_theory(self._binary_representation)))
+        import c_explainer
+        self._initialize_c_BT()
+        self._load_c_theory(self.c_BT)
 
         reason = c_explainer.compute_reason(self.c_BT, self._binary_representation, self._implicant_id_features, self.target_prediction, n_iterations,
                                             time_limit,
-                                            int(reason_expressivity), seed)
+                                            int(reason_expressivity), seed, tuple(self._excluded_literals))
         if reason_expressivity == ReasonExpressivity.Features:
             reason = self.to_features_indexes(reason)
         reason = Explainer.format(reason)
@@ -281,10 +281,42 @@ class ExplainerBT(Explainer):
         return reason
 
 
+    def _initialize_c_BT(self):
+        if self.c_BT is None:
+            import c_explainer
+            # Preprocessing to give all trees in the c++ library
+            self.c_BT = c_explainer.new_classifier_BT(self._boosted_trees.n_classes)
+            c_explainer.add_trees(self.c_BT, *self._boosted_trees.raw_arrays_for_CPP())
+
+
+    def tree_specific_reason_batch(self, instances, *, n_iterations=50, time_limit=None, seed=0, n_threads=None):
+        """
+        Compute a tree-specific reason (see tree_specific_reason()) for each instance of a batch. The reasons are computed by the C++ library
+        with several threads (each one with its own copy of the trees) and without holding the GIL. The excluded features and the theory
+        are taken into account, the reasons are not recorded in the history.
+
+        Args:
+            instances (2-D array): the instances, one per line.
+            n_iterations (int, optional): the number of iterations for each instance. Defaults to 50.
+            time_limit (int, optional): the time limit for each instance. Defaults to None.
+            seed (int): the seed.
+            n_threads (int, optional): the number of threads, None or -1 to use all the CPUs. Defaults to None.
+        Returns:
+            list: The tree-specific reason of each instance (empty if the excluded features can not be removed).
+        """
+        instances = numpy.asarray(instances)
+        self._initialize_c_BT()
+        return self._compute_reason_batch(self.c_BT, instances, self._boosted_trees.predict_batch(instances), n_iterations=n_iterations,
+                                          time_limit=time_limit, seed=seed, n_threads=n_threads)
+
+
     def compute_weights_class(self, implicant, cls, king="worst"):
-        weights = [self.compute_weights(tree, tree.root, implicant) for tree in self._boosted_trees.forest if tree.target_class[0] == cls]
-        weights = [min(weights_per_tree) if king == "worst" else max(weights_per_tree) for weights_per_tree in weights]
-        return sum(weights)
+        min_weights, max_weights = self._boosted_trees.weight_bounds(implicant)
+        return self._sum_weights_class((min_weights if king == "worst" else max_weights).tolist(), cls)
+
+
+    def _sum_weights_class(self, weights, cls):
+        return sum(weights[i] for i, tree in enumerate(self._boosted_trees.forest) if tree.target_class[0] == cls)
 
 
     @staticmethod
@@ -328,6 +360,7 @@ class ExplainerBT(Explainer):
         """
         Compute the treewidth and the optimal tree decomposition.
         """
+        from pyxai.sources.solvers.GRAPH.TreeDecomposition import TreeDecomposition
         tree_decomposition_solver = TreeDecomposition()
         tree_decomposition_solver.create_instance(self._boosted_trees)
 
@@ -344,20 +377,23 @@ class ExplainerBT(Explainer):
 
         tmp = list(reason)
         random.shuffle(tmp)
+        incremental_implicant = self._incremental_implicant(reason)
         for lit in tmp:
-            copy_reason = list(reason).copy()
-            copy_reason.remove(lit)
-            if self.is_implicant(tuple(copy_reason)):
+            incremental_implicant.remove(lit)
+            if incremental_implicant.is_implicant():
                 return False
+            incremental_implicant.add(lit)
         return True
 
 
+    @cached_explanation
     def minimal_contrastive_reason(self, *, n=1, time_limit=None):
         if self._instance is None:
             raise ValueError("Instance is not set")
         if self._boosted_trees.n_classes > 2:
             raise NotImplementedError("Minimal contrastive reason is not implemented for the multi class case")
 
+        from pyxai.sources.solvers.MIP.ContrastiveBT import ContrastiveBT
         starting_time = -time.process_time()
         contrastive_bt = ContrastiveBT()
         c = contrastive_bt.create_model_and_solve(self, None if self._theory is False else self._theory_clauses(), self._excluded_literals, n, time_limit)
@@ -1,16 +1,20 @@
 import time
 
-from pyxai.sources.core.explainer.Explainer import Explainer
+from pyxai.sources.core.explainer.Explainer import Explainer, cached_explanation
+from pyxai.sources.core.structure.compiledTree import CompiledForest
 from pyxai.sources.core.structure.decisionTree import DecisionTree
+from pyxai.sources.core.structure.incrementalImplicant import IncrementalImplicantVotes
 from pyxai.sources.core.structure.type import PreferredReasonMethod
 from pyxai.sources.core.tools.encoding import CNFencoding
 from pyxai.sources.core.tools.utils import compute_weight
 from pyxai.sources.solvers.COMPILER.D4Solver import D4Solver
-from pyxai.sources.solvers.MAXSAT.OPENWBOSolver import OPENWBOSolver
-from pyxai.sources.solvers.SAT.glucoseSolver import GlucoseSolver
+from pyxai.sources.solvers.MAXSAT.RC2solver import RC2MAXSATsolver
+from pyxai.sources.solvers.SAT.implicantSolver import ImplicantSolver
 
 
 class ExplainerDT(Explainer):
+    _exact_is_reason = True
+
 
     def __init__(self, tree, instance=None):
         """Create object dedicated to finding explanations from a decision tree ``tree`` and an instance ``instance``.
@@ -43,6 +47,10 @@ class ExplainerDT(Explainer):
         return self._tree.is_implicant(binary_representation, self.target_prediction)
 
 
+    def _incremental_implicant(self, implicant):
+        return IncrementalImplicantVotes(CompiledForest([self._tree.compiled_tree]), implicant, self.target_prediction)
+
+
     def predict(self, instance):
         return self._tree.predict_instance(instance)
 
@@ -60,6 +68,7 @@ class ExplainerDT(Explainer):
                                       contrastive=contrastive, without_intervals=without_intervals, feature_names=self.get_feature_names())
 
 
+    @cached_explanation
     def direct_reason(self):
         """
         Returns:
@@ -79,6 +88,7 @@ class ExplainerDT(Explainer):
         return direct_reason
 
 
+    @cached_explanation
     def contrastive_reason(self, *, n=1):
         if self._instance is None:
             raise ValueError("Instance is not set")
@@ -121,34 +131,35 @@ class ExplainerDT(Explainer):
         return any(not self._is_specific(lit) for lit in prime_cnf.necessary)
 
 
+    @cached_explanation
     def sufficient_reason(self, *, n=1, time_limit=None):
         if self._instance is None:
             raise ValueError("Instance is not set")
         time_used = 0
         n = n if type(n) == int else float('inf')
-        cnf = self._tree.to_CNF(self._instance, target_prediction=self.target_prediction)
-        prime_implicant_cnf = CNFencoding.to_prime_implicant_CNF(cnf, self._binary_representation)
-
-        if self._excluded_features_are_necesssary(prime_implicant_cnf):
-            self._elapsed_time = 0
-            return []
-
-        SATsolver = GlucoseSolver()
-        SATsolver.add_clauses(prime_implicant_cnf.cnf)
-
-        # Remove excluded features
-        SATsolver.add_clauses([[-prime_implicant_cnf.from_original_to_new(lit)] for lit in self._excluded_literals])
+        # The prime implicant encoding of the tree is loaded once for each prediction, the instance and the excluded literals are given by assumptions.
+        solver = self._implicant_solvers.get(self.target_prediction)
+        if solver is None:
+            cnf = self._tree.to_CNF(self._instance, target_prediction=self.target_prediction)
+            solver = ImplicantSolver(cnf, len(self._binary_representation), prime=True)
+            self._implicant_solvers[self.target_prediction] = solver
+        solver.set_instance(self._binary_representation, self._excluded_literals)
 
         sufficient_reasons = []
         while True:
             if (time_limit is not None and time_used > time_limit) or len(sufficient_reasons) == n:
                 break
-            result, _time = SATsolver.solve(None if time_limit is None else time_limit - time_used)
+            result, _time = solver.solve(None if time_limit is None else time_limit - time_used)
             time_used += _time
             if result is None:
+                if len(sufficient_reasons) == 0 and len(self._excluded_literals) > 0:
+                    # Some excluded features are necessary
+                    self._elapsed_time = 0
+                    return []
                 break
-            sufficient_reasons.append(prime_implicant_cnf.get_reason_from_model(result))
-            SATsolver.add_clauses([prime_implicant_cnf.get_blocking_clause(result)])
+            sufficient_reason = solver.implicant(result)
+            sufficient_reasons.append(sufficient_reason)
+            solver.block_implicant(sufficient_reason)
         self._elapsed_time = time_used if (time_limit is None or time_used < time_limit) else Explainer.TIMEOUT
 
         reasons = Explainer.format(sufficient_reasons, n)
@@ -156,6 +167,7 @@ class ExplainerDT(Explainer):
         return reasons
 
 
+    @cached_explanation(instance=True)
     def preferred_sufficient_reason(self, *, method, n=1, time_limit=None, weights=None, features_partition=None):
         if self._instance is None:
             raise ValueError("Instance is not set")
@@ -190,7 +202,7 @@ class ExplainerDT(Explainer):
                 if self._tree.get_id_features([lit])[0] == i + 1:
                     weights_soft.append(weights[i])
 
-        solver = OPENWBOSolver()
+        solver = RC2MAXSATsolver()
 
         # Hard clauses
         solver.add_hard_clauses(cnf)
@@ -210,7 +222,10 @@ class ExplainerDT(Explainer):
         first_call = True
 
         while True:
-            status, model, _time = solver.solve(time_limit=0 if time_limit is None else time_limit - time_used)
+            status, model, _time = solver.solve(time_limit=None if time_limit is None else time_limit - time_used)
+            if status == "TIMEOUT":
+                time_used = time_limit
+                break
             time_used += _time
             if model is None:
                 break
@@ -239,6 +254,7 @@ class ExplainerDT(Explainer):
         return reasons
 
 
+    @cached_explanation
     def minimal_sufficient_reason(self, *, n=1, time_limit=None):
         return self.preferred_sufficient_reason(method=PreferredReasonMethod.Minimal, n=n, time_limit=time_limit)
 
@@ -290,8 +306,26 @@ class ExplainerDT(Explainer):
         return n_sufficients_per_attribute
 
 
-    def is_reason(self, reason, *, n_samples=-1):
-        return self._tree.is_implicant(reason, self.target_prediction)
+    def is_reason(self, reason, *, n_samples=None):
+        """
+        Exact check (n_samples is not used): without theory, one pass over the leaves of the tree that are compatible with the reason. With a
+        theory, one SAT call (see Explainer._is_reason_with_solver()), since a leaf compatible with the reason can be impossible.
+        """
+        if not self._theory:
+            return self._tree.is_implicant(reason, self.target_prediction)
+        return self._is_reason_with_solver(reason)
+
+
+    def _not_target_clauses(self):
+        # One selector variable (after the binary variables) for each path of the tree leading to another prediction
+        clauses = []
+        selectors = []
+        for clause in self._tree.to_CNF(self._instance, target_prediction=self.target_prediction):
+            selector = len(self._binary_representation) + len(selectors) + 1
+            clauses.extend([-selector, -lit] for lit in clause)
+            selectors.append(selector)
+        clauses.append(selectors)
+        return clauses
 
 
     @staticmethod
@@ -1,20 +1,23 @@
 import random
 import time
 
-import c_explainer
 import numpy
 
-from pyxai.sources.core.explainer.Explainer import Explainer
+from pyxai.sources.core.explainer.Explainer import Explainer, cached_explanation
+from pyxai.sources.core.structure.incrementalImplicant import IncrementalImplicantVotes
 from pyxai.sources.core.structure.type import Encoding, PreferredReasonMethod, TypeTheory, ReasonExpressivity
 from pyxai.sources.core.tools.encoding import CNFencoding
 from pyxai.sources.core.tools.utils import compute_weight
-from pyxai.sources.solvers.MAXSAT.OPENWBOSolver import OPENWBOSolver
-from pyxai.sources.solvers.MUS.MUSERSolver import MUSERSolver
+from pyxai.sources.solvers.MAXSAT.RC2solver import RC2MAXSATsolver
+from pyxai.sources.solvers.MUS.GlucoseMUSSolver import GlucoseMUSSolver
 from pyxai.sources.solvers.MUS.OPTUXSolver import OPTUXSolver
 from pyxai.sources.solvers.SAT.glucoseSolver import GlucoseSolver
+from pyxai.sources.solvers.SAT.implicantSolver import ImplicantSolver
 
 
 class ExplainerRF(Explainer):
+    _exact_is_reason = True
+
 
     def __init__(self, random_forest, instance=None):
         """Create object dedicated to finding explanations from a random forest ``random_forest`` and an instance ``instance``.
@@ -69,10 +72,16 @@ class ExplainerRF(Explainer):
         return self._random_forest.is_implicant(binary_representation, self.target_prediction)
 
 
+    def _incremental_implicant(self, implicant):
+        return IncrementalImplicantVotes(self._random_forest.compiled_forest, implicant, self.target_prediction, n_classes=self._random_forest.n_classes,
+                                         plurality=self._random_forest.n_classes > 2)
+
+
     def predict(self, instance):
         return self._random_forest.predict_instance(instance)
 
 
+    @cached_explanation
     def direct_reason(self):
         """The direct reason of an instance x is the term t of the implicant (binary form of the instance) corresponding to the unique root-to-leaf
         path of the tree that covers x. (see the Trading Complexity for Sparsity
@@ -108,6 +117,7 @@ class ExplainerRF(Explainer):
         return reason
 
 
+    @cached_explanation
     def minimal_contrastive_reason(self, *, n=1, time_limit=None):
         """Formally, a contrastive explanation for an instance x given f is a subset t of the characteristics of x that is minimal w.r.t. set
         inclusion among those such that at least one other instance x' that coincides with x except on the characteristics from t is not classified
@@ -146,7 +156,7 @@ class ExplainerRF(Explainer):
         max_id_binary_cnf = CNFencoding.compute_max_id_variable(tree_cnf)
         # print("max_id_variable:", max_id_binary_cnf)
 
-        MAXSATsolver = OPENWBOSolver()
+        MAXSATsolver = RC2MAXSATsolver()
         # print("Length of the binary representation:", len(self._binary_representation))
         # print("Number of hard clauses in the CNF encoding the random forest:", len(tree_cnf))
         MAXSATsolver.add_hard_clauses(tree_cnf)
@@ -158,7 +168,8 @@ class ExplainerRF(Explainer):
             theory_cnf, theory_new_variables = self._random_forest.get_theory(
                 self._binary_representation,
                 theory_type=TypeTheory.NEW_VARIABLES,
-                id_new_var=max_id_binary_cnf)
+                id_new_var=max_id_binary_cnf,
+                encoding=self._theory_encoding)
             theory_new_variables, map_is_represented_by_new_variables = theory_new_variables
             # print("Number of hard clauses in the theory:", len(theory_cnf))
             MAXSATsolver.add_hard_clauses(theory_cnf)
@@ -177,7 +188,10 @@ class ExplainerRF(Explainer):
         time_used = 0
         results = []
         while True:
-            status, reason, _time = MAXSATsolver.solve(time_limit=time_limit)
+            status, reason, _time = MAXSATsolver.solve(time_limit=None if time_limit == 0 else time_limit - time_used)
+            if status == "TIMEOUT":
+                time_used = time_limit
+                break
             time_used += _time
             if time_limit != 0 and time_used > time_limit:
                 break
@@ -213,6 +227,21 @@ class ExplainerRF(Explainer):
         return reasons
 
 
+    def _not_target_clauses(self):
+        if self._random_forest.n_classes == 2:
+            return self._random_forest.to_CNF(self._instance, self._binary_representation, self.target_prediction, tree_encoding=Encoding.MUS)
+        return self._random_forest.to_CNF_sufficient_reason_multi_classes(self._instance, self._binary_representation, self.target_prediction)
+
+
+    def is_reason(self, reason, *, n_samples=None):
+        """
+        Exact check with one SAT call (n_samples is not used): the reason is a reason iff it is inconsistent with the encoding of the forest
+        that does not predict the target prediction (see Explainer._is_reason_with_solver()).
+        """
+        return self._is_reason_with_solver(reason)
+
+
+    @cached_explanation
     def sufficient_reason(self, *, time_limit=None):
         """A sufficient reason (also known as prime implicant explanation) for an instance x given a class described by a Boolean function f is a
         subset t of the characteristics of x that is minimal w.r.t. set inclusion such that any instance x' sharing this set t of characteristics
@@ -225,14 +254,10 @@ class ExplainerRF(Explainer):
         if self._instance is None:
             raise ValueError("Instance is not set")
 
-        if self._random_forest.n_classes == 2:
-            hard_clauses = self._random_forest.to_CNF(self._instance, self._binary_representation, self.target_prediction, tree_encoding=Encoding.MUS)
-        else:
-            hard_clauses = self._random_forest.to_CNF_sufficient_reason_multi_classes(self._instance, self.binary_representation,
-                                                                                      self.target_prediction)
+        hard_clauses = self._not_target_clauses()
 
         if self._theory:
-            hard_clauses = hard_clauses + tuple(self._random_forest.get_theory(self._binary_representation))
+            hard_clauses = hard_clauses + self._theory_clauses_for(hard_clauses)
 
         # Check if excluded features produce a SAT problem => No sufficient reason
         if len(self._excluded_literals) > 0:
@@ -243,25 +268,16 @@ class ExplainerRF(Explainer):
             if result is not None:
                 return None
 
-        hard_clauses = list(hard_clauses)
-        soft_clauses = tuple((lit,) for lit in self._binary_representation if self._is_specific(lit))
-        mapping = [0 for _ in range(len(self._binary_representation) + 2)]
-        i = 2  # first good group for literals is 2 (1 is for the CNF representing the RF.
-        for lit in self._binary_representation:
-            if self._is_specific(lit):
-                mapping[i] = lit
-                i += 1
-        n_variables = CNFencoding.compute_n_variables(hard_clauses)
-        muser_solver = MUSERSolver()
-        muser_solver.write_gcnf(n_variables, hard_clauses, soft_clauses)
-        model, status, self._elapsed_time = muser_solver.solve(time_limit)
-        reason = [mapping[i] for i in model if i > 1]
+        mus_solver = GlucoseMUSSolver()
+        mus_solver.add_hard_clauses(hard_clauses)
+        reason, status, self._elapsed_time = mus_solver.solve([lit for lit in self._binary_representation if self._is_specific(lit)], time_limit)
 
         reason = Explainer.format(reason, 1)
         self.add_history(self._instance, self.__class__.__name__, self.sufficient_reason.__name__, reason)
         return reason
 
 
+    @cached_explanation
     def minimal_sufficient_reason(self, time_limit=None):
         """A sufficient reason (also known as prime implicant explanation) for an instance x given a class described by a Boolean function f is a
          subset t of the characteristics of x that is minimal w.r.t. set inclusion such that any instance x' sharing this set t of characteristics
@@ -278,15 +294,10 @@ class ExplainerRF(Explainer):
         if self._instance is None:
             raise ValueError("Instance is not set")
 
-        if self._random_forest.n_classes == 2:
-            hard_clauses = self._random_forest.to_CNF(self._instance, self._binary_representation, self.target_prediction, tree_encoding=Encoding.MUS)
-        else:
-            hard_clauses = self._random_forest.to_CNF_sufficient_reason_multi_classes(self._instance, self.binary_representation,
-                                                                                      self.target_prediction)
+        hard_clauses = self._not_target_clauses()
 
         if self._theory:
-            clauses_theory = self._random_forest.get_theory(self._binary_representation)
-            hard_clauses = hard_clauses + tuple(clauses_theory)
+            hard_clauses = hard_clauses + self._theory_clauses_for(hard_clauses)
 
         if len(self._excluded_literals) > 0:
             SATSolver = GlucoseSolver()
@@ -307,6 +318,7 @@ class ExplainerRF(Explainer):
         return reason
 
 
+    @cached_explanation
     def majoritary_reason(self, *, n=1, n_iterations=50, time_limit=None, seed=0):
         """Informally, a majoritary reason for classifying a instance x as positive by some random forest f
         is a prime implicant t of a majority of decision trees in f that covers x. (see the Trading Complexity for Sparsity
@@ -324,25 +336,15 @@ class ExplainerRF(Explainer):
         reason_expressivity = ReasonExpressivity.Conditions
         if seed is None: seed = -1
         if isinstance(n, int) and n == 1:
-            if self.c_RF is None:
-                # Preprocessing to give all trees in the c++ library
-                self.c_RF = c_explainer.new_classifier_RF(self._random_forest.n_classes)
-                for tree in self._random_forest.forest:
-                    try:
-                        c_explainer.add_tree(self.c_RF, tree.raw_data_for_CPP())
-                    except Exception as e:
-                        print("Erreur", str(e))
-                        exit(1)
-
+            import c_explainer
+            self._initialize_c_RF()
             if time_limit is None:
                 time_limit = 0
             implicant_id_features = ()  # FEATURES : TODO
-            c_explainer.set_excluded(self.c_RF, tuple(self._excluded_literals))
-            if self._theory:
-                c_explainer.set_theory(self.c_RF, tuple(self._random_forest.get_theory(self._binary_representation)))
+            self._load_c_theory(self.c_RF)
             current_time = time.process_time()
             reason = c_explainer.compute_reason(self.c_RF, self._binary_representation, implicant_id_features, self.target_prediction, n_iterations,
-                                                time_limit, int(reason_expressivity), seed)
+                                                time_limit, int(reason_expressivity), seed, tuple(self._excluded_literals))
             total_time = time.process_time() - current_time
             self._elapsed_time = total_time if time_limit == 0 or total_time < time_limit else Explainer.TIMEOUT
             if reason_expressivity == ReasonExpressivity.Features:
@@ -356,14 +358,13 @@ class ExplainerRF(Explainer):
             raise NotImplementedError("Theory and all majoritary is not yet implanted")
         n = n if type(n) == int else float('inf')
 
-        clauses = self._random_forest.to_CNF(self._instance, self._binary_representation, self.target_prediction, tree_encoding=Encoding.SIMPLE)
-        max_id_variable = CNFencoding.compute_max_id_variable(self._binary_representation)
-        solver = GlucoseSolver()
-
-        solver.add_clauses([[lit for lit in clause if lit in self._binary_representation or abs(lit) > max_id_variable] for clause in clauses])
-
-        if len(self._excluded_literals) > 0:
-            solver.add_clauses([-lit] for lit in self._excluded_literals)
+        # The solver is loaded once for each prediction, the instance and the excluded literals are given by assumptions.
+        solver = self._implicant_solvers.get(self.target_prediction)
+        if solver is None:
+            clauses = self._random_forest.to_CNF(self._instance, self._binary_representation, self.target_prediction, tree_encoding=Encoding.SIMPLE)
+            solver = ImplicantSolver(clauses, len(self._binary_representation))
+            self._implicant_solvers[self.target_prediction] = solver
+        solver.set_instance(self._binary_representation, self._excluded_literals)
 
         majoritaries = []
         time_used = 0
@@ -373,16 +374,43 @@ class ExplainerRF(Explainer):
             if result is None or (time_limit is not None and time_used > time_limit) or (time_limit is None and len(majoritaries) >= n):
                 break
 
-            majoritary = [lit for lit in result if lit in self._binary_representation]
+            majoritary = solver.implicant(result)
             if majoritary not in majoritaries:
                 majoritaries.append(majoritary)
-            solver.add_clauses([[-lit for lit in result if abs(lit) <= max_id_variable]])  # block this implicant
+            solver.block_model(result)  # block this implicant
         self._elapsed_time = time_used if (time_limit is None or time_used < time_limit) else Explainer.TIMEOUT
         reasons = Explainer.format(CNFencoding.remove_subsumed(majoritaries), n)
         self.add_history(self._instance, self.__class__.__name__, self.majoritary_reason.__name__, reasons)
         return reasons
 
 
+    def _initialize_c_RF(self):
+        if self.c_RF is None:
+            import c_explainer
+            # Preprocessing to give all trees in the c++ library
+            self.c_RF = c_explainer.new_classifier_RF(self._random_forest.n_classes)
+            c_explainer.add_trees(self.c_RF, *self._random_forest.raw_arrays_for_CPP())
+
+
+    def majoritary_reason_batch(self, instances, *, n_iterations=50, time_limit=None, seed=0, n_threads=None):
+        """Compute a majoritary reason (see majoritary_reason() with n=1) for each instance of a batch. The reasons are computed by the C++
+        library with several threads (each one with its own copy of the trees) and without holding the GIL. The excluded features and the
+        theory are taken into account, the reasons are not recorded in the history.
+
+        Args:
+            instances (2-D array): the instances, one per line.
+            n_iterations (int, optional): the number of iterations for each instance. Defaults to 50.
+            time_limit (int, optional): the time limit for each instance. None to have a infinite time. Defaults to None.
+            seed (int): the seed.
+            n_threads (int, optional): the number of threads, None or -1 to use all the CPUs. Defaults to None.
+        """
+        instances = numpy.asarray(instances)
+        self._initialize_c_RF()
+        return self._compute_reason_batch(self.c_RF, instances, self._random_forest.predict_batch(instances), n_iterations=n_iterations,
+                                          time_limit=time_limit, seed=seed, n_threads=n_threads)
+
+
+    @cached_explanation(instance=True)
     def preferred_majoritary_reason(self, *, method, n=1, time_limit=None, weights=None, features_partition=None):
         """This approach consists in exploiting a model, making precise her / his
         preferences about reasons, to derive only preferred reasons. See the On Preferred Abductive Explanations for Decision Trees and Random Forests
@@ -426,7 +454,7 @@ class ExplainerRF(Explainer):
         
         weights = compute_weight(method, self._instance, weights, self._random_forest.forest[0].learner_information,
                                  features_partition=features_partition)
-        solver = OPENWBOSolver()
+        solver = RC2MAXSATsolver()
         max_id_variable = CNFencoding.compute_max_id_variable(self._binary_representation)
         map_abs_implicant = [0 for _ in range(0, n_variables + 1)]
         for lit in self._binary_representation:
@@ -436,7 +464,7 @@ class ExplainerRF(Explainer):
             solver.add_hard_clause([lit for lit in c if abs(lit) > max_id_variable or map_abs_implicant[abs(lit)] == lit])
 
         if self._theory:
-            clauses_theory = self._random_forest.get_theory(self._binary_representation)
+            clauses_theory = self._theory_clauses_for(clauses)
             for c in clauses_theory:
                 solver.add_hard_clause(c)
 
@@ -457,6 +485,9 @@ class ExplainerRF(Explainer):
 
         while True:
             status, model, _time = solver.solve(time_limit=None if time_limit is None else time_limit - time_used)
+            if status == "TIMEOUT":
+                time_used = time_limit
+                break
             time_used += _time
             if model is None:
                 if first_call:
@@ -496,6 +527,7 @@ class ExplainerRF(Explainer):
         return reasons
 
 
+    @cached_explanation
     def minimal_majoritary_reason(self, *, n=1, time_limit=None):
         return self.preferred_majoritary_reason(method=PreferredReasonMethod.Minimal, n=n, time_limit=time_limit)
 
@@ -507,11 +539,12 @@ class ExplainerRF(Explainer):
         tmp = list(reason)
         random.shuffle(tmp)
         nb = 0
+        incremental_implicant = self._incremental_implicant(reason)
         for lit in tmp:
-            copy_reason = list(reason).copy()
-            copy_reason.remove(lit)
-            if self.is_implicant(tuple(copy_reason)):
+            incremental_implicant.remove(lit)
+            if incremental_implicant.is_implicant():
                 return False
+            incremental_implicant.add(lit)
             nb += 1
             if nb > n_samples:
                 break
@@ -1,9 +1,7 @@
-import c_explainer
-from pyxai.sources.core.explainer.Explainer import Explainer
+from pyxai.sources.core.explainer.Explainer import Explainer, cached_explanation
 from pyxai.sources.core.explainer.explainerBT import ExplainerBT
 from pyxai.sources.core.structure.type import ReasonExpressivity
-from pyxai.sources.solvers.MIP.SufficientRegressionBT import SufficientRegression
-from pyxai.sources.solvers.MIP.Range import Range
+import numpy
 import time
 
 
@@ -50,6 +48,10 @@ class ExplainerRegressionBT(ExplainerBT):
         self._upper_bound = upper_bound
 
 
+    def _cache_context(self):
+        return super()._cache_context() + (self._lower_bound, self._upper_bound)
+
+
     def predict(self, instance):
         return self._boosted_trees.predict_instance(instance)
 
@@ -60,6 +62,7 @@ class ExplainerRegressionBT(ExplainerBT):
                                                      )
 
 
+    @cached_explanation
     def tree_specific_reason(self, *, n_iterations=50, time_limit=None, seed=0):
         if self._instance is None:
             raise ValueError("Instance is not set")
@@ -72,27 +75,64 @@ class ExplainerRegressionBT(ExplainerBT):
         if time_limit is None:
             time_limit = 0
 
-        if self.c_BT is None:
-            # Preprocessing to give all trees in the c++ library
-            self.c_BT = c_explainer.new_regression_BT()
-            for tree in self._boosted_trees.forest:
-                c_explainer.add_tree(self.c_BT, tree.raw_data_for_CPP())
-            c_explainer.set_base_score(self.c_BT, self._boosted_trees.learner_information.extras["base_score"])
-        c_explainer.set_excluded(self.c_BT, tuple(self._excluded_literals))
-        if self._theory:
-            c_explainer.set_theory(self.c_BT, tuple(self._boosted_trees.get_theory(self._binary_representation)))
-        c_explainer.set_interval(self.c_BT, self._lower_bound, self._upper_bound)
-        # 0 for prediction. We don't care of it. The interval is the important thing here
+        import c_explainer
+        self._initialize_c_BT()
+        self._load_c_theory(self.c_BT)
+        # 0 for prediction. We don't care of it. The interval is the important thing here: it is given with the instance, so that another
+        # thread can not change it before the computation
         result = c_explainer.compute_reason(self.c_BT, self._binary_representation, self._implicant_id_features, 0, n_iterations,
                                           time_limit,
-                                          int(reason_expressivity), seed)
+                                          int(reason_expressivity), seed, tuple(self._excluded_literals),
+                                          (self._lower_bound, self._upper_bound))
         self.add_history(self._instance, self.__class__.__name__, self.tree_specific_reason.__name__, result)
         return result
 
+
+    def _initialize_c_BT(self):
+        if self.c_BT is None:
+            import c_explainer
+            # Preprocessing to give all trees in the c++ library
+            self.c_BT = c_explainer.new_regression_BT()
+            c_explainer.add_trees(self.c_BT, *self._boosted_trees.raw_arrays_for_CPP())
+            c_explainer.set_base_score(self.c_BT, self._boosted_trees.learner_information.extras["base_score"])
+
+
+    def tree_specific_reason_batch(self, instances, intervals=None, *, n_iterations=50, time_limit=None, seed=0, n_threads=None):
+        """
+        Compute a tree-specific reason (see tree_specific_reason()) for each instance of a batch, each instance having its own interval.
+        The reasons are computed by the C++ library with several threads and without holding the GIL. The excluded features and the theory
+        are taken into account, the reasons are not recorded in the history.
+
+        Args:
+            instances (2-D array): the instances, one per line.
+            intervals (2-D array, optional): the interval (lower bound, upper bound) of each instance, one per line. Defaults to None: the
+                prediction of each instance (as set_instance()).
+            n_iterations (int, optional): the number of iterations for each instance. Defaults to 50.
+            time_limit (int, optional): the time limit for each instance. Defaults to None.
+            seed (int): the seed.
+            n_threads (int, optional): the number of threads, None or -1 to use all the CPUs. Defaults to None.
+        Returns:
+            list: The tree-specific reason of each instance (empty if the excluded features can not be removed).
+        """
+        instances = numpy.asarray(instances)
+        if intervals is None:
+            predictions = self._boosted_trees.predict_batch(instances)
+            intervals = numpy.column_stack((predictions, predictions))
+        intervals = numpy.asarray(intervals, dtype=numpy.float64)
+        if intervals.shape != (len(instances), 2):
+            raise ValueError("The intervals parameter should give one interval (lower bound, upper bound) for each instance.")
+        self._initialize_c_BT()
+        # 0 for the predictions, the intervals are the important thing here
+        return self._compute_reason_batch(self.c_BT, instances, numpy.zeros(len(instances), dtype=numpy.int64), n_iterations=n_iterations,
+                                          time_limit=time_limit, seed=seed, n_threads=n_threads, intervals=intervals)
+
+
+    @cached_explanation
     def sufficient_reason(self, *, seed=0, time_limit=None):
         if self._instance is None:
             raise ValueError("Instance is not set")
 
+        from pyxai.sources.solvers.MIP.SufficientRegressionBT import SufficientRegression
         cplex = SufficientRegression()
         reason, time_used = cplex.create_model_and_solve(self, self._lower_bound, self._upper_bound)
         self._elapsed_time = time_used if time_limit is None or time_used < time_limit else Explainer.TIMEOUT
@@ -116,6 +156,7 @@ class ExplainerRegressionBT(ExplainerBT):
     Return a tuple (min_value, max_value)
     """
     def range_for_partial_instance(self, partial_instance, *, time_limit=None):
+        from pyxai.sources.solvers.MIP.Range import Range
         starting_time = -time.process_time()
         range = Range()
         partial = self._boosted_trees.instance_to_binaries(partial_instance)
@@ -128,13 +169,6 @@ class ExplainerRegressionBT(ExplainerBT):
 
 
 
-    def is_implicant(self, abductive):
-        min_weights = []
-        max_weights = []
+    def _is_implicant_weights(self, min_weights, max_weights):
         base_score = self.regression_boosted_trees.learner_information.extras["base_score"]
-
-        for tree in self._boosted_trees.forest:
-            weights = self.compute_weights(tree, tree.root, abductive)
-            min_weights.append(min(weights))
-            max_weights.append(max(weights))
         return base_score + sum(min_weights) >= self._lower_bound and base_score + sum(max_weights) <= self._upper_bound
@@ -0,0 +1,96 @@
+import hashlib
+import os
+import pickle
+import tempfile
+from collections import OrderedDict
+
+
+class ExplanationCache:
+    """
+    Least recently used cache of explanations, keyed by a hash of everything an explanation depends on (see Explainer.activate_cache).
+
+    The entries are kept in memory (at most maxsize entries, None for no limit). When a directory is given, each entry is also written in
+    its own file of this directory: the directory can be shared by several processes (the files are written atomically) and kept from
+    one session to the next.
+    """
+
+    EXTENSION = ".explanation"
+
+
+    def __init__(self, maxsize=1024, directory=None):
+        if maxsize is not None and maxsize < 1:
+            raise ValueError("The maxsize parameter must be a positive integer or None.")
+        self.maxsize = maxsize
+        self.directory = directory
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+
+    @staticmethod
+    def key(*parts):
+        return hashlib.sha256(pickle.dumps(parts, protocol=4)).hexdigest()
+
+
+    def __len__(self):
+        return len(self._entries)
+
+
+    def _filename(self, key):
+        return os.path.join(self.directory, key + ExplanationCache.EXTENSION)
+
+
+    def get(self, key):
+        """
+        Return a tuple (found, value).
+        """
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, self._entries[key]
+        if self.directory is not None:
+            try:
+                with open(self._filename(key), "rb") as file:
+                    value = pickle.load(file)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                pass
+            else:
+                self._store(key, value)
+                self.hits += 1
+                return True, value
+        self.misses += 1
+        return False, None
+
+
+    def put(self, key, value):
+        self._store(key, value)
+        if self.directory is not None:
+            descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(descriptor, "wb") as file:
+                pickle.dump(value, file, protocol=4)
+            os.replace(temporary, self._filename(key))
+
+
+    def _store(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if self.maxsize is not None and len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+    def clear(self):
+        """
+        Remove all the entries, including the files of the directory.
+        """
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+        if self.directory is not None:
+            for filename in os.listdir(self.directory):
+                if filename.endswith(ExplanationCache.EXTENSION):
+                    try:
+                        os.remove(os.path.join(self.directory, filename))
+                    except FileNotFoundError:
+                        pass
@@ -1,8 +1,17 @@
-from pyxai.sources.core.structure.type import OperatorCondition, TypeTheory
-from pyxai.sources.core.tools.encoding import CNFencoding
+from pyxai.sources.core.structure.type import OperatorCondition, TheoryEncoding, TypeTheory
 
 from numpy import argmax, argmin
+from pysat.card import CardEnc, EncType
 import collections
+import numpy
+from operator import eq, ge, gt, le, lt, ne
+
+# The comparison of each operator (value of the feature, threshold), see BinaryMapping.instance_to_binaries()
+COMPARISONS = {OperatorCondition.GE: ge, OperatorCondition.GT: gt, OperatorCondition.LE: le, OperatorCondition.LT: lt, OperatorCondition.EQ: eq,
+               OperatorCondition.NEQ: ne}
+
+CARDINALITY_ENCODINGS = {TheoryEncoding.SEQUENTIAL_COUNTER: EncType.seqcounter, TheoryEncoding.LADDER: EncType.ladder,
+                         TheoryEncoding.BITWISE: EncType.bitwise}
 
 
 class BinaryMapping():
@@ -20,6 +29,8 @@ class BinaryMapping():
         self.learner_information = learner_information
 
         self.n_redundant_features = 0  # Variable to store the number of redondances in eliminate_redundant_features()
+        self._binarizer = None  # Conditions grouped by (id_feature, operator), see _get_binarizer()
+        self._theory = None  # Parts of the theory computed for the types of the features, see _get_theory()
         self.feature_names = None
 
 
@@ -133,7 +144,17 @@ class BinaryMapping():
     """
 
 
-    def get_theory(self, binary_representation, *, theory_type=TypeTheory.SIMPLE, id_new_var=0):
+    def get_theory(self, binary_representation, *, theory_type=TypeTheory.SIMPLE, id_new_var=0, encoding=TheoryEncoding.PAIRWISE, top_id=None):
+        """
+        The clauses of the theory (see theory_clauses() for encoding and top_id). With TypeTheory.NEW_VARIABLES, a new variable (after
+        id_new_var) represents the literals of binary_representation of each numerical feature, and the auxiliary variables of the
+        categorical features come after the new variables.
+        """
+        if theory_type == TypeTheory.SIMPLE:
+            return list(self.theory_clauses(encoding, top_id))
+        if theory_type != TypeTheory.NEW_VARIABLES:
+            raise NotImplementedError
+
         # structure to help to do this method faster
         map_id_binary_sign = dict()
         map_is_represented_by_new_variables = dict()
@@ -143,49 +164,170 @@ class BinaryMapping():
 
         clauses = []
         new_variables = []
-
+        numerical_orders, one_hot_clauses, _ = self._get_theory(encoding)
         # For numerical features
-        for key in self.map_numerical_features.keys():
-            id_binaries = self.map_numerical_features[key]
-            conditions = [tuple(list(self.map_id_binaries_to_features[id]) + [id]) for id in id_binaries]
-            conditions = sorted(conditions, key=lambda t: t[2], reverse=True)
-            id_binaries_sorted = tuple(condition[3] for condition in conditions)
-
+        for id_binaries_sorted in numerical_orders:
             for i in range(len(id_binaries_sorted) - 1):  # To not takes the last
                 clauses.append((-id_binaries_sorted[i], id_binaries_sorted[i + 1]))
 
-            if theory_type == TypeTheory.NEW_VARIABLES:
-                id_new_var = id_new_var + 1
-                # associated_literals = []
-                for id_binary in id_binaries_sorted:
-                    clauses.append((-id_new_var, map_id_binary_sign[id_binary] * id_binary))
-                    map_is_represented_by_new_variables[id_binary] = True
-                    # associated_literals.append(map_id_binary_sign[id_binary]*id_binary)
-                new_variables.append(id_new_var)
+            id_new_var = id_new_var + 1
+            for id_binary in id_binaries_sorted:
+                clauses.append((-id_new_var, map_id_binary_sign[id_binary] * id_binary))
+                map_is_represented_by_new_variables[id_binary] = True
+            new_variables.append(id_new_var)
 
         # For categorical features that was one hot encoded
-        for key in self.map_categorical_features_one_hot.keys():
-            id_binaries = self.map_categorical_features_one_hot[key]
-            for i, id_1 in enumerate(id_binaries):
-                for j, id_2 in enumerate(id_binaries):
-                    if i != j:
-                        # we code a => not b that is equivalent to not a or not b (material implication)
-                        clauses.append((-id_1, -id_2))
+        clauses.extend(self._shift_auxiliary_variables(one_hot_clauses, encoding, max(id_new_var, 0 if top_id is None else top_id)))
+        return clauses, (new_variables, map_is_represented_by_new_variables)
 
-                        # For binary feature, nothing to do.
 
-        if theory_type == TypeTheory.SIMPLE:
+    def theory_clauses(self, encoding=TheoryEncoding.PAIRWISE, top_id=None):
+        """
+        Return the clauses of the theory (TypeTheory.SIMPLE, see get_theory()) as a tuple of clauses. They only depend on the model, the
+        types of the features and encoding: they are computed once, and the same tuple is returned until the types change (see
+        Explainer.set_features_type()), so an explainer gives them to the C++ library only when this tuple changes.
+
+        Args:
+            encoding (TheoryEncoding): the encoding of "at most one category" of the one hot encoded categorical features.
+            top_id (int, optional): the greatest variable already used by the clauses that the theory is added to: the auxiliary variables
+            of encoding are numbered after it. By default, after the binary variables.
+        """
+        return self._shift_auxiliary_variables(self._get_theory(encoding)[2], encoding, 0 if top_id is None else top_id)
+
+
+    def _shift_auxiliary_variables(self, clauses, encoding, top_id):
+        # The clauses with their auxiliary variables (greater than the binary variables) numbered after top_id
+        n_variables = len(self.map_id_binaries_to_features) - 1
+        shift = top_id - n_variables
+        if encoding == TheoryEncoding.PAIRWISE or shift <= 0:
             return clauses
-        elif theory_type == TypeTheory.NEW_VARIABLES:
-            return clauses, (new_variables, map_is_represented_by_new_variables)
-        else:
-            raise NotImplementedError
+        return tuple(tuple(lit if abs(lit) <= n_variables else (lit + shift if lit > 0 else lit - shift) for lit in clause) for clause in clauses)
+
+
+    def _get_theory(self, encoding):
+        # (the id_binaries of each numerical feature sorted by decreasing thresholds, the clauses of the one hot encoded categorical features,
+        # all the clauses of the simple theory), the auxiliary variables of encoding being after the binary variables. The orders are computed
+        # again when the types of the features change, the clauses for each encoding the first time they are needed.
+        types = (tuple((key, tuple(id_binaries)) for key, id_binaries in self.map_numerical_features.items()),
+                 tuple((key, tuple(id_binaries)) for key, id_binaries in self.map_categorical_features_one_hot.items()))
+        theory = getattr(self, "_theory", None)
+        if theory is None or theory[0] != types:
+            numerical_orders = []
+            for key in self.map_numerical_features.keys():
+                id_binaries = self.map_numerical_features[key]
+                conditions = [tuple(list(self.map_id_binaries_to_features[id]) + [id]) for id in id_binaries]
+                conditions = sorted(conditions, key=lambda t: t[2], reverse=True)
+                numerical_orders.append(tuple(condition[3] for condition in conditions))
+            theory = (types, tuple(numerical_orders), {})
+            self._theory = theory
+
+        _, numerical_orders, encoded_theories = theory
+        if encoding not in encoded_theories:
+            # For numerical features
+            clauses = []
+            for id_binaries_sorted in numerical_orders:
+                for i in range(len(id_binaries_sorted) - 1):  # To not takes the last
+                    clauses.append((-id_binaries_sorted[i], id_binaries_sorted[i + 1]))
+
+            # For categorical features that was one hot encoded: at most one of their binary variables is true
+            one_hot_clauses = []
+            top_id = len(self.map_id_binaries_to_features) - 1
+            for key in self.map_categorical_features_one_hot.keys():
+                id_binaries = self.map_categorical_features_one_hot[key]
+                if encoding == TheoryEncoding.PAIRWISE:
+                    for i, id_1 in enumerate(id_binaries):
+                        for id_2 in id_binaries[i + 1:]:
+                            # we code a => not b that is equivalent to not a or not b (material implication)
+                            one_hot_clauses.append((-id_1, -id_2))
+                elif len(id_binaries) > 1:
+                    cnf = CardEnc.atmost(lits=list(id_binaries), bound=1, top_id=top_id, encoding=CARDINALITY_ENCODINGS[encoding])
+                    one_hot_clauses.extend(tuple(clause) for clause in cnf.clauses)
+                    top_id = max(top_id, cnf.nv)
+            # For binary feature, nothing to do.
+            encoded_theories[encoding] = (tuple(one_hot_clauses), tuple(clauses + one_hot_clauses))
+        return (numerical_orders,) + encoded_theories[encoding]
 
 
     def compute_id_binaries(self):
         assert False, "Have to be implemented in a child class."
 
 
+    def _get_binarizer(self):
+        """
+        Return a tuple (groups, conditions). groups: the conditions grouped by (id_feature, operator), for each group (id_feature, operator,
+        sorted thresholds, id_binaries in the same order), see instances_to_binaries(). conditions: (index of the feature, comparison,
+        threshold, id_binary) for each condition, sorted by id_binary, see instance_to_binaries().
+        Both are rebuilt when the conditions of map_features_to_id_binaries or their id_binaries change.
+        """
+        key = tuple((condition, values[0]) for condition, values in self.map_features_to_id_binaries.items())
+        binarizer = getattr(self, "_binarizer", None)
+        if binarizer is not None and binarizer[0] == key:
+            return binarizer[1]
+        groups = collections.defaultdict(list)
+        for (id_feature, operator, threshold), id_binary in key:
+            groups[(id_feature, operator)].append((threshold, id_binary))
+        grouped_conditions = []
+        for (id_feature, operator), conditions in groups.items():
+            conditions.sort(key=lambda condition: condition[0])
+            thresholds = numpy.asarray([condition[0] for condition in conditions], dtype=numpy.float64)
+            id_binaries = numpy.asarray([condition[1] for condition in conditions], dtype=numpy.int64)
+            grouped_conditions.append((id_feature, operator, thresholds, id_binaries))
+        conditions = []
+        for (id_feature, operator, threshold), id_binary in sorted(key, key=lambda condition: condition[1]):
+            if operator not in COMPARISONS:
+                raise NotImplementedError("The operator " + str(operator) + " is not implemented.")
+            conditions.append((id_feature - 1, COMPARISONS[operator], threshold, id_binary))
+        self._binarizer = (key, (grouped_conditions, conditions))
+        return self._binarizer[1]
+
+
+    def instances_to_binaries(self, instances):
+        """
+        Binary representations of several instances at once.
+        Return an int8 matrix (n_instances x n_binary_variables): the column i is the sign of the literal of the binary variable i+1 for
+        each instance, 0 when the value of the feature is None (partial instance) or when i+1 is not a binary variable.
+
+        @param instances: a 2-D array-like, one instance per line.
+        """
+        instances = numpy.asarray(instances)
+        if instances.ndim != 2:
+            raise ValueError("The instances parameter should be an array of two dimensions (not " + str(instances.ndim) + ").")
+        missing = None
+        if instances.dtype == object:
+            missing = numpy.equal(instances, None)
+            instances = numpy.where(missing, numpy.nan, instances)
+        instances = instances.astype(numpy.float64, copy=False)
+
+        signs = numpy.zeros((instances.shape[0], len(self.map_id_binaries_to_features) - 1), dtype=numpy.int8)
+        for id_feature, operator, thresholds, id_binaries in self._get_binarizer()[0]:
+            values = instances[:, id_feature - 1]
+            ranks = numpy.arange(len(thresholds))
+            # thresholds are sorted: a condition is satisfied for the thresholds before (or after) the position of the value
+            if operator == OperatorCondition.GE:
+                satisfied = ranks[None, :] < numpy.searchsorted(thresholds, values, side="right")[:, None]
+            elif operator == OperatorCondition.GT:
+                satisfied = ranks[None, :] < numpy.searchsorted(thresholds, values, side="left")[:, None]
+            elif operator == OperatorCondition.LE:
+                satisfied = ranks[None, :] >= numpy.searchsorted(thresholds, values, side="left")[:, None]
+            elif operator == OperatorCondition.LT:
+                satisfied = ranks[None, :] >= numpy.searchsorted(thresholds, values, side="right")[:, None]
+            elif operator == OperatorCondition.EQ:
+                satisfied = values[:, None] == thresholds[None, :]
+            elif operator == OperatorCondition.NEQ:
+                satisfied = values[:, None] != thresholds[None, :]
+            else:
+                raise NotImplementedError("The operator " + str(operator) + " is not implemented.")
+            nan_values = numpy.isnan(values)
+            if nan_values.any() and operator != OperatorCondition.EQ and operator != OperatorCondition.NEQ:
+                # As for Python comparisons, NaN satisfies no order condition
+                satisfied[nan_values, :] = False
+            group_signs = numpy.where(satisfied, 1, -1).astype(numpy.int8)
+            if missing is not None:
+                group_signs[missing[:, id_feature - 1], :] = 0
+            signs[:, id_binaries - 1] = group_signs
+        return signs
+
+
     def instance_to_binaries(self, instance, preference_order=None):
         """
         map_id_binaries_to_features: list[id_binary] -> (id_feature, operator, threshold)
@@ -194,31 +336,13 @@ class BinaryMapping():
         """
         output = []
         if preference_order is None:
-            for key in self.map_features_to_id_binaries.keys():  # the keys are of the type: (id_feature, operator, threshold)
-                id_feature = key[0]
-                operator = key[1]
-                threshold = key[2]
-
-                if instance[id_feature - 1] is None:  # It is possible to compute a partial binary representation
+            # One instance: Python comparisons are faster than NumPy (see instances_to_binaries() for several instances)
+            for index, comparison, threshold, id_binary in self._get_binarizer()[1]:
+                value = instance[index]
+                if value is None:  # It is possible to compute a partial binary representation
                     continue
-
-                if operator == OperatorCondition.GE:
-                    sign = 1 if instance[id_feature - 1] >= threshold else -1
-                elif operator == OperatorCondition.GT:
-                    sign = 1 if instance[id_feature - 1] > threshold else -1
-                elif operator == OperatorCondition.LE:
-                    sign = 1 if instance[id_feature - 1] <= threshold else -1
-                elif operator == OperatorCondition.LT:
-                    sign = 1 if instance[id_feature - 1] < threshold else -1
-                elif operator == OperatorCondition.EQ:
-                    sign = 1 if instance[id_feature - 1] == threshold else -1
-                elif operator == OperatorCondition.NEQ:
-                    sign = 1 if instance[id_feature - 1] != threshold else -1
-                else:
-                    raise NotImplementedError("The operator " + str(self.operator) + " is not implemented.")
-
-                output.append(sign * self.map_features_to_id_binaries[key][0])  # map_features_to_id_binaries[key][0] => id_binary
-            return CNFencoding.format(output)
+                output.append(id_binary if comparison(value, threshold) else -id_binary)
+            return tuple(output)
         assert True, "To implement"
         return output
 
@@ -4,6 +4,7 @@ import os
 from operator import index
 from decimal import Decimal
 from pyxai.sources.core.structure.decisionTree import DecisionTree
+from pyxai.sources.core.structure.literalSet import LiteralSet
 from pyxai.sources.core.structure.treeEnsembles import TreeEnsembles
 from pyxai.sources.core.structure.type import Encoding
 from pyxai.sources.core.tools.encoding import CNFencoding
@@ -13,8 +14,8 @@ from pyxai.sources.learning.learner_information import LearnerInformation
 # TODO fix circular import
 class BoostedTrees(TreeEnsembles):
 
-    def __init__(self, forest, n_classes=2, learner_information=None):
-        super().__init__(forest, learner_information)
+    def __init__(self, forest, n_classes=2, learner_information=None, binary_mapping=None):
+        super().__init__(forest, learner_information, binary_mapping)
         self.n_classes = n_classes
         self.learner_information = learner_information
         # assert all(tree.type_tree is TypeTree.WEIGHT for tree in self.forest), "All trees in a boosted trees have to be of the type WEIGHT."
@@ -35,6 +36,7 @@ class BoostedTrees(TreeEnsembles):
 
 
     def get_leaves(self, tree, node, implicant, is_removed, current_removed=None, is_in_current=False):
+        implicant = LiteralSet.of(implicant)  # The recursive calls get the same LiteralSet
         output = []
         if node.is_leaf():
             if current_removed is not None:
@@ -43,8 +45,8 @@ class BoostedTrees(TreeEnsembles):
                 output.append(node)
         else:
             id_variable = tree.get_id_variable(node)
-            index_variable = implicant.index(id_variable) if id_variable in implicant else implicant.index(-id_variable)
-            literal = implicant[index_variable]
+            literal = implicant.literal(id_variable)
+            index_variable = implicant.index(literal)
             removed = is_removed[index_variable]
             if current_removed is not None:
                 if index_variable == current_removed:
@@ -60,31 +62,41 @@ class BoostedTrees(TreeEnsembles):
         return output
 
 
-    def reduce_nodes(self, node, tree, implicant, get_min):
+    def reduce_nodes(self, node, tree, implicant, get_min, reduced_nodes):
         if node.is_leaf():
-            return
-        self.reduce_nodes(node.left, tree, implicant, get_min)
-        self.reduce_nodes(node.right, tree, implicant, get_min)
-        if node.left.is_leaf() and node.right.is_leaf():
-            id_variable = tree.get_id_variable(node)
-            instance_w = node.right.value if id_variable in implicant else node.left.value
-            not_instance_w = node.left.value if id_variable in implicant else node.right.value
-            if (get_min and instance_w < not_instance_w) or (not get_min and instance_w > not_instance_w):
-                node.artificial_leaf = True
-                node.value = instance_w
+            return node.value
+        left_value = self.reduce_nodes(node.left, tree, implicant, get_min, reduced_nodes)
+        right_value = self.reduce_nodes(node.right, tree, implicant, get_min, reduced_nodes)
+        if left_value is None or right_value is None:
+            return None
+        in_implicant = tree.get_id_variable(node) in implicant
+        instance_w = right_value if in_implicant else left_value
+        not_instance_w = left_value if in_implicant else right_value
+        if (get_min and instance_w < not_instance_w) or (not get_min and instance_w > not_instance_w):
+            reduced_nodes[node] = instance_w
+            return instance_w
+        return None
 
 
     def reduce_trees(self, implicant, prediction):
+        """
+        Return, for each tree, a dict giving the decision nodes that can be seen as leaves (the worst value for the prediction being the value
+        of the implicant) and their value. The trees are not modified.
+        """
+        implicant = set(implicant)
+        reduced_trees = []
         for tree in self.forest:
-            for node in tree.nodes:
-                node.artificial_leaf = False
-            self.reduce_nodes(tree.root, tree, implicant, prediction == 1 if self.n_classes == 2 else tree.target_class == prediction)
+            reduced_nodes = {}
+            self.reduce_nodes(tree.root, tree, implicant, prediction == 1 if self.n_classes == 2 else tree.target_class == prediction, reduced_nodes)
+            reduced_trees.append(reduced_nodes)
+        return reduced_trees
 
 
-    def remove_reduce_trees(self):
-        for tree in self.forest:
-            for node in tree.nodes:
-                node.artificial_leaf = False
+    def weight_bounds(self, implicant):
+        """
+        Return two arrays giving, for each tree, the minimum and the maximum weight that an extension of the implicant can reach.
+        """
+        return self.compiled_forest.weight_bounds(implicant)
 
 
     def __str__(self):
@@ -110,7 +122,27 @@ class BoostedTrees(TreeEnsembles):
         return self.scores_to_probabilities(scores)
 
 
+    def predict_proba_batch(self, instances):
+        """
+        Return, for each instance of a 2-D array, the same values as compute_probabilities_instance.
+        """
+        scores = self.leaf_values_batch(instances)
+        if self.n_classes > 2:
+            class_scores = numpy.column_stack([numpy.exp(scores[:, i::self.n_classes].sum(axis=1)) for i in range(self.n_classes)])
+            return class_scores / class_scores.sum(axis=1, keepdims=True)
+        positives = scores.sum(axis=1) > 0
+        return numpy.column_stack([~positives, positives]).astype(numpy.int64)
+
+
+    def predict_batch(self, instances):
+        """
+        Return the prediction (the classification) of each instance of a 2-D array according to the trees
+        """
+        return numpy.argmax(self.predict_proba_batch(instances), axis=1)
+
+
     def compute_probabilities_implicant(self, implicant):
+        implicant = LiteralSet.of(implicant)  # Built once for all the trees
         scores = numpy.asarray([tree.take_decisions_binary_representation(implicant, self.map_features_to_id_binaries) for tree in self.forest])
         return self.scores_to_probabilities(scores)
 
@@ -130,8 +162,8 @@ class BoostedTrees(TreeEnsembles):
 
 
 class BoostedTreesRegression(BoostedTrees):
-    def __init__(self, forest, learner_information=None):
-        super().__init__(forest, None, learner_information)
+    def __init__(self, forest, learner_information=None, binary_mapping=None):
+        super().__init__(forest, None, learner_information, binary_mapping)
         if learner_information is None:
                 self.learner_information = LearnerInformation(None, None, None, None, None, extras={"base_score": 0})
 
@@ -142,6 +174,7 @@ class BoostedTreesRegression(BoostedTrees):
         Return the prediction of an implicant according to the trees
         """
         base_score = self.learner_information.extras["base_score"]
+        implicant = LiteralSet.of(implicant)
         sum_trees = sum([tree.take_decisions_binary_representation(implicant, self.map_features_to_id_binaries) for tree in self.forest])
         return sum_trees + base_score
     
@@ -152,3 +185,17 @@ class BoostedTreesRegression(BoostedTrees):
         base_score = self.learner_information.extras["base_score"]
         sum_trees = sum([tree.predict_instance(instance) for tree in self.forest])
         return sum_trees + base_score
+
+
+    def predict_batch(self, instances):
+        """
+        Return the prediction of each instance of a 2-D array according to the trees
+        """
+        return self.leaf_values_batch(instances).sum(axis=1) + self.learner_information.extras["base_score"]
+
+
+    def predict_proba_batch(self, instances):
+        """
+        Probabilities are not defined for a regression model (see predict_batch): raise a TypeError.
+        """
+        raise TypeError("Probabilities are not defined for a regression model, use predict_batch().")
@@ -0,0 +1,462 @@
+import operator
+
+import numpy
+
+from pyxai.sources.core.structure.decisionNode import DecisionNode, LeafNode
+from pyxai.sources.core.structure.literalSet import LiteralSet
+from pyxai.sources.core.structure.type import OperatorCondition
+
+# Codes of the operators in the node table (column OPERATOR) and the associated comparisons.
+OPERATOR_CODES = {OperatorCondition.GE: 0, OperatorCondition.GT: 1, OperatorCondition.LE: 2,
+                  OperatorCondition.LT: 3, OperatorCondition.EQ: 4, OperatorCondition.NEQ: 5}
+OPERATORS = tuple(sorted(OPERATOR_CODES.keys(), key=lambda operator_condition: OPERATOR_CODES[operator_condition]))
+COMPARATORS = (operator.ge, operator.gt, operator.le, operator.lt, operator.eq, operator.ne)
+VECTORIZED_COMPARATORS = (numpy.greater_equal, numpy.greater, numpy.less_equal, numpy.less, numpy.equal, numpy.not_equal)
+
+LEAF = -1
+
+# The Python lists of the columns and their arrays (see CompiledTree.__getattr__())
+LIST_COLUMNS = {"_features": "features", "_thresholds": "thresholds", "_operators": "operators", "_lefts": "lefts", "_rights": "rights",
+                "_id_binaries": "id_binaries", "leaf_values": "values"}
+
+# The arrays of a compiled forest given to CompiledForest.from_columns() (besides roots and id_binaries)
+FOREST_COLUMNS = ("lefts", "rights", "values", "leaves", "parents", "depths", "_variable_rows", "_variable_starts")
+
+
+class CompiledTree:
+    """
+    Flat representation of a decision tree: one row per node (decision nodes and leaves) in a depth-first order, the root being the row 0.
+    Each column is stored in a NumPy array:
+    - features: id_feature - 1 (i.e. the index in an instance), LEAF for a leaf
+    - thresholds: the threshold of the condition (NaN for a leaf)
+    - operators: the code of the operator of the condition (see OPERATOR_CODES), LEAF for a leaf
+    - lefts, rights: the rows of the children (the right child is taken when the condition is satisfied), LEAF for a leaf
+    - values: the leaf values (0 for a decision node), integers if all leaf values are integers (classes), floats otherwise
+    - id_binaries: the binary variable of the condition, 0 for a leaf
+    The same columns are also kept as Python lists, that are faster to read one element at a time (created on the first use when the tree
+    is built from arrays).
+    """
+
+
+    def __init__(self, root, get_id_variable):
+        """
+        Args:
+            root (DecisionNode | LeafNode): the root of the tree.
+            get_id_variable (function): gives the binary variable of a decision node.
+        """
+        features, thresholds, operators, lefts, rights, values, id_binaries = [], [], [], [], [], [], []
+        stack = [(root, None, None)]  # (node, row of the parent, is the right child)
+        while len(stack) != 0:
+            node, parent, is_right = stack.pop()
+            row = len(features)
+            if parent is not None:
+                if is_right:
+                    rights[parent] = row
+                else:
+                    lefts[parent] = row
+            lefts.append(LEAF)
+            rights.append(LEAF)
+            if node.is_leaf():
+                features.append(LEAF)
+                thresholds.append(None)
+                operators.append(LEAF)
+                values.append(node.value)
+                id_binaries.append(0)
+            else:
+                features.append(node.id_feature - 1)
+                thresholds.append(node.threshold)
+                operators.append(OPERATOR_CODES[node.operator])
+                values.append(None)
+                id_binaries.append(get_id_variable(node))
+                # The left child is popped first: the rows follow a preorder (node, left, right).
+                stack.append((node.right, row, True))
+                stack.append((node.left, row, False))
+
+        self._set_columns(features, thresholds, operators, lefts, rights, values, id_binaries)
+
+
+    @staticmethod
+    def from_arrays(features, thresholds, operators, lefts, rights, values):
+        """
+        Build a compiled tree from the columns of a node table, without creating the nodes. The rows can be in any order, the root being the
+        row 0: they are put in the order of the constructor (preorder). The binary variables are not known yet (see with_id_binaries()).
+
+        Args:
+            features (numpy.ndarray): id_feature - 1 for a decision node (the value of a leaf is ignored).
+            thresholds (numpy.ndarray): the thresholds of the conditions (the value of a leaf is ignored).
+            operators (OperatorCondition | numpy.ndarray): the operator of all the conditions, or the code of the operator of each row.
+            lefts, rights (numpy.ndarray): the rows of the children, LEAF (or any negative value) for a leaf.
+            values (numpy.ndarray): the leaf values (the value of a decision node is ignored).
+        """
+        lefts = numpy.asarray(lefts, dtype=numpy.int64)
+        rights = numpy.asarray(rights, dtype=numpy.int64)
+        if isinstance(operators, OperatorCondition):
+            operators = numpy.full(len(lefts), OPERATOR_CODES[operators], dtype=numpy.int8)
+        list_lefts, list_rights = lefts.tolist(), rights.tolist()
+        order = []
+        stack = [0]
+        while len(stack) != 0:
+            row = stack.pop()
+            order.append(row)
+            if list_lefts[row] >= 0:
+                stack.append(list_rights[row])
+                stack.append(list_lefts[row])
+        order = numpy.asarray(order, dtype=numpy.int64)
+        positions = numpy.full(len(lefts), LEAF, dtype=numpy.int64)
+        positions[order] = numpy.arange(len(order))
+
+        leaves = lefts[order] < 0
+        values = numpy.asarray(values)[order]
+        return CompiledTree.from_columns(numpy.where(leaves, LEAF, numpy.asarray(features)[order]),
+                                         numpy.where(leaves, numpy.nan, numpy.asarray(thresholds, dtype=numpy.float64)[order]),
+                                         numpy.where(leaves, LEAF, numpy.asarray(operators)[order]),
+                                         numpy.where(leaves, LEAF, positions[lefts[order]]),
+                                         numpy.where(leaves, LEAF, positions[rights[order]]),
+                                         numpy.where(leaves, values, 0),
+                                         numpy.zeros(len(order), dtype=numpy.int64))
+
+
+    @staticmethod
+    def from_columns(features, thresholds, operators, lefts, rights, values, id_binaries):
+        """
+        Build a compiled tree from its columns, the rows being already in the order of the constructor (preorder) and the binary variables
+        known, for example from the arrays of a model file (see ModelFile). The arrays are used as they are when they have the types of the
+        columns (no copy): a memory map stays a memory map. The Python lists of the columns are created when they are used.
+        """
+        compiled_tree = CompiledTree.__new__(CompiledTree)
+        compiled_tree.features = numpy.asarray(features, dtype=numpy.int64)
+        compiled_tree.thresholds = numpy.asarray(thresholds, dtype=numpy.float64)
+        compiled_tree.operators = numpy.asarray(operators, dtype=numpy.int8)
+        compiled_tree.lefts = numpy.asarray(lefts, dtype=numpy.int64)
+        compiled_tree.rights = numpy.asarray(rights, dtype=numpy.int64)
+        values = numpy.asarray(values)
+        compiled_tree.values = values.astype(numpy.int64 if values.dtype.kind in "biu" else numpy.float64, copy=False)
+        compiled_tree.id_binaries = numpy.asarray(id_binaries, dtype=numpy.int64)
+        return compiled_tree
+
+
+    def __getattr__(self, name):
+        # The Python lists of a compiled tree built from arrays (see from_columns()) are created on the first use
+        if name in LIST_COLUMNS:
+            column = getattr(self, LIST_COLUMNS[name]).tolist()
+            setattr(self, name, column)
+            return column
+        raise AttributeError(name)
+
+
+    def __reduce_ex__(self, protocol):
+        # A compiled tree built on a block of shared memory (see SharedModel) is pickled as a reference to the block
+        shared = self.__dict__.get("_shared")  # (shared model, index of the tree)
+        if shared is not None:
+            return shared[0].compiled_tree, (shared[1],)
+        return super().__reduce_ex__(protocol)
+
+
+    def _set_columns(self, features, thresholds, operators, lefts, rights, values, id_binaries):
+        self.leaf_values = values
+        self._features = features
+        self._thresholds = thresholds
+        self._operators = operators
+        self._lefts = lefts
+        self._rights = rights
+        self._id_binaries = id_binaries
+
+        self.features = numpy.asarray(features, dtype=numpy.int64)
+        self.thresholds = numpy.asarray([numpy.nan if threshold is None else threshold for threshold in thresholds], dtype=numpy.float64)
+        self.operators = numpy.asarray(operators, dtype=numpy.int8)
+        self.lefts = numpy.asarray(lefts, dtype=numpy.int64)
+        self.rights = numpy.asarray(rights, dtype=numpy.int64)
+        integers = all(isinstance(value, (int, numpy.integer)) for value in values if value is not None)
+        self.values = numpy.asarray([0 if value is None else value for value in values], dtype=numpy.int64 if integers else numpy.float64)
+        self.id_binaries = numpy.asarray(id_binaries, dtype=numpy.int64)
+
+
+    def conditions(self):
+        """
+        Return the conditions (id_feature, operator, threshold) of the decision nodes, in the order of the rows.
+        """
+        return [(feature + 1, OPERATORS[operator_code], threshold)
+                for feature, operator_code, threshold in zip(self._features, self._operators, self._thresholds) if feature != LEAF]
+
+
+    def with_id_binaries(self, id_binaries):
+        """
+        Return a compiled tree with the same nodes and other binary variables: id_binaries gives the binary variable of each decision node,
+        in the order of the rows.
+        """
+        compiled_tree = CompiledTree.__new__(CompiledTree)
+        compiled_tree.__dict__.update(self.__dict__)
+        decision_rows = numpy.flatnonzero(self.features != LEAF)
+        compiled_tree.id_binaries = numpy.zeros(len(self.features), dtype=numpy.int64)
+        compiled_tree.id_binaries[decision_rows] = id_binaries
+        compiled_tree.__dict__.pop("_id_binaries", None)  # created again from the array when it is used
+        compiled_tree.__dict__.pop("_shared", None)  # the binary variables are not the ones of the shared memory
+        return compiled_tree
+
+
+    def to_nodes(self):
+        """
+        Create the nodes (DecisionNode and LeafNode) of the tree and return the root.
+        """
+        nodes = [LeafNode(value) if feature == LEAF else
+                 DecisionNode(feature + 1, threshold=threshold, operator=OPERATORS[operator_code], left=None, right=None)
+                 for feature, threshold, operator_code, value in zip(self._features, self._thresholds, self._operators, self.leaf_values)]
+        for row, feature in enumerate(self._features):
+            if feature != LEAF:
+                nodes[row].left = nodes[self._lefts[row]]
+                nodes[row].right = nodes[self._rights[row]]
+        return nodes[0]
+
+
+    @property
+    def n_nodes(self):
+        return len(self._features)
+
+
+    def leaf_rows(self):
+        return [row for row, feature in enumerate(self._features) if feature == LEAF]
+
+
+    def predict_instance(self, instance):
+        features, thresholds, operators, lefts, rights = self._features, self._thresholds, self._operators, self._lefts, self._rights
+        row = 0
+        while features[row] != LEAF:
+            row = rights[row] if COMPARATORS[operators[row]](instance[features[row]], thresholds[row]) else lefts[row]
+        return self.leaf_values[row]
+
+
+    def predict_implicant(self, implicant):
+        """
+        The implicant must contain a literal for each variable of the tree (i.e. be a complete binary representation).
+        """
+        signs = self.node_signs(implicant)
+        lefts, rights = self._lefts, self._rights
+        row = 0
+        while lefts[row] != LEAF:
+            assert signs[row] != 0, "The binary representation has to be complete !"
+            row = rights[row] if signs[row] > 0 else lefts[row]
+        return self.leaf_values[row]
+
+
+    def node_signs(self, implicant):
+        """
+        Return a list giving, for each row, the sign of the variable of the node in the implicant (1, -1, or 0 if the variable is not in
+        the implicant or if the row is a leaf).
+        """
+        return LiteralSet.of(implicant).signs_of(self.id_binaries).tolist()
+
+
+    def reachable_leaves(self, implicant):
+        """
+        Return the rows of the leaves compatible with the implicant (partial or not).
+        """
+        signs = self.node_signs(implicant)
+        lefts, rights = self._lefts, self._rights
+        leaves = []
+        stack = [0]
+        while len(stack) != 0:
+            row = stack.pop()
+            if lefts[row] == LEAF:
+                leaves.append(row)
+                continue
+            if signs[row] > 0:
+                stack.append(rights[row])
+            elif signs[row] < 0:
+                stack.append(lefts[row])
+            else:
+                stack.append(rights[row])
+                stack.append(lefts[row])
+        return leaves
+
+
+    def reachable_values(self, implicant):
+        return set(self.leaf_values[row] for row in self.reachable_leaves(implicant))
+
+
+    def is_implicant(self, implicant, target_prediction):
+        signs = self.node_signs(implicant)
+        lefts, rights, values = self._lefts, self._rights, self.leaf_values
+        stack = [0]
+        while len(stack) != 0:
+            row = stack.pop()
+            if lefts[row] == LEAF:
+                if values[row] != target_prediction:
+                    return False
+                continue
+            if signs[row] > 0:
+                stack.append(rights[row])
+            elif signs[row] < 0:
+                stack.append(lefts[row])
+            else:
+                stack.append(rights[row])
+                stack.append(lefts[row])
+        return True
+
+
+    def leaves_batch(self, instances):
+        """
+        Return the rows of the leaves reached by each instance (a 2-D array, one instance per line).
+        All instances go down the tree together, one level at a time.
+        """
+        rows = numpy.zeros(instances.shape[0], dtype=numpy.int64)
+        active = numpy.flatnonzero(self.features[rows] != LEAF)
+        while active.size != 0:
+            nodes = rows[active]
+            values = instances[active, self.features[nodes]]
+            thresholds = self.thresholds[nodes]
+            operators = self.operators[nodes]
+            satisfied = numpy.empty(active.size, dtype=bool)
+            for code, comparator in enumerate(VECTORIZED_COMPARATORS):
+                mask = operators == code
+                if mask.any():
+                    satisfied[mask] = comparator(values[mask], thresholds[mask])
+            rows[active] = numpy.where(satisfied, self.rights[nodes], self.lefts[nodes])
+            active = active[self.features[rows[active]] != LEAF]
+        return rows
+
+
+    def predict_batch(self, instances):
+        return self.values[self.leaves_batch(instances)]
+
+
+class CompiledForest:
+    """
+    The compiled trees of an ensemble gathered in a single node table, in order to evaluate all the trees together (one NumPy operation per
+    level of depth instead of one traversal per tree). The rows of a tree are shifted by the number of rows of the previous trees:
+    - roots: the row of the root of each tree
+    - lefts, rights, id_binaries, values: the same columns as in CompiledTree (values are floats)
+    - parents: the row of the parent of each node, LEAF for a root
+    - depths: the depth of each node
+    - levels: the rows of the decision nodes grouped by depth, the deepest first (levels[i] is at the depth len(levels) - 1 - i)
+    """
+
+
+    def __init__(self, compiled_trees):
+        """
+        Args:
+            compiled_trees (list[CompiledTree]): the compiled trees of the ensemble.
+        """
+        self.compiled_trees = list(compiled_trees)
+        offsets = numpy.cumsum([0] + [compiled_tree.n_nodes for compiled_tree in self.compiled_trees])
+        self.roots = offsets[:-1]
+        self.lefts = numpy.concatenate([numpy.where(compiled_tree.lefts == LEAF, LEAF, compiled_tree.lefts + offset)
+                                        for compiled_tree, offset in zip(self.compiled_trees, self.roots)])
+        self.rights = numpy.concatenate([numpy.where(compiled_tree.rights == LEAF, LEAF, compiled_tree.rights + offset)
+                                         for compiled_tree, offset in zip(self.compiled_trees, self.roots)])
+        self.id_binaries = numpy.concatenate([compiled_tree.id_binaries for compiled_tree in self.compiled_trees])
+        self.values = numpy.concatenate([compiled_tree.values.astype(numpy.float64) for compiled_tree in self.compiled_trees])
+        self.leaves = self.lefts == LEAF
+        self.n_variables = int(self.id_binaries.max())
+
+        decision_nodes = numpy.flatnonzero(~self.leaves)
+        self.parents = numpy.full(len(self.lefts), LEAF, dtype=numpy.int64)
+        self.parents[self.lefts[decision_nodes]] = decision_nodes
+        self.parents[self.rights[decision_nodes]] = decision_nodes
+        self.depths = numpy.zeros(len(self.lefts), dtype=numpy.int64)
+        self.levels = []
+        rows = self.roots[~self.leaves[self.roots]]
+        while rows.size != 0:
+            self.levels.insert(0, rows)
+            children = numpy.concatenate((self.lefts[rows], self.rights[rows]))
+            self.depths[children] = len(self.levels)
+            rows = children[~self.leaves[children]]
+
+        # The rows of the decision nodes of a variable v are _variable_rows[_variable_starts[v]:_variable_starts[v + 1]]
+        self._variable_rows = numpy.argsort(self.id_binaries, kind="stable")
+        self._variable_starts = numpy.searchsorted(self.id_binaries[self._variable_rows], numpy.arange(self.n_variables + 2))
+
+
+    def columns(self):
+        """
+        Return the arrays of the compiled forest for from_columns() (see FOREST_COLUMNS), the levels being put end to end (levels) with
+        their sizes (level_sizes).
+        """
+        columns = {name: getattr(self, name) for name in FOREST_COLUMNS}
+        columns["levels"] = numpy.concatenate(self.levels) if len(self.levels) != 0 else numpy.empty(0, dtype=numpy.int64)
+        columns["level_sizes"] = numpy.asarray([len(level) for level in self.levels], dtype=numpy.int64)
+        return columns
+
+
+    @staticmethod
+    def from_columns(compiled_trees, roots, id_binaries, columns):
+        """
+        Build a compiled forest from arrays already computed (see columns()), without copying them: roots and id_binaries are the offsets
+        of the trees and the binary variables of the compiled trees put end to end (for example the arrays of a model file, see ModelFile).
+        """
+        compiled_forest = CompiledForest.__new__(CompiledForest)
+        compiled_forest.compiled_trees = list(compiled_trees)
+        compiled_forest.roots = roots
+        compiled_forest.id_binaries = id_binaries
+        for name in FOREST_COLUMNS:
+            setattr(compiled_forest, name, columns[name])
+        compiled_forest.n_variables = int(id_binaries.max())
+        ends = numpy.cumsum(columns["level_sizes"]).tolist()
+        compiled_forest.levels = [columns["levels"][end - size:end] for end, size in zip(ends, columns["level_sizes"].tolist())]
+        return compiled_forest
+
+
+    def __reduce_ex__(self, protocol):
+        # A compiled forest built on a block of shared memory (see SharedModel) is pickled as a reference to the block
+        shared = self.__dict__.get("_shared")  # shared model
+        if shared is not None:
+            return shared.compiled_forest, (self.compiled_trees,)
+        return super().__reduce_ex__(protocol)
+
+
+    def variable_rows(self, id_variables):
+        """
+        Return the rows of the decision nodes that test one of the given binary variables.
+        """
+        starts = self._variable_starts
+        rows = [self._variable_rows[starts[id_variable]:starts[id_variable + 1]] for id_variable in id_variables if 0 < id_variable <= self.n_variables]
+        return numpy.concatenate(rows) if len(rows) != 0 else numpy.empty(0, dtype=numpy.int64)
+
+
+    def tree_indexes(self, roots):
+        """
+        Return the indexes of the trees of the given root rows.
+        """
+        return numpy.searchsorted(self.roots, roots)
+
+
+    def signs(self, implicant):
+        """
+        Return an array giving, for each binary variable, 1 (resp. -1) if the variable (resp. its negation) is in the implicant, 0 otherwise.
+        """
+        return LiteralSet.of(implicant).sign_vector(self.n_variables)
+
+
+    def evaluate_rows(self, rows, signs, columns):
+        """
+        Compute the values of the decision nodes of rows from the values of their children: the value of the child given by the sign of the
+        variable, or the combination of the values of both children if the variable is not assigned.
+
+        Args:
+            rows (numpy.ndarray): rows of decision nodes, the values of their children being already computed.
+            signs (numpy.ndarray): see signs().
+            columns (list[tuple[numpy.ndarray, numpy.ufunc]]): the values of all nodes and the function that combines two values
+        """
+        row_signs = signs[self.id_binaries[rows]]
+        lefts = self.lefts[rows]
+        rights = self.rights[rows]
+        for values, combine in columns:
+            values[rows] = numpy.where(row_signs > 0, values[rights], numpy.where(row_signs < 0, values[lefts], combine(values[lefts], values[rights])))
+
+
+    def evaluate(self, signs, columns):
+        """
+        Compute the values of all decision nodes (see evaluate_rows()), the values of the leaves being given.
+        """
+        for rows in self.levels:
+            self.evaluate_rows(rows, signs, columns)
+
+
+    def weight_bounds(self, implicant):
+        """
+        Return two arrays giving, for each tree, the minimum and the maximum leaf values that can be reached by an extension of the
+        implicant (partial or not). Nothing is modified: several threads can call this method at the same time.
+        """
+        minimums = self.values.copy()
+        maximums = self.values.copy()
+        self.evaluate(self.signs(implicant), [(minimums, numpy.minimum), (maximums, numpy.maximum)])
+        return minimums[self.roots], maximums[self.roots]
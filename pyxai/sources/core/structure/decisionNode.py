@@ -68,7 +68,6 @@ class DecisionNode:
         self.parent = parent
         self.left = left if isinstance(left, DecisionNode) else LeafNode(left)
         self.right = right if isinstance(right, DecisionNode) else LeafNode(right)
-        self.artificial_leaf = False
 
 
     def negating_tree(self):
@@ -102,7 +101,7 @@ class DecisionNode:
 
 
     def is_leaf(self):
-        return self.artificial_leaf
+        return False
 
 
     def __str__(self):
@@ -1,16 +1,20 @@
 import copy
+import hashlib
 import numpy
 import os
 
 from pyxai.sources.core.structure.binaryMapping import BinaryMapping
+from pyxai.sources.core.structure.compiledTree import CompiledTree, LEAF
 from pyxai.sources.core.structure.decisionNode import DecisionNode, LeafNode
+from pyxai.sources.core.structure.literalSet import LiteralSet
 from pyxai.sources.core.structure.type import TypeLeaf, Encoding, OperatorCondition
 from pyxai.sources.core.tools.encoding import CNFencoding
 
 
 class DecisionTree(BinaryMapping):
 
-    def __init__(self, n_features, root, target_class=0, id_solver_results=0, learner_information=None, force_features_equal_to_binaries=False):
+    def __init__(self, n_features, root, target_class=0, id_solver_results=0, learner_information=None, force_features_equal_to_binaries=False,
+                 binary_mapping=None):
         """
 
         Args:
@@ -22,34 +26,138 @@ class DecisionTree(BinaryMapping):
             force_features_equal_to_binaries (bool, optional): By default, the binaries id in the representation of implicants
             is not the same that the features id. This option allows to force that these two kinds of ids are the same. This is used to allows
             that variables directly represent the features. Defaults to False.
+
+        The root can also be a node table (a CompiledTree without binary variables, see from_arrays()): the nodes are then created only
+        when they are used (root, nodes). When binary_mapping, the tuple (map_id_binaries_to_features, map_features_to_id_binaries), is
+        given, the binary variables of the node table are already the ones of these maps (see ModelFile): the node table is the compiled
+        tree, nothing is computed.
         """
         self.id_solver_results = id_solver_results
         self.learner_information = learner_information
         self.n_features = n_features
-        self.nodes = []
-        self.root = root
+        self._nodes = []
+        if isinstance(root, CompiledTree):
+            self._root = None
+            self._node_table = root
+            self._conditions = None  # see conditions()
+        else:
+            self._root = root
+            self._node_table = None
+            self._conditions = None
+            if not root.is_leaf():
+                self.define_parents(root)
         self._leaves = None
         self.target_class = target_class  # can be a integer (for BT) or a list (for DT and RF) TODO
-        if not self.root.is_leaf():
-            self.define_parents(self.root)
         self.force_features_equal_to_binaries = force_features_equal_to_binaries
-        self.map_id_binaries_to_features, self.map_features_to_id_binaries = self.compute_id_binaries(force_features_equal_to_binaries)
+        if binary_mapping is None:
+            self.map_id_binaries_to_features, self.map_features_to_id_binaries = self.compute_id_binaries(force_features_equal_to_binaries)
+        else:
+            self.map_id_binaries_to_features, self.map_features_to_id_binaries = binary_mapping
         super().__init__(self.map_id_binaries_to_features, self.map_features_to_id_binaries, learner_information)
+        if binary_mapping is None:
+            self.compile()
+        else:
+            self._set_compiled_tree(root)
 
         # assert isinstance(self.type_tree, TypeTree), "Please put the good type of the tree !"
 
 
+    @staticmethod
+    def from_arrays(n_features, features, thresholds, operators, lefts, rights, values, **options):
+        """
+        Create a tree from the columns of its node table (see CompiledTree.from_arrays()), without creating the nodes.
+        The options are the ones of the constructor.
+        """
+        return DecisionTree(n_features, CompiledTree.from_arrays(features, thresholds, operators, lefts, rights, values), **options)
+
+
+    @property
+    def root(self):
+        if self._root is None:
+            self._root = self._node_table.to_nodes()
+            self._nodes = []
+            if not self._root.is_leaf():
+                self.define_parents(self._root)
+            self._node_table = None
+            self._conditions = None
+        return self._root
+
+
+    @root.setter
+    def root(self, root):
+        """
+        Replace the nodes of the tree. The conditions of the new nodes must already have binary variables.
+        The compiled tree (and so the CNF and the fingerprint) is rebuilt.
+        """
+        root.parent = None  # the root can be a node of the previous tree
+        self._root = root
+        self._node_table = None
+        self._conditions = None
+        self._nodes = []
+        self._leaves = None
+        if not root.is_leaf():
+            self.define_parents(root)
+        self.compile()
+
+
+    @property
+    def nodes(self):
+        """
+        The decision nodes, in preorder.
+        """
+        if self._root is None:
+            self.root  # creates the nodes
+        return self._nodes
+
+
+    def compile(self):
+        """
+        Build the flat node table used for predictions and implicant checks.
+        Must be called again when the nodes or the binary variables of the tree change.
+        """
+        if self._root is None:
+            # The nodes are not created: only the binary variables of the node table change
+            self._set_compiled_tree(self._node_table.with_id_binaries([self.map_features_to_id_binaries[condition][0] for condition in self.conditions()]))
+        else:
+            self._set_compiled_tree(CompiledTree(self.root, self.get_id_variable))
+
+
+    def _set_compiled_tree(self, compiled_tree):
+        self.compiled_tree = compiled_tree
+        self._cnf_cache = {}  # dict[(tree_encoding, code_prediction, target_prediction, format)] -> CNF, see to_CNF()
+        self._fingerprint = None
+
+
+    def fingerprint(self):
+        """
+        A hash of the nodes, the binary variables and the leaf values of the tree, that is the same in every process.
+        """
+        if self._fingerprint is None:
+            digest = hashlib.sha256()
+            compiled_tree = self.compiled_tree
+            for column in (compiled_tree.features, compiled_tree.thresholds, compiled_tree.operators, compiled_tree.lefts,
+                           compiled_tree.rights, compiled_tree.values, compiled_tree.id_binaries):
+                digest.update(column.tobytes())
+            digest.update(repr(numpy.asarray(self.target_class).tolist()).encode())
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+
     def __str__(self):
         s = "**Decision Tree Model**" + os.linesep
         s += "nFeatures: " + str(self.n_features) + os.linesep
-        s += "nNodes: " + str(len(self.nodes)) + os.linesep
+        s += "nNodes: " + str(int(numpy.count_nonzero(self.compiled_tree.features != LEAF))) + os.linesep
         s += "nVariables: " + str(len(self.map_id_binaries_to_features) - 1) + os.linesep
         return s
 
 
     def raw_data_for_CPP(self):
         raw_t = tuple([self.root.value]) if self.root.is_leaf() else self.to_tuples(self.root, for_cpp=True)
-        return (int(self.target_class[0]) if isinstance(self.target_class, (numpy.ndarray, list, tuple)) else self.target_class, raw_t)
+        return (self.target_class_for_CPP(), raw_t)
+
+
+    def target_class_for_CPP(self):
+        return int(self.target_class[0]) if isinstance(self.target_class, (numpy.ndarray, list, tuple)) else int(self.target_class)
 
 
     def raw_data(self):
@@ -77,6 +185,7 @@ class DecisionTree(BinaryMapping):
     def simplify(self):
         while self._simplify(self.root):
             pass
+        self.compile()
 
 
     def _simplify(self, node, path=[], come_from=None, previous_node=None, previous_previous_node=None):
@@ -111,6 +220,7 @@ class DecisionTree(BinaryMapping):
     def negating_tree(self):
         new_tree = copy.deepcopy(self)
         new_tree.root.negating_tree()
+        new_tree.compile()
         return new_tree
 
 
@@ -118,6 +228,7 @@ class DecisionTree(BinaryMapping):
         new_tree = copy.deepcopy(self)
         new_tree.root.concatenate_tree(other_tree)
         new_tree.concatenate_id_binaries(other_tree)
+        new_tree.compile()
         return new_tree
 
 
@@ -125,6 +236,7 @@ class DecisionTree(BinaryMapping):
         new_tree = copy.deepcopy(self)
         new_tree.root.concatenate_tree(other_tree, disjunction=True)
         new_tree.concatenate_id_binaries(other_tree)
+        new_tree.compile()
         return new_tree
 
 
@@ -133,6 +245,8 @@ class DecisionTree(BinaryMapping):
             if self.root.is_leaf():
                 return []
             node = self.root
+            if binary_representation is not None:
+                binary_representation = LiteralSet.of(binary_representation)
         output = []
         if binary_representation is None:
             output.append(self.get_id_variable(node))
@@ -221,7 +335,7 @@ class DecisionTree(BinaryMapping):
 
     def define_parents(self, node, *, parent=None):
         if not node.is_leaf():
-            self.nodes.append(node)
+            self._nodes.append(node)
             self.define_parents(node.left, parent=node)
             self.define_parents(node.right, parent=node)
         if parent is not None:
@@ -248,25 +362,38 @@ class DecisionTree(BinaryMapping):
 
         map_features_to_id_binaries = {}
         id_binary = 1
-        for node in self.nodes:
-            if (node.id_feature, node.operator, node.threshold) not in map_features_to_id_binaries:
+        for condition in self.conditions():
+            if condition not in map_features_to_id_binaries:
                 if not force_features_equal_to_binaries:
-                    map_features_to_id_binaries[(node.id_feature, node.operator, node.threshold)] = [id_binary, 1, None]
-                    map_id_binaries_to_features.append((node.id_feature, node.operator, node.threshold))
+                    map_features_to_id_binaries[condition] = [id_binary, 1, None]
+                    map_id_binaries_to_features.append(condition)
                     id_binary += 1
                 else:
-                    map_features_to_id_binaries[(node.id_feature, node.operator, node.threshold)] = [node.id_feature, 1, None]
-                    map_id_binaries_to_features[node.id_feature] = (node.id_feature, node.operator, node.threshold)
+                    map_features_to_id_binaries[condition] = [condition[0], 1, None]
+                    map_id_binaries_to_features[condition[0]] = condition
             else:
-                map_features_to_id_binaries[(node.id_feature, node.operator, node.threshold)][1] += 1
+                map_features_to_id_binaries[condition][1] += 1
         return (map_id_binaries_to_features, map_features_to_id_binaries)
 
 
+    def conditions(self):
+        """
+        The conditions (id_feature, operator, threshold) of the decision nodes, in preorder.
+        """
+        if self._root is not None:
+            return [(node.id_feature, node.operator, node.threshold) for node in self.nodes]
+        if self._conditions is None:
+            self._conditions = self._node_table.conditions()
+        return self._conditions
+
+
     def get_id_variable(self, node):
         return self.map_features_to_id_binaries[(node.id_feature, node.operator, node.threshold)][0]
 
 
     def is_leaf(self):
+        if self._root is None:
+            return self._node_table.n_nodes == 1
         return self.root.is_leaf()
 
 
@@ -295,16 +422,25 @@ class DecisionTree(BinaryMapping):
 
 
     def is_implicant(self, reason, target_prediction):
-        return self.root.is_implicant(reason, target_prediction, self.map_features_to_id_binaries)
+        return self.compiled_tree.is_implicant(reason, target_prediction)
 
     def get_reachable_classes(self, reason, target_prediction):
-        return self.root.get_reachable_classes(reason, target_prediction, self.map_features_to_id_binaries)
+        return self.compiled_tree.reachable_values(reason)
 
     def predict_instance(self, instance):
         """
         Return the prediction (the classification) of an observation (instance) according to this tree
         """
-        return self.root.take_decisions_instance(instance)
+        return self.compiled_tree.predict_instance(instance)
+
+    def predict_batch(self, instances):
+        """
+        Return the prediction of each instance of a 2-D array according to this tree
+        """
+        instances = numpy.asarray(instances, dtype=numpy.float64)
+        if instances.ndim != 2:
+            raise ValueError("The instances parameter should be an array of two dimensions (not " + str(instances.ndim) + ").")
+        return self.compiled_tree.predict_batch(instances)
 
     def predict_implicant(self, implicant, map_features_to_id_binaries=None):
         return self.take_decisions_binary_representation(implicant, self.map_features_to_id_binaries)
@@ -313,8 +449,8 @@ class DecisionTree(BinaryMapping):
         """
         Return the prediction (the classification) of an binary representation according to this tree
         """
-        if map_features_to_id_binaries is None:
-            map_features_to_id_binaries = self.map_features_to_id_binaries
+        if map_features_to_id_binaries is None or map_features_to_id_binaries is self.map_features_to_id_binaries:
+            return self.compiled_tree.predict_implicant(binary_representation)
         return self.root.take_decisions_binary_representation(binary_representation, map_features_to_id_binaries)
 
 
@@ -334,11 +470,22 @@ class DecisionTree(BinaryMapping):
         # Warning here, compute the prediction for a tree, not for a forest, this is not will exist !
         if target_prediction is None:
             target_prediction = self.predict_instance(instance)
-        # Start to create the DNF according to the method TSEITIN or COMPLEMENTARY
-        dnf = []
         if self.root.is_leaf():
             return []
-            
+
+        # The CNF only depends on the target prediction and on the encoding: it is computed once.
+        # The formatted CNF is shared (tuples), the other one is copied since callers add literals to its clauses.
+        key = (tree_encoding, code_prediction, target_prediction, format)
+        if key not in self._cnf_cache:
+            cnf = self._to_CNF(target_prediction, tree_encoding, code_prediction)
+            self._cnf_cache[key] = CNFencoding.format(cnf) if format else tuple(tuple(clause) for clause in cnf)
+        return self._cnf_cache[key] if format else [list(clause) for clause in self._cnf_cache[key]]
+
+
+    def _to_CNF(self, target_prediction, tree_encoding, code_prediction):
+        # Start to create the DNF according to the method TSEITIN or COMPLEMENTARY
+        dnf = []
+
         for node in self.compute_nodes_with_leaves(self.root):
             if node.left.is_leaf() and \
                     ((code_prediction and node.left.is_prediction(target_prediction))
@@ -351,8 +498,8 @@ class DecisionTree(BinaryMapping):
                 dnf.append(self.create_cube(node, TypeLeaf.RIGHT))
 
         if tree_encoding == Encoding.COMPLEMENTARY:
-            return CNFencoding.format(CNFencoding.complementary(dnf)) if format else CNFencoding.complementary(dnf)
-        return CNFencoding.format(CNFencoding.tseitin(dnf)) if format else CNFencoding.tseitin(dnf)
+            return CNFencoding.complementary(dnf)
+        return CNFencoding.tseitin(dnf)
 
 
     def create_cube(self, node, type_leaf):
@@ -0,0 +1,195 @@
+import numpy
+
+from pyxai.sources.core.structure.compiledTree import LEAF
+
+
+class IncrementalImplicant:
+    """
+    Check if an implicant (a set of literals, partial or not) is still an implicant when some of its literals are removed or added, without
+    evaluating the whole model again. The node values of all trees are kept (see CompiledForest.evaluate()): when the sign of a variable
+    changes, only the nodes that test this variable and their ancestors are computed again, and only the trees whose root value changes are
+    given to _change_trees(), that updates the aggregate (votes or weights) in place.
+
+    A subclass gives the node values (_columns()), the aggregate of the trees (_initialize_trees() and _change_trees()) and the verdict
+    (is_implicant()).
+    """
+
+
+    def __init__(self, compiled_forest, implicant):
+        """
+        Args:
+            compiled_forest (CompiledForest): the trees of the model.
+            implicant (Iterable[int]): the literals at the beginning.
+        """
+        self.compiled_forest = compiled_forest
+        self.signs = compiled_forest.signs(implicant)
+        self._dirty = numpy.zeros(len(compiled_forest.lefts), dtype=bool)  # nodes to compute again
+        self.columns = self._columns()
+        compiled_forest.evaluate(self.signs, self.columns)
+        self._initialize_trees([values[compiled_forest.roots] for values, _ in self.columns])
+
+
+    def update(self, removed=(), added=()):
+        """
+        Remove and add literals (the literals removed are taken into account first).
+        """
+        compiled_forest = self.compiled_forest
+        variables = []
+        for literal, sign in [(literal, 0) for literal in removed] + [(literal, 1 if literal > 0 else -1) for literal in added]:
+            id_variable = abs(literal)
+            if id_variable > compiled_forest.n_variables:
+                continue
+            if sign == 0 and self.signs[id_variable] != (1 if literal > 0 else -1):
+                continue  # this literal is not in the implicant
+            if self.signs[id_variable] != sign:
+                self.signs[id_variable] = sign
+                variables.append(id_variable)
+
+        rows = compiled_forest.variable_rows(variables)
+        if rows.size == 0:
+            return
+        self._dirty[rows] = True
+        levels = compiled_forest.levels
+        # The deepest nodes first: the values of their children are up to date.
+        for level in levels[len(levels) - 1 - int(compiled_forest.depths[rows].max()):]:
+            rows = level[self._dirty[level]]
+            if rows.size == 0:
+                continue
+            self._dirty[rows] = False
+            previous_values = [values[rows] for values, _ in self.columns]
+            compiled_forest.evaluate_rows(rows, self.signs, self.columns)
+            changed = numpy.zeros(rows.size, dtype=bool)
+            for (values, _), previous in zip(self.columns, previous_values):
+                changed |= values[rows] != previous
+            parents = compiled_forest.parents[rows]
+            self._dirty[parents[changed & (parents != LEAF)]] = True
+            changed_roots = changed & (parents == LEAF)
+            if changed_roots.any():
+                roots = rows[changed_roots]
+                self._change_trees(compiled_forest.tree_indexes(roots), [previous[changed_roots] for previous in previous_values],
+                                   [values[roots] for values, _ in self.columns])
+
+
+    def remove(self, literal):
+        self.update(removed=(literal,))
+
+
+    def add(self, literal):
+        self.update(added=(literal,))
+
+
+    def set_literals(self, implicant):
+        """
+        Replace the current literals by the ones of the implicant (only the variables whose sign changes are taken into account).
+        """
+        signs = self.compiled_forest.signs(implicant)
+        differences = numpy.flatnonzero(signs != self.signs)
+        self.update(removed=[id_variable * int(self.signs[id_variable]) for id_variable in differences if self.signs[id_variable] != 0],
+                    added=[id_variable * int(signs[id_variable]) for id_variable in differences if signs[id_variable] != 0])
+
+
+    def _columns(self):
+        raise NotImplementedError
+
+
+    def _initialize_trees(self, root_values):
+        pass
+
+
+    def _change_trees(self, trees, previous_root_values, root_values):
+        pass
+
+
+    def is_implicant(self):
+        raise NotImplementedError
+
+
+class IncrementalImplicantVotes(IncrementalImplicant):
+    """
+    Incremental implicant check for a decision tree or a random forest (see RandomForest.is_implicant): the value of a node is the set of the
+    classes of its reachable leaves (a bit mask). With plurality set to False (decision tree and binary random forest), the implicant has to
+    make the majority of the trees predict the target class whatever the extension. With plurality set to True (multi-class random forest),
+    the target class has to win the vote counting, for each tree, all its reachable classes (except the target class if other classes are
+    reachable).
+    """
+
+
+    def __init__(self, compiled_forest, implicant, target_prediction, *, n_classes=2, plurality=False):
+        self.target_prediction = target_prediction
+        self.n_classes = n_classes
+        self.plurality = plurality
+        self.target_mask = 1 << target_prediction
+        super().__init__(compiled_forest, implicant)
+
+
+    def _columns(self):
+        leaves = self.compiled_forest.leaves
+        classes = numpy.where(leaves, self.compiled_forest.values, 0).astype(numpy.int64)
+        if self.n_classes < 63:
+            return [(numpy.where(leaves, numpy.left_shift(1, classes), 0), numpy.bitwise_or)]
+        # Python integers when the classes do not fit in 63 bits
+        masks = numpy.zeros(len(classes), dtype=object)
+        masks[leaves] = [1 << cls for cls in classes[leaves].tolist()]
+        return [(masks, numpy.bitwise_or)]
+
+
+    def _count(self, masks):
+        # The number of trees that predict the target class whatever the extension, and the votes of the trees for each class
+        alone = masks == self.target_mask
+        n_trues = int(numpy.count_nonzero(alone))
+        if not self.plurality:
+            return n_trues, None
+        count_classes = [int(numpy.count_nonzero(masks & (1 << cls))) for cls in range(self.n_classes)]
+        count_classes[self.target_prediction] = n_trues
+        return n_trues, count_classes
+
+
+    def _initialize_trees(self, root_values):
+        self.n_trues, self.count_classes = self._count(root_values[0])
+
+
+    def _change_trees(self, trees, previous_root_values, root_values):
+        previous_n_trues, previous_count_classes = self._count(previous_root_values[0])
+        n_trues, count_classes = self._count(root_values[0])
+        self.n_trues += n_trues - previous_n_trues
+        if self.plurality:
+            self.count_classes = [count + new - previous for count, new, previous in zip(self.count_classes, count_classes, previous_count_classes)]
+
+
+    def is_implicant(self):
+        if not self.plurality:
+            return self.n_trues > int(len(self.compiled_forest.roots) / 2)
+        return all(self.count_classes[self.target_prediction] > self.count_classes[i] or i == self.target_prediction for i in range(self.n_classes))
+
+
+class IncrementalImplicantWeights(IncrementalImplicant):
+    """
+    Incremental implicant check for boosted trees: the values of a node are the minimum and the maximum weights of its reachable leaves.
+    The verdict is given by the function is_implicant_weights(min_weights, max_weights), that takes the lists of the minimum and maximum
+    weights of all trees (see ExplainerBT._is_implicant_weights()). The weights of the trees are updated in place, but the sums are done again
+    at each call in the order of the trees: the result is exactly the one of a complete evaluation (no rounding error accumulates).
+    """
+
+
+    def __init__(self, compiled_forest, implicant, is_implicant_weights):
+        self.is_implicant_weights = is_implicant_weights
+        super().__init__(compiled_forest, implicant)
+
+
+    def _columns(self):
+        return [(self.compiled_forest.values.copy(), numpy.minimum), (self.compiled_forest.values.copy(), numpy.maximum)]
+
+
+    def _initialize_trees(self, root_values):
+        self.min_weights = root_values[0].tolist()
+        self.max_weights = root_values[1].tolist()
+
+
+    def _change_trees(self, trees, previous_root_values, root_values):
+        for tree, min_weight, max_weight in zip(trees.tolist(), root_values[0].tolist(), root_values[1].tolist()):
+            self.min_weights[tree] = min_weight
+            self.max_weights[tree] = max_weight
+
+
+    def is_implicant(self):
+        return self.is_implicant_weights(self.min_weights, self.max_weights)
@@ -0,0 +1,244 @@
+import numpy
+
+NEGATIVE = 255  # -1 in the bytes of the sign vector
+
+
+class LiteralSet:
+    """
+    Compact set of literals (a reason, an implicant or a binary representation), with at most one literal for each variable. The literals are
+    stored in a sign vector indexed by the variable ids: 1 (resp. -1) if the variable (resp. its negation) is in the set, 0 otherwise. The
+    vector is a bytearray (fast to read one element at a time from Python) and signs is a NumPy int8 view on the same memory (for the
+    vectorized operations): membership, insertion and removal are O(1) and the set operations are done by NumPy.
+
+    The order of insertion of the literals is kept: iterating over the set (or tuple(literal_set)) gives the literals in this order and index()
+    gives the position of a literal in it. The explainers take and return tuples of literals: a LiteralSet is only used inside the methods.
+    """
+
+    __slots__ = ("_buffer", "signs", "_positions", "_size", "_next_position")
+
+
+    def __init__(self, literals=(), n_variables=0):
+        """
+        Args:
+            literals (Iterable[int]): the literals, in their order. If a variable appears several times, its last literal is kept.
+            n_variables (int): the number of variables for which some memory is reserved (the set grows if needed).
+        """
+        literals = numpy.fromiter(literals, dtype=numpy.int64)
+        id_variables = numpy.abs(literals)
+        if 0 in id_variables:
+            raise ValueError("0 is not a literal.")
+        self._allocate(max(n_variables, int(id_variables.max()) if len(id_variables) != 0 else 0))
+        self.signs[id_variables] = numpy.sign(literals)
+        self._positions[id_variables] = numpy.arange(len(literals))
+        self._size = int(numpy.count_nonzero(self.signs))
+        self._next_position = len(literals)
+
+
+    @staticmethod
+    def of(literals, n_variables=0):
+        """
+        Return literals if it is already a LiteralSet, a new LiteralSet otherwise.
+        """
+        return literals if isinstance(literals, LiteralSet) else LiteralSet(literals, n_variables)
+
+
+    @staticmethod
+    def from_signs(signs):
+        """
+        Create a LiteralSet from a sign vector (the element 0 is not used), the literals being in the order of the variables.
+        """
+        id_variables = numpy.flatnonzero(signs)
+        return LiteralSet(id_variables * numpy.sign(signs[id_variables]), len(signs) - 1)
+
+
+    def _allocate(self, n_variables):
+        self._buffer = bytearray(n_variables + 1)
+        self.signs = numpy.frombuffer(self._buffer, dtype=numpy.int8)
+        self._positions = numpy.full(n_variables + 1, -1, dtype=numpy.int64)
+
+
+    def _grow(self, n_variables):
+        signs, positions = self.signs, self._positions
+        self._allocate(max(n_variables, 2 * (len(signs) - 1)))
+        self.signs[:len(signs)] = signs
+        self._positions[:len(positions)] = positions
+
+
+    @property
+    def n_variables(self):
+        return len(self._buffer) - 1
+
+
+    def sign(self, id_variable):
+        """
+        Return 1 (resp. -1) if the variable (resp. its negation) is in the set, 0 otherwise.
+        """
+        if id_variable >= len(self._buffer):
+            return 0
+        sign = self._buffer[id_variable]
+        return -1 if sign == NEGATIVE else sign
+
+
+    def literal(self, id_variable):
+        """
+        Return the literal of the variable that is in the set, 0 if there is none.
+        """
+        return self.sign(id_variable) * id_variable
+
+
+    def signs_of(self, id_variables):
+        """
+        Return an int8 array giving the sign of each variable of id_variables (0 for the variables out of the set, including 0).
+        """
+        id_variables = numpy.asarray(id_variables, dtype=numpy.int64)
+        inside = id_variables < len(self.signs)
+        if inside.all():
+            return self.signs[id_variables]
+        signs = numpy.zeros(len(id_variables), dtype=numpy.int8)
+        signs[inside] = self.signs[id_variables[inside]]
+        return signs
+
+
+    def sign_vector(self, n_variables):
+        """
+        Return a copy of the sign vector of n_variables + 1 elements (the literals of the variables greater than n_variables are ignored).
+        """
+        signs = numpy.zeros(n_variables + 1, dtype=numpy.int8)
+        n = min(n_variables + 1, len(self.signs))
+        signs[:n] = self.signs[:n]
+        return signs
+
+
+    def __contains__(self, literal):
+        if literal > 0:
+            return literal < len(self._buffer) and self._buffer[literal] == 1
+        return -literal < len(self._buffer) and self._buffer[-literal] == NEGATIVE
+
+
+    def __len__(self):
+        return self._size
+
+
+    def __iter__(self):
+        id_variables = numpy.flatnonzero(self.signs)
+        id_variables = id_variables[numpy.argsort(self._positions[id_variables], kind="stable")]
+        return iter((id_variables * self.signs[id_variables]).tolist())
+
+
+    def __repr__(self):
+        return "LiteralSet(" + str(tuple(self)) + ")"
+
+
+    def __eq__(self, other):
+        if not isinstance(other, LiteralSet):
+            return NotImplemented
+        n_variables = max(self.n_variables, other.n_variables)
+        return numpy.array_equal(self.sign_vector(n_variables), other.sign_vector(n_variables))
+
+
+    __hash__ = None
+
+
+    def __reduce__(self):
+        # The NumPy view has to share the memory of the bytearray: only the literals are pickled
+        return LiteralSet, (tuple(self),)
+
+
+    def index(self, literal):
+        """
+        Return the position of the literal in the order of insertion (the position given to the constructor for its literals).
+        """
+        if literal not in self:
+            raise ValueError(str(literal) + " is not in the set.")
+        return int(self._positions[abs(literal)])
+
+
+    def add(self, literal):
+        """
+        Add a literal. The opposite literal, if it is in the set, is replaced (the position is kept).
+        """
+        id_variable = abs(literal)
+        if id_variable == 0:
+            raise ValueError("0 is not a literal.")
+        if id_variable >= len(self._buffer):
+            self._grow(id_variable)
+        if self._buffer[id_variable] == 0:
+            self._positions[id_variable] = self._next_position
+            self._next_position += 1
+            self._size += 1
+        self._buffer[id_variable] = 1 if literal > 0 else NEGATIVE
+
+
+    def discard(self, literal):
+        if literal in self:
+            self._buffer[abs(literal)] = 0
+            self._size -= 1
+
+
+    def remove(self, literal):
+        if literal not in self:
+            raise KeyError(literal)
+        self.discard(literal)
+
+
+    def copy(self):
+        literal_set = LiteralSet.__new__(LiteralSet)
+        literal_set._buffer = bytearray(self._buffer)
+        literal_set.signs = numpy.frombuffer(literal_set._buffer, dtype=numpy.int8)
+        literal_set._positions = self._positions.copy()
+        literal_set._size = self._size
+        literal_set._next_position = self._next_position
+        return literal_set
+
+
+    def _with_signs(self, signs):
+        # A copy of self (for the order of the literals) with other signs
+        literal_set = self.copy()
+        if len(literal_set.signs) < len(signs):
+            literal_set._grow(len(signs) - 1)
+        literal_set.signs[:] = 0
+        literal_set.signs[:len(signs)] = signs
+        literal_set._size = int(numpy.count_nonzero(signs))
+        return literal_set
+
+
+    def _aligned(self, other):
+        other = LiteralSet.of(other)
+        n_variables = max(self.n_variables, other.n_variables)
+        return self.sign_vector(n_variables), other.sign_vector(n_variables)
+
+
+    def union(self, other):
+        signs, other_signs = self._aligned(other)
+        if numpy.any(signs * other_signs < 0):
+            raise ValueError("The union contains a literal and its negation.")
+        result = LiteralSet(self, len(signs) - 1)
+        for literal in LiteralSet.of(other):
+            result.add(literal)
+        return result
+
+
+    def intersection(self, other):
+        signs, other_signs = self._aligned(other)
+        return self._with_signs(numpy.where(signs == other_signs, signs, 0))
+
+
+    def difference(self, other):
+        signs, other_signs = self._aligned(other)
+        return self._with_signs(numpy.where(signs == other_signs, 0, signs))
+
+
+    def issubset(self, other):
+        signs, other_signs = self._aligned(other)
+        return bool(numpy.all((signs == 0) | (signs == other_signs)))
+
+
+    def __neg__(self):
+        # The opposite literals, in the same order
+        return self._with_signs(-self.signs)
+
+
+    __or__ = union
+    __and__ = intersection
+    __sub__ = difference
+    __le__ = issubset
@@ -0,0 +1,223 @@
+import json
+import os
+import struct
+import tempfile
+
+import numpy
+
+from pyxai.sources.core.structure.boostedTrees import BoostedTrees, BoostedTreesRegression
+from pyxai.sources.core.structure.compiledTree import CompiledForest, CompiledTree, FOREST_COLUMNS, OPERATOR_CODES, OPERATORS
+from pyxai.sources.core.structure.decisionTree import DecisionTree
+from pyxai.sources.core.structure.randomForest import RandomForest
+
+
+class ModelFile:
+    """
+    Native file of a model (DecisionTree, RandomForest, BoostedTrees or BoostedTreesRegression) already converted: the node tables of the
+    trees (see CompiledTree) with their binary variables and the table map_id_binaries_to_features are stored as flat arrays, after a JSON
+    header giving the structure of the model, some metadata and the place of each array. The arrays are read through a memory map: loading
+    a model neither parses nor converts anything, the compiled trees use the pages of the file (no copy), and the processes that load the
+    same file share them.
+
+    File: MAGIC, the size of the header (8 bytes, little-endian), the header (JSON), then the arrays, each one aligned on ALIGNMENT bytes
+    (the offsets of the header are given from the first multiple of ALIGNMENT after the header).
+    The columns of all the trees are concatenated: the rows of the tree i are tree_offsets[i]:tree_offsets[i + 1]. The binary variable i
+    (from 1) is the condition (binary_features[i], OPERATORS[binary_operators[i]], binary_thresholds[i]), None if binary_features[i] is 0.
+    """
+
+    MAGIC = b"PYXAIMDL"
+    VERSION = 1
+    EXTENSION = ".pyxai"
+    ALIGNMENT = 64
+    MODELS = {model.__name__: model for model in (DecisionTree, RandomForest, BoostedTrees, BoostedTreesRegression)}
+    COLUMNS = ("features", "thresholds", "operators", "lefts", "rights", "values", "id_binaries")
+
+
+    def __init__(self, filename):
+        if not os.path.isfile(filename):
+            raise FileNotFoundError("The file " + filename + " is not found.")
+        self.filename = filename
+        self._read(numpy.memmap(filename, dtype=numpy.uint8, mode="r"), "The file " + filename)
+
+
+    def _read(self, buffer, source):
+        # buffer: the bytes of the model (a read-only NumPy array), on which the arrays are views
+        if bytes(buffer[:len(ModelFile.MAGIC)]) != ModelFile.MAGIC:
+            raise ValueError(source + " is not a PyXAI model.")
+        header_size = struct.unpack("<Q", bytes(buffer[len(ModelFile.MAGIC):len(ModelFile.MAGIC) + 8]))[0]
+        self.header = json.loads(bytes(buffer[len(ModelFile.MAGIC) + 8:len(ModelFile.MAGIC) + 8 + header_size]).decode("utf-8"))
+        if self.header["version"] != ModelFile.VERSION:
+            raise ValueError("The version " + str(self.header["version"]) + " of the model of " + source.lower() + " is not supported.")
+        self._start = ModelFile._data_start(header_size)
+        self._buffer = buffer
+        self.arrays = {name: self._array(*description) for name, description in self.header["arrays"].items()}
+
+
+    @staticmethod
+    def _data_start(header_size):
+        # The arrays start after the header, at the first multiple of ALIGNMENT
+        return -(-(len(ModelFile.MAGIC) + 8 + header_size) // ModelFile.ALIGNMENT) * ModelFile.ALIGNMENT
+
+
+    def _array(self, dtype, shape, offset):
+        dtype = numpy.dtype(dtype)
+        start = self._start + offset
+        return self._buffer[start:start + int(numpy.prod(shape)) * dtype.itemsize].view(dtype).reshape(shape)
+
+
+    @property
+    def metadata(self):
+        return self.header["metadata"]
+
+
+    def model(self, learner_information=None, id_solver_results=0):
+        """
+        Create the model of the file. The trees are built from the arrays of the file (see CompiledTree.from_columns()) and their nodes are
+        only created if they are used.
+        """
+        structure = self.header["model"]
+        binary_mapping = self.binary_mapping()
+        trees = [DecisionTree(structure["n_features"], self.compiled_tree(i), target_class, id_solver_results=id_solver_results,
+                              learner_information=learner_information, force_features_equal_to_binaries=structure["force_features_equal_to_binaries"],
+                              binary_mapping=binary_mapping) for i, target_class in enumerate(structure["target_classes"])]
+
+        name = structure["type"]
+        if name == DecisionTree.__name__:
+            return trees[0]
+        if name == BoostedTreesRegression.__name__:
+            model = BoostedTreesRegression(trees, learner_information=learner_information, binary_mapping=binary_mapping)
+        else:
+            model = ModelFile.MODELS[name](trees, n_classes=structure["n_classes"], learner_information=learner_information,
+                                           binary_mapping=binary_mapping)
+        if "forest_lefts" in self.arrays:
+            model._compiled_forest = self.compiled_forest([tree.compiled_tree for tree in trees])
+        return model
+
+
+    def compiled_tree(self, index):
+        """
+        Return the compiled tree of the tree index, built on the arrays (see CompiledTree.from_columns()).
+        """
+        offsets = self.arrays["tree_offsets"]
+        start, stop = int(offsets[index]), int(offsets[index + 1])
+        columns = [self.arrays[name][start:stop] for name in ModelFile.COLUMNS]
+        integer_values = self.header["model"]["integer_values"][index]
+        if integer_values != (columns[5].dtype.kind == "i"):
+            columns[5] = columns[5].astype(numpy.int64 if integer_values else numpy.float64)
+        return CompiledTree.from_columns(*columns)
+
+
+    def compiled_forest(self, compiled_trees):
+        """
+        Return the compiled forest of the compiled trees of the model, built on the arrays (the model has to be written with compiled_forest).
+        """
+        arrays = {"forest_values": self.arrays["values"], **self.arrays}  # forest_values is not written when values are already floats
+        columns = {name: arrays["forest_" + name.lstrip("_")] for name in FOREST_COLUMNS}
+        columns["levels"] = self.arrays["forest_levels"]
+        columns["level_sizes"] = self.arrays["forest_level_sizes"]
+        return CompiledForest.from_columns(compiled_trees, self.arrays["tree_offsets"][:-1], self.arrays["id_binaries"], columns)
+
+
+    def binary_mapping(self):
+        """
+        Return the tuple (map_id_binaries_to_features, map_features_to_id_binaries) of the model. n_appears_per_tree is not kept (None).
+        """
+        arrays = self.arrays
+        map_id_binaries_to_features = [0]
+        map_features_to_id_binaries = {}
+        for id_binary, (id_feature, operator_code, threshold, n_appears) in enumerate(zip(
+                arrays["binary_features"].tolist(), arrays["binary_operators"].tolist(), arrays["binary_thresholds"].tolist(),
+                arrays["binary_n_appears"].tolist()), start=1):
+            if id_feature == 0:
+                map_id_binaries_to_features.append(None)
+                continue
+            condition = (id_feature, OPERATORS[operator_code], threshold)
+            map_id_binaries_to_features.append(condition)
+            map_features_to_id_binaries[condition] = [id_binary, n_appears, None]
+        return map_id_binaries_to_features, map_features_to_id_binaries
+
+
+    @staticmethod
+    def write(filename, model, metadata=None, arrays=None, compiled_forest=False):
+        """
+        Write a model in a file (atomically: the file is complete or not changed).
+
+        Args:
+            filename (str): the file.
+            model (DecisionTree | RandomForest | BoostedTrees | BoostedTreesRegression): the model.
+            metadata (dict, optional): some data serializable in JSON (see the property metadata).
+            arrays (dict[str, numpy.ndarray], optional): some other arrays to keep in the file (see the attribute arrays).
+            compiled_forest (bool, optional): keep also the compiled forest of an ensemble (see CompiledForest), that is then not computed
+            again when the model is loaded, at the price of a file about twice as large.
+        """
+        layout = ModelFile._layout(model, metadata, arrays, compiled_forest)
+        directory = os.path.dirname(os.path.abspath(filename))
+        descriptor, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                file.truncate(layout[-1])
+            buffer = numpy.memmap(temporary, dtype=numpy.uint8, mode="r+")
+            ModelFile._fill(buffer, *layout[:-1])
+            buffer.flush()
+            del buffer
+        except BaseException:
+            os.remove(temporary)
+            raise
+        os.replace(temporary, filename)
+
+
+    @staticmethod
+    def _layout(model, metadata, arrays, compiled_forest):
+        # The header, the arrays and the size of the bytes of a model
+        if type(model).__name__ not in ModelFile.MODELS:
+            raise ValueError("The model " + type(model).__name__ + " can not be saved in a model file.")
+        trees = getattr(model, "forest", [model])
+        compiled_trees = [tree.compiled_tree for tree in trees]
+        integer_values = [compiled_tree.values.dtype.kind == "i" for compiled_tree in compiled_trees]
+        columns = {name: numpy.concatenate([getattr(compiled_tree, name) for compiled_tree in compiled_trees]) for name in ModelFile.COLUMNS}
+        if not all(integer_values):
+            columns["values"] = columns["values"].astype(numpy.float64)
+
+        conditions = model.map_id_binaries_to_features[1:]
+        binaries = {"binary_features": numpy.asarray([0 if condition is None else condition[0] for condition in conditions], dtype=numpy.int64),
+                    "binary_operators": numpy.asarray([0 if condition is None else OPERATOR_CODES[condition[1]] for condition in conditions],
+                                                      dtype=numpy.int8),
+                    "binary_thresholds": numpy.asarray([numpy.nan if condition is None else condition[2] for condition in conditions],
+                                                       dtype=numpy.float64),
+                    "binary_n_appears": numpy.bincount(columns["id_binaries"], minlength=len(conditions) + 1)[1:len(conditions) + 1]}
+        tree_offsets = numpy.cumsum([0] + [compiled_tree.n_nodes for compiled_tree in compiled_trees]).astype(numpy.int64)
+        forest = {}
+        if compiled_forest and hasattr(model, "forest"):
+            forest = {"forest_" + name.lstrip("_"): array for name, array in model.compiled_forest.columns().items()}
+            if columns["values"].dtype == numpy.float64:
+                del forest["forest_values"]  # the same as values
+        all_arrays = {"tree_offsets": tree_offsets, **columns, **binaries, **forest, **({} if arrays is None else arrays)}
+
+        structure = {"type": type(model).__name__,
+                     "n_features": int(trees[0].n_features),
+                     "n_classes": getattr(model, "n_classes", None),
+                     "force_features_equal_to_binaries": bool(trees[0].force_features_equal_to_binaries),
+                     "target_classes": [numpy.asarray(tree.target_class).tolist() for tree in trees],
+                     "integer_values": integer_values}
+        descriptions = {}
+        offset = 0
+        for name, array in all_arrays.items():
+            array = numpy.ascontiguousarray(array)
+            all_arrays[name] = array
+            descriptions[name] = [array.dtype.str, list(array.shape), offset]
+            offset += -(-array.nbytes // ModelFile.ALIGNMENT) * ModelFile.ALIGNMENT
+        header = json.dumps({"version": ModelFile.VERSION, "model": structure, "metadata": {} if metadata is None else metadata,
+                             "arrays": descriptions}).encode("utf-8")
+        return header, all_arrays, descriptions, ModelFile._data_start(len(header)) + offset
+
+
+    @staticmethod
+    def _fill(buffer, header, all_arrays, descriptions):
+        # Write the bytes of a model (see _layout()) in buffer (a NumPy array of bytes, large enough)
+        start = ModelFile._data_start(len(header))
+        buffer[:len(ModelFile.MAGIC)] = numpy.frombuffer(ModelFile.MAGIC, dtype=numpy.uint8)
+        buffer[len(ModelFile.MAGIC):len(ModelFile.MAGIC) + 8] = numpy.frombuffer(struct.pack("<Q", len(header)), dtype=numpy.uint8)
+        buffer[len(ModelFile.MAGIC) + 8:len(ModelFile.MAGIC) + 8 + len(header)] = numpy.frombuffer(header, dtype=numpy.uint8)
+        for name, array in all_arrays.items():
+            position = start + descriptions[name][2]
+            buffer[position:position + array.nbytes] = array.reshape(-1).view(numpy.uint8)
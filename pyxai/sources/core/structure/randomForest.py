@@ -2,6 +2,7 @@ import numpy
 import os
 from math import floor
 from pysat.card import CardEnc, EncType
+from pyxai.sources.core.structure.literalSet import LiteralSet
 from pyxai.sources.core.structure.treeEnsembles import TreeEnsembles
 from pyxai.sources.core.structure.type import Encoding
 from pyxai.sources.core.tools.encoding import CNFencoding
@@ -9,10 +10,11 @@ from pyxai.sources.core.tools.encoding import CNFencoding
 
 class RandomForest(TreeEnsembles):
 
-    def __init__(self, forest, n_classes=2, learner_information=None):
-        super().__init__(forest, learner_information)
+    def __init__(self, forest, n_classes=2, learner_information=None, binary_mapping=None):
+        super().__init__(forest, learner_information, binary_mapping)
         self.n_classes = n_classes
         self.learner_information = learner_information
+        self._cnf_cache = {}  # dict[(method, n_variables, target_prediction, encodings...)] -> CNF, the CNFs only depend on these parameters
         # assert all(tree.type_tree is TypeTree.PREDICTION for tree in self.forest), "All trees in a random forest have to be of the type PREDICTION."
 
 
@@ -31,11 +33,30 @@ class RandomForest(TreeEnsembles):
         return numpy.argmax(n_votes)
 
 
+    def predict_proba_batch(self, instances):
+        """
+        Return, for each instance of a 2-D array, the proportion of trees voting for each class.
+        """
+        predictions = self.leaf_values_batch(instances).astype(numpy.int64)
+        n_votes = numpy.zeros((predictions.shape[0], self.n_classes))
+        for i in range(self.n_classes):
+            n_votes[:, i] = (predictions == i).sum(axis=1)
+        return n_votes / self.n_trees
+
+
+    def predict_batch(self, instances):
+        """
+        Return the prediction (the classification) of each instance of a 2-D array according to the trees
+        """
+        return numpy.argmax(self.predict_proba_batch(instances), axis=1)
+
+
     def predict_implicant(self, implicant):
         """
         Return the prediction (the classification) of an instance according to the trees
         """
         n_votes = numpy.zeros(self.n_classes)
+        implicant = LiteralSet.of(implicant)
         for tree in self.forest:
             n_votes[tree.take_decisions_binary_representation(implicant, self.map_features_to_id_binaries)] += 1
         return numpy.argmax(n_votes)
@@ -51,6 +72,7 @@ class RandomForest(TreeEnsembles):
 
 
     def is_implicant(self, implicant, prediction):
+        implicant = LiteralSet.of(implicant)  # Built once for all the trees
         if self.n_classes == 2:
             forest_implicant = [tree.is_implicant(implicant, prediction) for tree in self.forest]
             n_trees = len(forest_implicant)
@@ -78,11 +100,14 @@ class RandomForest(TreeEnsembles):
             target_prediction (_type_, optional): _description_. Defaults to None.
 
         Returns:
-            _type_: _description_
+            _type_: _description_. The CNF is computed once for each set of parameters and then taken from a cache: it must not be modified.
         """
         n_original_variables = len(binary_representation)
         if target_prediction is None:
-            target_prediction = self.take_decisions_instance(instance)
+            target_prediction = self.predict_instance(instance)
+        key = ("to_CNF", n_original_variables, target_prediction, tree_encoding, cardinality_encoding)
+        if key in self._cnf_cache:
+            return self._cnf_cache[key]
 
         cnf = []
         # We add firsly the cardinality constraint dealing with the votes of the trees in the forest.
@@ -133,10 +158,14 @@ class RandomForest(TreeEnsembles):
             else:
                 assert False, "Bad parameter for " + str(tree_encoding) + " !"
 
-        return CNFencoding.format(cnf)
+        self._cnf_cache[key] = CNFencoding.format(cnf)
+        return self._cnf_cache[key]
 
 
     def to_CNF_sufficient_reason_multi_classes(self, instance, binary_representation, target_prediction):
+        key = ("to_CNF_sufficient_reason_multi_classes", len(binary_representation), target_prediction)
+        if key in self._cnf_cache:
+            return self._cnf_cache[key]
         last_lit = len(binary_representation) + 1
         n_classes = self.n_classes
         n_trees = len(self.forest)
@@ -191,10 +220,14 @@ class RandomForest(TreeEnsembles):
         lits.extend([challengers[i] for i in range(n_trees)])
         hard_clauses.extend(CardEnc.atleast(lits=lits, encoding=EncType.seqcounter, bound=n_trees,
                                             top_id=last_lit).clauses)
-        return CNFencoding.format(hard_clauses)
+        self._cnf_cache[key] = CNFencoding.format(hard_clauses)
+        return self._cnf_cache[key]
 
 
     def to_CNF_majoritary_reason_multi_classes(self, instance, binary_representation, target_prediction):
+        key = ("to_CNF_majoritary_reason_multi_classes", len(binary_representation), target_prediction)
+        if key in self._cnf_cache:
+            return self._cnf_cache[key]
         last_lit = len(binary_representation) + 1
         n_classes = self.n_classes
         n_trees = len(self.forest)
@@ -231,4 +264,5 @@ class RandomForest(TreeEnsembles):
                 last_lit = CNFencoding.compute_max_id_variable(cnf)
                 hard_clauses.extend(cnf)
 
-        return CNFencoding.format(hard_clauses)
+        self._cnf_cache[key] = CNFencoding.format(hard_clauses)
+        return self._cnf_cache[key]
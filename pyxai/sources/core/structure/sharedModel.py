@@ -0,0 +1,107 @@
+import mmap
+import os
+import sys
+from multiprocessing import shared_memory
+
+import numpy
+
+from pyxai.sources.core.structure.modelFile import ModelFile
+
+# The shared models of this process, by name (see SharedModel.attach())
+_shared_models = {}
+
+
+class SharedModel(ModelFile):
+    """
+    A model (DecisionTree, RandomForest, BoostedTrees or BoostedTreesRegression) in a block of shared memory (multiprocessing.shared_memory),
+    with the layout of a model file (see ModelFile) including the compiled forest of an ensemble: the node tables of the trees, their binary
+    variables and the table map_id_binaries_to_features as flat arrays. The trees of model() are built on the memory of the block, without any
+    copy: the processes that use the model share a single copy of the nodes.
+
+    The process that creates the block (SharedModel(model)) owns it and calls unlink() when the model is not needed any more. The other
+    processes attach to it by its name (SharedModel.attach(name)). Pickling a handle, or a compiled tree or a compiled forest built on the
+    block, only pickles the name of the block: an explainer of a model of the block is sent to the processes of Explainer.explain_batch()
+    without its node tables. The C++ trees of the greedy algorithms are still built by each process.
+    """
+
+
+    def __init__(self, model, metadata=None):
+        """
+        Put the model in a new block of shared memory.
+
+        Args:
+            model (DecisionTree | RandomForest | BoostedTrees | BoostedTreesRegression): the model.
+            metadata (dict, optional): some data serializable in JSON (see the property metadata).
+        """
+        header, all_arrays, descriptions, size = ModelFile._layout(model, metadata, None, True)
+        self._memory = shared_memory.SharedMemory(create=True, size=size)
+        buffer = SharedModel._map(self._memory, writable=True)
+        ModelFile._fill(buffer, header, all_arrays, descriptions)
+        buffer.flags.writeable = False
+        self.name = self._memory.name
+        self._read(buffer, "The shared memory " + self.name)
+        _shared_models[self.name] = self
+
+
+    @staticmethod
+    def attach(name):
+        """
+        Return the shared model of the block of shared memory name (the same handle for each call in a process).
+        Before Python 3.13, the resource tracker of a process that is not started by the one of the block (with multiprocessing) destroys
+        the block when this process ends.
+        """
+        shared_model = _shared_models.get(name)
+        if shared_model is None:
+            options = {"track": False} if sys.version_info >= (3, 13) else {}
+            shared_model = SharedModel.__new__(SharedModel)
+            shared_model._memory = shared_memory.SharedMemory(name=name, **options)
+            shared_model.name = name
+            shared_model._read(SharedModel._map(shared_model._memory, writable=False), "The shared memory " + name)
+            _shared_models[name] = shared_model
+        return shared_model
+
+
+    @staticmethod
+    def _map(memory, writable):
+        # A mapping of the block of its own, kept alive by the arrays built on it (the one of SharedMemory can not be closed while some
+        # arrays use it), as a NumPy array of bytes
+        if os.name == "nt":
+            mapping = mmap.mmap(-1, memory.size, tagname=memory.name, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        else:
+            mapping = mmap.mmap(memory._fd, memory.size, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        memory.close()
+        return numpy.frombuffer(mapping, dtype=numpy.uint8)
+
+
+    def __reduce__(self):
+        return SharedModel.attach, (self.name,)
+
+
+    def compiled_tree(self, index):
+        compiled_tree = super().compiled_tree(index)
+        compiled_tree._shared = (self, index)
+        return compiled_tree
+
+
+    def compiled_forest(self, compiled_trees):
+        compiled_forest = super().compiled_forest(compiled_trees)
+        compiled_forest._shared = self
+        return compiled_forest
+
+
+    def close(self):
+        """
+        Forget the handle in this process. The memory of the block is released when the models built on it are deleted.
+        """
+        _shared_models.pop(self.name, None)
+        self._buffer = None
+        self.arrays = None
+
+
+    def unlink(self):
+        """
+        Destroy the block (by the process that created it): no process can attach to it any more, the ones already attached keep it until
+        they release it (see close()).
+        """
+        self.close()
+        self._memory.unlink()
@@ -1,6 +1,10 @@
+import hashlib
 from typing import Iterable
 
+import numpy
+
 from pyxai.sources.core.structure.binaryMapping import BinaryMapping
+from pyxai.sources.core.structure.compiledTree import CompiledForest
 from pyxai.sources.core.structure.decisionTree import DecisionTree
 
 
@@ -12,8 +16,13 @@ class TreeEnsembles(BinaryMapping):
     """
 
 
-    def __init__(self, forest, learner_information):
+    def __init__(self, forest, learner_information, binary_mapping=None):
+        """
+        When binary_mapping, the tuple (map_id_binaries_to_features, map_features_to_id_binaries), is given, the trees already use these
+        maps (see ModelFile): they are neither computed nor compiled again.
+        """
         self.forest = forest
+        self._fingerprint = None  # (fingerprints of the trees, fingerprint of the ensemble), see fingerprint()
         self.n_trees = len(forest)
         self.n_features = forest[0].n_features
         self.force_features_equal_to_binaries = forest[0].force_features_equal_to_binaries
@@ -31,6 +40,11 @@ class TreeEnsembles(BinaryMapping):
         assert all(tree.force_features_equal_to_binaries == self.force_features_equal_to_binaries for tree in
                    forest), "All trees in the forest have to have the same force_features_equal_to_binaries value."
 
+        if binary_mapping is not None:
+            self.map_id_binaries_to_features, self.map_features_to_id_binaries = binary_mapping
+            super().__init__(self.map_id_binaries_to_features, self.map_features_to_id_binaries, learner_information)
+            self._compiled_forest = None
+            return
         self.map_id_binaries_to_features, self.map_features_to_id_binaries = self.compute_id_binaries(self.force_features_equal_to_binaries)
         super().__init__(self.map_id_binaries_to_features, self.map_features_to_id_binaries, learner_information)
 
@@ -38,6 +52,66 @@ class TreeEnsembles(BinaryMapping):
         for tree in self.forest:
             tree.map_id_binaries_to_features = self.map_id_binaries_to_features
             tree.map_features_to_id_binaries = self.map_features_to_id_binaries
+            tree.compile()
+        self._compiled_forest = None
+
+
+    @property
+    def compiled_forest(self):
+        """
+        The node tables of all the trees in a single one (see CompiledForest), built again when a tree is compiled again.
+        """
+        compiled_forest = getattr(self, "_compiled_forest", None)
+        if compiled_forest is None or any(tree.compiled_tree is not compiled_tree
+                                          for tree, compiled_tree in zip(self.forest, compiled_forest.compiled_trees)):
+            compiled_forest = CompiledForest([tree.compiled_tree for tree in self.forest])
+            self._compiled_forest = compiled_forest
+        return compiled_forest
+
+
+    def raw_arrays_for_CPP(self):
+        """
+        Return the arguments of c_explainer.add_trees() that follow the explainer: the node table of the compiled forest (roots, lefts, rights,
+        id_binaries, values) and the target class of each tree, as NumPy arrays that the C++ library reads without any copy.
+        """
+        compiled_forest = self.compiled_forest
+        columns = [numpy.ascontiguousarray(column, dtype=numpy.int64)
+                   for column in (compiled_forest.roots, compiled_forest.lefts, compiled_forest.rights, compiled_forest.id_binaries)]
+        values = numpy.ascontiguousarray(compiled_forest.values, dtype=numpy.float64)
+        target_classes = numpy.asarray([tree.target_class_for_CPP() for tree in self.forest], dtype=numpy.int64)
+        return (*columns, values, target_classes)
+
+
+    def leaf_values_batch(self, instances):
+        """
+        Return a 2-D array giving, for each instance (lines), the leaf value reached in each tree (columns).
+
+        @param instances: a 2-D array-like, one instance per line.
+        """
+        instances = numpy.asarray(instances, dtype=numpy.float64)
+        if instances.ndim != 2:
+            raise ValueError("The instances parameter should be an array of two dimensions (not " + str(instances.ndim) + ").")
+        return numpy.column_stack([tree.compiled_tree.predict_batch(instances) for tree in self.forest])
+
+
+    def fingerprint(self):
+        """
+        A hash of the trees of the ensemble (see DecisionTree.fingerprint()), that is the same in every process.
+        It is computed again only when the fingerprint of a tree changes.
+        """
+        tree_fingerprints = tuple(tree.fingerprint() for tree in self.forest)
+        memo = getattr(self, "_fingerprint", None)
+        if memo is not None and memo[0] == tree_fingerprints:
+            return memo[1]
+        digest = hashlib.sha256(type(self).__name__.encode())
+        digest.update(repr(self.n_classes).encode())
+        for tree_fingerprint in tree_fingerprints:
+            digest.update(tree_fingerprint.encode())
+        extras = getattr(self.learner_information, "extras", None)
+        if isinstance(extras, dict) and "base_score" in extras:
+            digest.update(repr(float(extras["base_score"])).encode())
+        self._fingerprint = (tree_fingerprints, digest.hexdigest())
+        return self._fingerprint[1]
 
 
     def redundancy_analysis(self):
@@ -47,8 +121,12 @@ class TreeEnsembles(BinaryMapping):
         redundancy = []
 
         for key in self.map_features_to_id_binaries.keys():
-            n_appears_in_the_same_tree = max(self.map_features_to_id_binaries[key][2])
-            n_appears_in_distinct_tree = sum(1 if value > 0 else 0 for value in self.map_features_to_id_binaries[key][2])
+            n_appears_per_tree = self.map_features_to_id_binaries[key][2]
+            if n_appears_per_tree is None:  # not kept in a model file (see ModelFile)
+                id_binary = self.map_features_to_id_binaries[key][0]
+                n_appears_per_tree = [int(numpy.count_nonzero(tree.compiled_tree.id_binaries == id_binary)) for tree in self.forest]
+            n_appears_in_the_same_tree = max(n_appears_per_tree)
+            n_appears_in_distinct_tree = sum(1 if value > 0 else 0 for value in n_appears_per_tree)
             print("for key:", key)
             print("n_appears:", self.map_features_to_id_binaries[key][1])
             print("n_appears_in_the_same_tree:", n_appears_in_the_same_tree)
@@ -86,15 +164,19 @@ class TreeEnsembles(BinaryMapping):
         for tree in self.forest:
             map_features_to_id_binaries.update(tree.map_features_to_id_binaries)
 
+        # The number of appearances of each key in each tree (one pass over the keys of each tree)
+        appears_per_tree = {key: [0] * len(self.forest) for key in map_features_to_id_binaries.keys()}
+        for id_tree, tree in enumerate(self.forest):
+            for key, value in tree.map_features_to_id_binaries.items():
+                appears_per_tree[key][id_tree] = value[1]
+
         # Now we define the good value [id_binary, n_appears, n_appears_per_tree] for each key
         for key in map_features_to_id_binaries.keys():  # the keys are of the type: (id_feature, operator, threshold)
             if not force_features_equal_to_binaries:  # Do not touch this when force_features_equal_to_binaries is True because id_binary do not move
                 map_features_to_id_binaries[key][0] = id_binary
 
-            values = [tree.map_features_to_id_binaries.get(key) for tree in self.forest]
-            n_appears = sum(value[1] for value in values if value is not None)
-            n_appears_per_tree = [value[1] if value is not None else 0 for value in values]
-            map_features_to_id_binaries[key][1] = n_appears
+            n_appears_per_tree = appears_per_tree[key]
+            map_features_to_id_binaries[key][1] = sum(n_appears_per_tree)
             map_features_to_id_binaries[key][2] = n_appears_per_tree
 
             if force_features_equal_to_binaries is False:
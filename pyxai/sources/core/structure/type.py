@@ -193,7 +193,7 @@ class OperatorCondition(Enum):
 
 
     def __hash__(self) -> int:
-        return hash(self.__str__())
+        return hash(self._name_)  # the hash of str(self), without the property name (the conditions are dictionary keys)
 
 
     def __eq__(self, other):
@@ -229,6 +229,18 @@ class TypeTheory(Enum):
     def __str__(self):
         return self.name
 
+@unique
+class TheoryEncoding(Enum):
+    """
+    Encoding of "at most one category" for each one hot encoded categorical feature in the theory: PAIRWISE gives one binary clause for
+    each pair of binary variables (quadratic), the other ones are the encodings of PySAT's CardEnc.atmost (a linear number of clauses, with
+    some auxiliary variables; about log(k) of them for BITWISE).
+    """
+    PAIRWISE, SEQUENTIAL_COUNTER, LADDER, BITWISE = auto(4)
+
+    def __str__(self):
+        return self.name
+
 @unique
 class TypeFeature(Enum):
     NUMERICAL, CATEGORICAL, BINARY, TARGET, TO_DELETE, DEFAULT = auto(6)
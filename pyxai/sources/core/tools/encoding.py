@@ -159,6 +159,8 @@ class CNFencoding():
 
     @staticmethod
     def remove_subsumed(cnf):
+        if len(cnf) == 0:
+            return []
         cnf = sorted(cnf, key=lambda clause: len(clause))
         subsumed = [False for _ in range(len(cnf) + 1)]
         flags = [False for _ in range(CNFencoding.compute_max_id_variable(cnf) + 1)]
@@ -1,7 +1,5 @@
 import platform
 import random
-import shap
-import wordfreq
 import importlib.util
 import sys
 
@@ -12,8 +10,6 @@ from termcolor import colored
 from time import time
 from typing import Iterable
 
-from sklearn.metrics import confusion_matrix, mean_squared_error, mean_absolute_error
-
 from pyxai.sources.core.structure.type import PreferredReasonMethod
 
 
@@ -50,6 +46,7 @@ class Metric:
 
     @staticmethod
     def compute_metrics_regression(labels, predictions):
+        from sklearn.metrics import mean_squared_error, mean_absolute_error
         return {
                 "mean_squared_error": mean_squared_error(labels, predictions),
                 "root_mean_squared_error": mean_squared_error(labels, predictions, squared=False),
@@ -58,6 +55,7 @@ class Metric:
 
     @staticmethod
     def compute_metrics_binary_classification(labels, predictions):
+        from sklearn.metrics import confusion_matrix
         tp = Metric.compute_tp(labels, predictions)
         tn = Metric.compute_tn(labels, predictions)
         fp = Metric.compute_fp(labels, predictions)
@@ -83,6 +81,7 @@ class Metric:
     
     @staticmethod
     def compute_metrics_multi_classification(labels, predictions, dict_labels):
+        from sklearn.metrics import confusion_matrix
         # TP, TN, FP and FN is not available the multi class case.
         # We therefore compute TP, TN, FP and FN for each class 
         true_positives = {}
@@ -334,6 +333,7 @@ def compute_weight(method, instance, weights, learner_information, *, features_p
 
     if method == PreferredReasonMethod.Shapley:
         # Shapely values for the model trained on data.
+        import shap
         raw_model = learner_information.raw_model
 
         shapely_explainer = shap.TreeExplainer(raw_model, model_output='raw')
@@ -355,12 +355,14 @@ def compute_weight(method, instance, weights, learner_information, *, features_p
         return [round(feature_importances[i] - min(feature_importances) + 1) for i in range(len(feature_importances))]
 
     if method == PreferredReasonMethod.WordFrequency:
+        import wordfreq
         feature_names = learner_information.feature_names
         weights_feature = [int(wordfreq.zipf_frequency(name, 'en') * 100 * (wordfreq.zipf_frequency(name, 'en') > 0)
                                + (wordfreq.zipf_frequency(name, 'en') == 0)) for name in feature_names]
         return [-weights_feature[i] + 1 + max(weights_feature) for i in range(len(weights_feature))]
 
     if method == PreferredReasonMethod.WordFrequencyLayers:
+        import wordfreq
         feature_names = learner_information.feature_names
         weights = [0 for _ in range(len(feature_names))]
         a = [0 for _ in range(3)]  # number of layers - 1
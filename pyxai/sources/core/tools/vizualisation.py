@@ -6,6 +6,8 @@ from PIL import Image as PILImage
 import os
 import copy
 
+mpl.set_loglevel("critical") #To win a lot of times.
+
 class PyPlotDiagramGenerator():
     def __init__(self, time_series=None):
         self.time_series=time_series
@@ -0,0 +1,183 @@
+import json
+import os
+import tempfile
+
+import numpy
+import pandas
+
+
+class DatasetReader:
+    """
+    Read a dataset file (csv) by blocks of rows: the whole file is never in memory, only the current block and the selected rows.
+
+    When a cache directory is given, the parsed rows are also written in a binary file of this directory (one pass over the csv file, the
+    first time) and then read through a memory map: the following reads (blocks or rows by index) do not parse the csv file any more. The
+    cache is only possible when all the columns (including the labels) are numerical, and it is built again when the csv file changes.
+    """
+
+    CHUNK_SIZE = 100000  # rows per block
+    CACHE_EXTENSION = ".rows"
+
+
+    def __init__(self, filename, *, chunk_size=None, cache_directory=None):
+        if not os.path.isfile(filename):
+            raise FileNotFoundError("The file " + filename + " is not found.")
+        self.filename = filename
+        self.chunk_size = DatasetReader.CHUNK_SIZE if chunk_size is None else chunk_size
+        self._rows = None  # numpy.memmap of the cache
+        self._columns = None
+        self._dtypes = None
+        if cache_directory is not None and filename.endswith(".csv"):
+            self._open_cache(cache_directory)
+
+
+    @property
+    def columns(self):
+        if self._columns is None:
+            self._columns = list(self._read(nrows=0).columns)
+        return self._columns
+
+
+    def _read(self, **options):
+        if self.filename.endswith(".csv"):
+            return pandas.read_csv(self.filename, **options)
+        if self.filename.endswith(".xlsx"):
+            return pandas.read_excel(self.filename, **options)
+        raise ValueError("The dataset must be a csv or excel file with the .csv or .xlsx extension.")
+
+
+    def _csv_blocks(self):
+        if not self.filename.endswith(".csv"):
+            yield 0, self._read()  # an excel file can not be read by blocks
+            return
+        start = 0
+        with pandas.read_csv(self.filename, chunksize=self.chunk_size) as reader:
+            for block in reader:
+                yield start, block
+                start += len(block)
+
+
+    def _cached_block(self, start, stop):
+        block = pandas.DataFrame(numpy.asarray(self._rows[start:stop]), columns=self._columns)
+        return block.astype(self._dtypes)
+
+
+    def blocks(self):
+        """
+        Iterate over the blocks of the dataset: tuples (index of the first row, pandas.DataFrame).
+        """
+        if self._rows is None:
+            yield from self._csv_blocks()
+            return
+        for start in range(0, len(self._rows), self.chunk_size):
+            yield start, self._cached_block(start, start + self.chunk_size)
+
+
+    def count_rows(self):
+        if self._rows is not None:
+            return len(self._rows)
+        return sum(len(block) for _, block in self.blocks())
+
+
+    def head(self, n):
+        """
+        Return the n first rows (all the rows if n is None).
+        """
+        if self._rows is not None:
+            return self._cached_block(0, len(self._rows) if n is None else n)
+        if self.filename.endswith(".csv"):
+            return pandas.read_csv(self.filename, nrows=n)
+        return self._read(nrows=n)
+
+
+    def read_rows(self, indexes):
+        """
+        Return the rows given by indexes (a row can be given several times), in the order of indexes, as a pandas.DataFrame. Without cache,
+        the file is read once, and the reading stops after the last row needed.
+        """
+        indexes = numpy.asarray(indexes, dtype=numpy.int64).reshape(-1)
+        if len(indexes) != 0 and indexes.min() < 0:
+            raise IndexError("The indexes of the rows must be positive.")
+        if self._rows is not None:
+            if len(indexes) != 0 and indexes.max() >= len(self._rows):
+                raise IndexError("The dataset has only " + str(len(self._rows)) + " rows.")
+            if len(indexes) == 0:
+                return self._cached_block(0, 0)
+            return pandas.DataFrame(self._rows[indexes], columns=self._columns).astype(self._dtypes)
+
+        order = numpy.argsort(indexes, kind="stable")
+        sorted_indexes = indexes[order]
+        parts = []
+        n_found = 0
+        n_rows = 0
+        for start, block in self.blocks():
+            n_rows = start + len(block)
+            stop = numpy.searchsorted(sorted_indexes, n_rows)
+            if stop > n_found:
+                parts.append(block.iloc[sorted_indexes[n_found:stop] - start])
+                n_found = stop
+            if n_found == len(sorted_indexes):
+                break
+        if n_found != len(sorted_indexes):
+            raise IndexError("The dataset has only " + str(n_rows) + " rows.")
+        if len(parts) == 0:
+            return self.head(0)
+        rows = pandas.concat(parts, ignore_index=True)
+        # Back to the order of indexes
+        positions = numpy.empty(len(order), dtype=numpy.int64)
+        positions[order] = numpy.arange(len(order))
+        return rows.iloc[positions].reset_index(drop=True)
+
+
+    def _open_cache(self, cache_directory):
+        os.makedirs(cache_directory, exist_ok=True)
+        rows_filename = os.path.join(cache_directory, os.path.basename(self.filename) + DatasetReader.CACHE_EXTENSION)
+        information_filename = rows_filename + ".json"
+        status = os.stat(self.filename)
+        source = {"size": status.st_size, "mtime": status.st_mtime_ns}
+        information = None
+        if os.path.isfile(information_filename) and os.path.isfile(rows_filename):
+            with open(information_filename) as file:
+                information = json.load(file)
+            if information.get("source") != source:
+                information = None  # The csv file has changed
+        if information is None:
+            information = self._write_cache(rows_filename, information_filename, source)
+            if information is None:
+                return  # Some columns are not numerical
+        self._columns = information["columns"]
+        self._dtypes = dict(zip(self._columns, information["dtypes"]))
+        shape = (information["n_rows"], len(self._columns))
+        if shape[0] == 0:
+            self._rows = numpy.zeros(shape, dtype=numpy.float64)
+        else:
+            self._rows = numpy.memmap(rows_filename, dtype=numpy.float64, mode="r", shape=shape)
+
+
+    def _write_cache(self, rows_filename, information_filename, source):
+        descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(rows_filename), suffix=".tmp")
+        n_rows = 0
+        columns = None
+        dtypes = None
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                for _, block in self._csv_blocks():
+                    if not all(kind in "biuf" for kind in block.dtypes.map(lambda dtype: dtype.kind)):
+                        os.remove(temporary)
+                        return None
+                    columns = list(block.columns)
+                    block_dtypes = [numpy.dtype(dtype) for dtype in block.dtypes]
+                    dtypes = block_dtypes if dtypes is None else [numpy.result_type(a, b) for a, b in zip(dtypes, block_dtypes)]
+                    file.write(numpy.ascontiguousarray(block.to_numpy(dtype=numpy.float64)).tobytes())
+                    n_rows += len(block)
+        except BaseException:
+            os.remove(temporary)
+            raise
+        os.replace(temporary, rows_filename)
+        if columns is None:
+            columns = self.columns
+            dtypes = [numpy.dtype(numpy.float64)] * len(columns)
+        information = {"source": source, "columns": columns, "dtypes": [dtype.name for dtype in dtypes], "n_rows": n_rows}
+        with open(information_filename, "w") as file:
+            json.dump(information, file)
+        return information
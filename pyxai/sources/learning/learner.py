@@ -4,6 +4,7 @@ import os
 import random
 import shutil
 from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from typing import Iterable
 
 import numpy
@@ -14,13 +15,33 @@ from sklearn.model_selection import LeaveOneGroupOut, train_test_split, KFold
 from pyxai import Tools
 from pyxai.sources.core.structure.boostedTrees import BoostedTrees
 from pyxai.sources.core.structure.decisionTree import DecisionTree
+from pyxai.sources.core.structure.modelFile import ModelFile
 from pyxai.sources.core.structure.randomForest import RandomForest
 from pyxai.sources.core.structure.type import EvaluationMethod, LearnerType, EvaluationOutput, Indexes, TypeFeature
 from pyxai.sources.core.tools.utils import flatten, Metric
+from pyxai.sources.learning.dataset_reader import DatasetReader
 from pyxai.sources.learning.learner_information import LearnerInformation
         
 class NoneData: pass
 
+
+# The learner of a worker process of Learner.evaluate() with several jobs (a copy received once, when the process starts)
+_evaluation_learner = None
+
+
+def _init_evaluation_worker(learner):
+    global _evaluation_learner
+    _evaluation_learner = learner
+
+
+def _fit_and_predict_fold(output, training_index, test_index, learner_options):
+    return _evaluation_learner.fit_and_predict_fold(output, training_index, test_index, learner_options)
+
+
+def _convert_learner_information(output, learner_information):
+    return _evaluation_learner.convert_model(output, [learner_information])[0]
+
+
 class Learner:
     """
     Load the dataset, rename the attributes and separe the prediction from the data
@@ -30,6 +51,7 @@ class Learner:
             raise ValueError("Please set the parameter 'learner_type' to 'Learning.CLASSIFICATION' or 'Learning.REGRESSION'.")
         self.learner_type = learner_type
         self.dict_labels = None
+        self._labels_dataset = None  # (dataset file, all its labels are in dict_labels, dict_labels), see _get_data()
         self.data = None
         self.labels = None
         self.n_labels = None
@@ -74,48 +96,25 @@ class Learner:
         raise ValueError("The data parameter is either a string representing a csv or excel file or a pandas.core.frame.DataFrame object.")
 
 
-    @staticmethod
-    def count_lines(filename):
-        with open(filename) as f:
-            return sum(1 for _ in f)
+    def load_data_limited(self, datasetname, possible_indexes, n, *, cache_directory=None):
+        """
+        Return the data and the labels of the rows possible_indexes of the dataset file (in the order of possible_indexes), or of its n first
+        rows if possible_indexes is None. The file is read by blocks (see DatasetReader): only the selected rows are kept in memory.
+        """
+        self.dataset_name = datasetname
+        reader = DatasetReader(datasetname, cache_directory=cache_directory)
+        return self._split_data(reader.head(n) if possible_indexes is None else reader.read_rows(possible_indexes))
 
 
-    def load_data_limited(self, datasetname, possible_indexes, n):
-        self.dataset_name = datasetname
-        n_indexes = self.count_lines(datasetname) - 1  # to skip the first line
-        if possible_indexes is None:
-            skip = None
-        else:
-            # To avoid a 'i not in possibles_indexes' in a loop.
-            map_possible_indexes = [False for _ in range(n_indexes)]
-            for v in possible_indexes: map_possible_indexes[v] = True 
-            # Create the values to skip
-            skip = [i+1 for i in range(n_indexes) if map_possible_indexes[i] is False]
-            # Create a map to get the good order of instances
-            sorted_possibles_indexes = sorted(possible_indexes)
-            map_possibles_indexes = [sorted_possibles_indexes.index(index) for index in possible_indexes]
-
-        data = pandas.read_csv(
-            datasetname,
-            skiprows=skip,
-            nrows=n
-        )
-        # recreate the dataframe object but with the good order of instances
-        if skip is not None:
-            sorted_data = pandas.DataFrame(columns=data.columns).astype(data.dtypes)
-            for i in range(data.shape[0]):
-                #sorted_data = sorted_data.append(data.loc[map_possibles_indexes[i]].to_dict(), ignore_index=True)
-                pandas.concat([sorted_data, data.loc[map_possibles_indexes[i]]], ignore_index=True)
-            sorted_data = sorted_data.astype(data.dtypes)
-
-        n_instances, n_features = data.shape
-        self.feature_names = data.columns.values.tolist()
-        self.rename_attributes(data)
-        data, labels = self.remove_labels(data, n_features)
+    def _split_data(self, dataframe):
+        # The data (NumPy array) and the labels of some rows read from the dataset file
+        n_features = dataframe.shape[1]
+        self.feature_names = dataframe.columns.values.tolist()
+        self.rename_attributes(dataframe)
+        data, labels = self.remove_labels(dataframe, n_features)
         if self.dict_labels is not None:
             labels = self.labels_to_values(labels)
-        data = data.to_numpy()
-        return data, labels
+        return data.to_numpy(), labels
 
 
     def load_data(self, dataframe, datasetname, *, encode_labels=True):
@@ -163,14 +162,21 @@ class Learner:
         return self.dict_labels[label]
     
     def create_dict_labels(self, labels):
-        index = 0
         self.dict_labels = OrderedDict()
         self.inverse_dict_labels = OrderedDict()
+        self.add_labels(labels)
+
+
+    def add_labels(self, labels):
+        """
+        Add to dict_labels the labels that are not in it yet, in their order of appearance: create_dict_labels() on the concatenation of
+        several lists of labels gives the same result as create_dict_labels() on the first one and then add_labels() on each of the others.
+        """
         for p in labels:
             if str(p) not in self.dict_labels:
+                index = len(self.dict_labels)
                 self.dict_labels[str(p)] = index
                 self.inverse_dict_labels[index] = str(p)
-                index += 1
 
 
     """
@@ -208,7 +214,19 @@ class Learner:
         else:
             raise ValueError("learner_type is unknown:", str(self.learner_type))
 
-    def evaluate(self, *, method, output, n_models=10, test_size=0.3, **learner_options):
+    def evaluate(self, *, method, output, n_models=10, test_size=0.3, n_jobs=1, **learner_options):
+        """
+        Train and test the models of an evaluation method, then convert them into PyXAI models (see convert_model()).
+
+        With the KFolds and LeaveOneGroupOut methods, n_jobs models are trained at the same time, by a pool of n_jobs processes
+        (None or -1 to use all the CPUs): each model is given os.cpu_count() // n_jobs threads, unless the number of threads of the
+        learner is already in learner_options (see thread_options()). The conversion of the models is also done by this number of
+        processes. With the HoldOut method, n_jobs is the number of threads of the learner.
+        """
+        if n_jobs is None or n_jobs == -1:
+            n_jobs = os.cpu_count()
+        if n_jobs < 1:
+            raise ValueError("The n_jobs parameter must be a positive integer, -1 or None.")
         if "seed" not in learner_options.keys():
             learner_options["seed"] = 0
         if "max_depth" not in learner_options.keys():
@@ -221,11 +239,14 @@ class Learner:
         Tools.verbose("learner_type:", str(self.learner_type))
 
         if method == EvaluationMethod.HoldOut:
+            if n_jobs != 1:
+                learner_options = {**self.thread_options(output, n_jobs), **learner_options}
             self.hold_out_evaluation(output, test_size=test_size, learner_options=learner_options)
+            n_jobs = 1
         elif method == EvaluationMethod.LeaveOneGroupOut:
-            self.leave_one_group_out_evaluation(output, n_trees=n_models, learner_options=learner_options)
+            self.leave_one_group_out_evaluation(output, n_trees=n_models, learner_options=learner_options, n_jobs=n_jobs)
         elif method == EvaluationMethod.KFolds:
-            self.k_folds_evaluation(output, n_models=n_models, learner_options=learner_options)
+            self.k_folds_evaluation(output, n_models=n_models, learner_options=learner_options, n_jobs=n_jobs)
         else:
             assert False, "Not implemented !"
 
@@ -247,7 +268,7 @@ class Learner:
             Tools.verbose()
 
         Tools.verbose("---------------   Explainer   ----------------")
-        result_output = self.convert_model(output)
+        result_output = self.convert_model(output, n_jobs=n_jobs)
         # elif output == EvaluationOutput.SAVE:
         #  self.save_model(model_directory)
         #  result_output = self.to_BT()
@@ -260,10 +281,13 @@ class Learner:
         
         return result_output if len(result_output) != 1 else result_output[0]
 
-    def convert_model(self, output, learner_information=None):
+    def convert_model(self, output, learner_information=None, n_jobs=1):
         if learner_information is not None: 
             self.learner_information = learner_information
 
+        if n_jobs != 1 and len(self.learner_information) > 1:
+            return self._convert_models(output, n_jobs)
+
         if self.learner_type == LearnerType.Classification:
             if output == EvaluationOutput.DT:
                 return self.to_DT_CLS(self.learner_information)
@@ -285,6 +309,31 @@ class Learner:
         else:
             raise NotImplementedError(str(self.learner_type) + " not implemented.")
 
+    def _convert_models(self, output, n_jobs):
+        # Each model is converted by a worker process, that receives a copy of this learner without the dataset
+        learner = copy.copy(self)
+        learner.data, learner.labels, learner.learner_information = None, None, []
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(self.learner_information)), initializer=_init_evaluation_worker,
+                                 initargs=(learner,)) as executor:
+            models = list(executor.map(_convert_learner_information, [output] * len(self.learner_information), self.learner_information))
+
+        # The models received refer to copies of the learner information: they are linked again to the ones of this learner
+        for id_solver_results, (model, learner_information) in enumerate(zip(models, self.learner_information)):
+            model.learner_information = learner_information
+            for tree in getattr(model, "forest", [model]):
+                tree.id_solver_results = id_solver_results
+                if tree.learner_information is not None:
+                    tree.learner_information = learner_information
+        return models
+
+
+    def thread_options(self, output, n_threads):
+        """
+        Return the options that give n_threads threads to the learner of the output (empty if the learner does not use threads).
+        """
+        return {}
+
+
     def load_get_files(self, models_directory):
         assert models_directory is not None and os.path.exists(models_directory), "The path of models_directory do not exist: " + str(
             models_directory)
@@ -310,7 +359,57 @@ class Learner:
         return files
 
 
+    @staticmethod
+    def native_model_files(models_directory):
+        """
+        Return the model files (see ModelFile) of models_directory, in the order of the models.
+        """
+        assert models_directory is not None and os.path.exists(models_directory), "The path of models_directory do not exist: " + str(
+            models_directory)
+        files = {}
+        for filename in os.listdir(models_directory):
+            if filename.endswith(ModelFile.EXTENSION):
+                index = filename[:-len(ModelFile.EXTENSION)].split(".")[-1]
+                if index.isdigit():
+                    files[int(index)] = os.path.join(models_directory, filename)
+        return [files[index] for index in range(len(files)) if index in files]
+
+
+    def load_native(self, *, models_directory, tests=False):
+        """
+        Load the models saved with save(..., native=True): the trees are read from the model files (see ModelFile), nothing is converted.
+        The tests are not possible: they need the raw model, that is not saved.
+        """
+        if tests:
+            raise ValueError("The tests need the raw model, that is not saved in a model file.")
+        self.learner_information.clear()
+        models = []
+        for id_solver_results, filename in enumerate(Learner.native_model_files(models_directory)):
+            model_file = ModelFile(filename)
+            data = model_file.metadata
+            learner_information = LearnerInformation(None, model_file.arrays["training_index"], model_file.arrays["test_index"], None,
+                                                     data["metrics"], data["extras"])
+            learner_information.set_learner_name(data["learner_name"])
+            learner_information.set_evaluation_method(data["evaluation_method"])
+            learner_information.set_evaluation_output(data["evaluation_output"])
+            learner_information.set_feature_names(data["feature_names"])
+            self.n_features = data["n_features"]
+            self.n_labels = data["n_labels"]
+            self.dict_labels = data["dict_labels"]
+            self.feature_names = data["feature_names"]
+            if self.get_learner_name() != learner_information.learner_name:
+                raise ValueError("The learner in the model file is not the same: " + self.get_learner_name() + " != " + learner_information.learner_name)
+            model = model_file.model(learner_information, id_solver_results)
+            self.learner_information.append(learner_information)
+            models.append(model)
+            Tools.verbose("Model loaded:", filename)
+        assert len(models) != 0, "No model file in the path: " + models_directory
+        return models if len(models) != 1 else models[0]
+
+
     def load(self, *, models_directory, tests=False):
+        if len(Learner.native_model_files(models_directory)) != 0:
+            return self.load_native(models_directory=models_directory, tests=tests)
         files = self.load_get_files(models_directory)
 
         for _, model in enumerate(files):
@@ -376,7 +475,12 @@ class Learner:
         return result_output if len(result_output) != 1 else result_output[0]
 
 
-    def save(self, models, save_directory, generic=False):
+    def save(self, models, save_directory, generic=False, native=False):
+        """
+        Save the models in save_directory: for each model, the raw model of the learner (.model file, or the raw data of the trees if generic)
+        and the information of the learner (.map file). With native, each model is saved in a single model file (see ModelFile) with the
+        trees already converted, that is loaded without any conversion (the raw model is not kept).
+        """
         if not isinstance(models, Iterable): models = [models]
 
         name = self.dataset_name.split(os.sep)[-1].split('.')[0]
@@ -396,7 +500,9 @@ class Learner:
             learner_information = trees.learner_information
             filename = base_directory + os.sep + name + '.' + str(i)
             # model:
-            if not generic:
+            if native:
+                pass
+            elif not generic:
                 self.save_model(learner_information, filename)
             else:
                 self.save_model_generic(trees, filename)
@@ -414,6 +520,13 @@ class Learner:
                     "training_index": learner_information.training_index.tolist(),
                     "test_index": learner_information.test_index.tolist()}
 
+            if native:
+                indexes = {"training_index": numpy.asarray(data.pop("training_index"), dtype=numpy.int64),
+                           "test_index": numpy.asarray(data.pop("test_index"), dtype=numpy.int64)}
+                ModelFile.write(filename + ModelFile.EXTENSION, trees, metadata=data, arrays=indexes)
+                Tools.verbose("Model saved: " + filename + ModelFile.EXTENSION)
+                continue
+
             json_string = json.dumps(data)
             with open(filename + ".map", 'w') as outfile:
                 json.dump(json_string, outfile)
@@ -449,6 +562,31 @@ class Learner:
             raise NotImplementedError(str(self.learner_type) + " not implemented.")
     
 
+    def fit_and_predict_fold(self, output, training_index, test_index, learner_options):
+        # Select good observations for the experiment of this fold.
+        instances_training = [self.data[i] for i in training_index]
+        labels_training = [self.labels[i] for i in training_index]
+        instances_test = [self.data[i] for i in test_index]
+        labels_test = [self.labels[i] for i in test_index]
+        return self.fit_and_predict(output, instances_training, instances_test, labels_training, labels_test, learner_options)
+
+
+    def fit_and_predict_folds(self, output, folds, learner_options, n_jobs=1):
+        """
+        Train and test a model for each fold (a tuple (training_index, test_index)) and return the tuples (model, metrics, extras), in
+        the order of the folds. With several jobs, the folds are trained by a pool of processes that receive a copy of this learner once,
+        and the threads of each model are limited (see thread_options()) so that the pool does not use more than the CPUs.
+        """
+        if n_jobs == 1:
+            return [self.fit_and_predict_fold(output, training_index, test_index, learner_options) for training_index, test_index in folds]
+
+        learner_options = {**self.thread_options(output, max(1, os.cpu_count() // n_jobs)), **learner_options}
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(folds)), initializer=_init_evaluation_worker, initargs=(self,)) as executor:
+            futures = [executor.submit(_fit_and_predict_fold, output, training_index, test_index, learner_options)
+                       for training_index, test_index in folds]
+            return [future.result() for future in futures]
+
+
     def hold_out_evaluation(self, output, *, test_size=0.3, learner_options):
         self.learner_information.clear()
         assert self.data is not None, "You have to put the dataset in the class parameters."
@@ -464,28 +602,22 @@ class Learner:
         return self
 
 
-    def k_folds_evaluation(self, output, *, n_models=10, learner_options):
+    def k_folds_evaluation(self, output, *, n_models=10, learner_options, n_jobs=1):
         assert self.data is not None, "You have to put the dataset in the class parameters."
         assert n_models > 1, "This k_folds_evaluation() expects at least 2 parts. For just one tree, please use hold_out_evaluation()"
         self.learner_information.clear()
 
         cross_validator = KFold(n_splits=n_models, random_state=learner_options["seed"], shuffle=True)
+        folds = list(cross_validator.split(self.data))
+        results = self.fit_and_predict_folds(output, folds, learner_options, n_jobs)
 
-        for training_index, test_index in cross_validator.split(self.data):
-            # Select good observations for each of the 'n_trees' experiments.
-            instances_training = [self.data[i] for i in training_index]
-            labels_training = [self.labels[i] for i in training_index]
-            instances_test = [self.data[i] for i in test_index]
-            labels_test = [self.labels[i] for i in test_index]
-            
-            tree, metrics, extras = self.fit_and_predict(output, instances_training, instances_test, labels_training, labels_test, learner_options)
-            
+        for (training_index, test_index), (tree, metrics, extras) in zip(folds, results):
             # Save some information
             self.learner_information.append(LearnerInformation(tree, training_index, test_index, None, metrics, extras))
         return self
 
 
-    def leave_one_group_out_evaluation(self, output, *, n_trees=10, learner_options):
+    def leave_one_group_out_evaluation(self, output, *, n_trees=10, learner_options, n_jobs=1):
         assert self.data is not None, "You have to put the dataset in the class parameters."
         assert n_trees > 1, "cross_validation() expects at least 2 trees. For just one tree, please use simple_validation()"
         self.learner_information.clear()
@@ -496,16 +628,10 @@ class Learner:
         random.Random(learner_options["seed"]).shuffle(groups)
         cross_validator = LeaveOneGroupOut()
 
-        for training_index, test_index in cross_validator.split(self.data, self.labels, groups):
-            # Select good observations for each of the 'n_trees' experiments.
-            instances_training = [self.data[i] for i in training_index]
-            labels_training = [self.labels[i] for i in training_index]
-            instances_test = [self.data[i] for i in test_index]
-            labels_test = [self.labels[i] for i in test_index]
+        folds = list(cross_validator.split(self.data, self.labels, groups))
+        results = self.fit_and_predict_folds(output, folds, learner_options, n_jobs)
 
-            # solving
-            tree, metrics, extras = self.fit_and_predict(output, instances_training, instances_test, labels_training, labels_test, learner_options)
-            
+        for (training_index, test_index), (tree, metrics, extras) in zip(folds, results):
             # Save some information
             self.learner_information.append(LearnerInformation(tree, training_index, test_index, groups, metrics, extras))
         return self
@@ -540,6 +666,12 @@ class Learner:
       - []: List of integers representing the classes/labels for the desired instances  
 
     'backup_directory': save the instance indexes in a file in the directory given by this parameter 
+
+    'batch_size': the number of instances given at once to the predict function of the model (to filter the instances according to
+      'correct' and 'predictions')
+
+    'cache_directory': when the dataset is read from its csv file, keep the parsed rows in a binary file of this directory, that is
+      memory mapped by the next calls (see DatasetReader)
     """
 
 
@@ -555,7 +687,9 @@ class Learner:
                       instances_id=None, 
                       seed=0, 
                       training_indexes=None,
-                      test_indexes=None, details=False):
+                      test_indexes=None, details=False,
+                      cache_directory=None,
+                      batch_size=1024):
 
         # 1: Check parameters and get the associated solver
         Tools.verbose("---------------   Instances   ----------------")
@@ -568,40 +702,46 @@ class Learner:
         # 2: Get the correct indexes:
         possible_indexes = self._get_possible_indexes(indexes, n, instances_id, learner_information, training_indexes, test_indexes)
         
-        # 3: Get the correct data (select only data that we need):
-        possible_indexes, data, labels = self._get_data(dataset, possible_indexes, n)
-        
-        # 4: Select instances according to data and possible_indexes.
+        # 3: Select instances according to data and possible_indexes (block by block when the dataset is read from its file).
         instances = []
         instances_indexes = []
-        original_indexes = self._build_original_indexes(data, seed)
         instances_details = []
-        if model is None or self.get_learner_name() == "Generic":
-            for j in original_indexes:
-                current_index = possible_indexes[j]
-                instances.append((data[j], None))
-                instances_indexes.append(current_index)
-                instances_details.append({"instance": data[j], "prediction": None, "label": None, "index":current_index})
-                if isinstance(n, int) and len(instances) >= n:
-                    break
-        else:
-            for j in original_indexes:
-                current_index = possible_indexes[j]
-                prediction_solver = learner.predict(numpy.ascontiguousarray(data[j].reshape(1, -1)))[0]
-                
-                # J'ai, a priori de la chance, que la fonction predict de xgboost et scikit learnt ont la meme def !
-                # A voir comment faire, peux être au niveau de extras si on a un probleme avec cela. 
-                label = labels[j]
-                if (correct and prediction_solver == label) \
-                        or (not correct and prediction_solver != label) \
-                        or (correct is None):
-                    if predictions is None or prediction_solver in predictions:
+        for data, labels, rows_indexes in self._get_data(dataset, possible_indexes, n, seed, cache_directory):
+            if model is None or self.get_learner_name() == "Generic":
+                for j, current_index in enumerate(rows_indexes):
+                    instances.append((data[j], None))
+                    instances_indexes.append(current_index)
+                    instances_details.append({"instance": data[j], "prediction": None, "label": None, "index":current_index})
+                    if isinstance(n, int) and len(instances) >= n:
+                        break
+            else:
+                # The predictions are done by batches of rows and the filters are applied with masks.
+                # Without raw model (model loaded from a model file, see ModelFile), the predictions are the ones of the converted model.
+                predict = model.predict_batch if learner is None else learner.predict
+                for start in range(0, len(rows_indexes), batch_size):
+                    block_predictions = predict(numpy.ascontiguousarray(data[start:start + batch_size]))
+                    # J'ai, a priori de la chance, que la fonction predict de xgboost et scikit learnt ont la meme def !
+                    # A voir comment faire, peux être au niveau de extras si on a un probleme avec cela.
+                    block_labels = numpy.asarray(labels[start:start + batch_size])
+                    selected = numpy.ones(len(block_predictions), dtype=bool)
+                    if correct is not None:
+                        selected = (block_predictions == block_labels) if correct else (block_predictions != block_labels)
+                    if predictions is not None:
+                        selected &= numpy.isin(block_predictions, list(predictions))
+                    for k in numpy.flatnonzero(selected):
+                        j = start + k
+                        current_index = rows_indexes[j]
+                        prediction_solver = block_predictions[k]
                         instances.append((data[j], prediction_solver))
                         instances_indexes.append(current_index)
-                        instances_details.append({"instance": data[j], "prediction": prediction_solver, "label": label, "index":current_index})
-                if isinstance(n, int) and len(instances) >= n:
-                    break
-        
+                        instances_details.append({"instance": data[j], "prediction": prediction_solver, "label": labels[j], "index":current_index})
+                        if isinstance(n, int) and len(instances) >= n:
+                            break
+                    if isinstance(n, int) and len(instances) >= n:
+                        break
+            if isinstance(n, int) and len(instances) >= n:
+                break
+
         if save_directory is not None:
             # we want to save the instances indexes in a file
             name = self.dataset_name.split(os.sep)[-1].split('.')[0]
@@ -721,20 +861,68 @@ class Learner:
             possible_indexes = possible_indexes.tolist()
         return possible_indexes
     
-    def _get_data(self, dataset, possible_indexes, n):
-        if self.data is None:
-            if dataset is None:
-                raise ValueError("Dataset is not loaded yet: you must put the dataset filename through the 'dataset' parameter.")
-            if possible_indexes is None:
-                data, name = self.parse_data(dataset)
-                if data is not None: self.load_data(data, name)
-                return [i for i in range(len(self.data))], self.data, self.labels
-            else:
-                data, labels = self.load_data_limited(dataset, possible_indexes, n)
-                return possible_indexes, data, labels
-        else:
+    def _get_data(self, dataset, possible_indexes, n, seed, cache_directory=None):
+        """
+        Iterate over blocks of candidate instances, in the order in which they have to be considered: tuples (data, labels, indexes of the rows).
+        When the dataset is already loaded, there is only one block. Otherwise, the rows are read from the dataset file (see DatasetReader):
+        block by block in the order of the file when there is no index to select and no shuffling, in one pass over the file when all the
+        rows are shuffled, or by groups of indexes, each group being twice as large as the previous one (the next group is read only if the
+        previous ones do not give enough instances).
+        The labels of a dataset file are encoded (as load_data() does, in their order of appearance in the file) only once.
+        """
+        if self.data is not None:
             if possible_indexes is None:
                 possible_indexes = [i for i in range(len(self.data))]
-            data = numpy.array([self.data[x] for x in possible_indexes])
-            labels = numpy.array([self.labels[x] for x in possible_indexes])
-            return possible_indexes, data, labels
+            indexes = [possible_indexes[j] for j in self._build_original_indexes(possible_indexes, seed)]
+            yield numpy.asarray(self.data)[indexes], numpy.asarray(self.labels)[indexes], indexes
+            return
+
+        if dataset is None:
+            raise ValueError("Dataset is not loaded yet: you must put the dataset filename through the 'dataset' parameter.")
+        if isinstance(dataset, pandas.core.frame.DataFrame):
+            data, name = self.parse_data(dataset)
+            self.load_data(data, name)
+            yield from self._get_data(None, possible_indexes, n, seed)
+            return
+        self.dataset_name = dataset
+        reader = DatasetReader(dataset, cache_directory=cache_directory)
+        if possible_indexes is None:
+            # All the dataset is considered: the labels are encoded as load_data() does, in their order of appearance in the file.
+            encode_labels = False
+            if self.learner_type == LearnerType.Classification:
+                labels_dataset = self._labels_dataset
+                if labels_dataset is None or labels_dataset[0] != dataset or labels_dataset[2] is not self.dict_labels:
+                    self.create_dict_labels([])
+                    labels_dataset = (dataset, False, self.dict_labels)
+                    self._labels_dataset = labels_dataset
+                encode_labels = not labels_dataset[1]
+            if seed == 0:
+                for start, block in reader.blocks():
+                    if encode_labels:
+                        self.add_labels(block.iloc[:, -1])
+                    data, labels = self._split_data(block)
+                    yield data, labels, [i for i in range(start, start + len(data))]
+                if encode_labels:
+                    self._labels_dataset = (dataset, True, self.dict_labels)
+                return
+            # The rows are shuffled: they are all read in one pass (that also encodes the labels) and then taken in the order of the shuffle.
+            blocks = []
+            for _, block in reader.blocks():
+                if encode_labels:
+                    self.add_labels(block.iloc[:, -1])
+                blocks.append(block)
+            if encode_labels:
+                self._labels_dataset = (dataset, True, self.dict_labels)
+            data, labels = self._split_data(pandas.concat(blocks, ignore_index=True) if len(blocks) != 0 else reader.head(0))
+            indexes = self._build_original_indexes(data, seed)
+            yield data[indexes], numpy.asarray(labels)[indexes], indexes
+            return
+        indexes = [possible_indexes[j] for j in self._build_original_indexes(possible_indexes, seed)]
+        size = len(indexes) if n is None else max(2 * n, 1024)
+        start = 0
+        while start < len(indexes):
+            group = indexes[start:start + size]
+            data, labels = self._split_data(reader.read_rows(group))
+            yield data, labels, group
+            start += size
+            size *= 2
@@ -1,18 +1,18 @@
 import copy
-import json
 import os
 import pickle
 from numpy.random import RandomState
 
 import lightgbm
+import numpy
 
 from sklearn.metrics import mean_squared_error, mean_absolute_error
 from pyxai import Tools
 
 from pyxai.sources.core.structure.boostedTrees import BoostedTrees, BoostedTreesRegression
-from pyxai.sources.core.structure.decisionTree import DecisionTree, DecisionNode, LeafNode
+from pyxai.sources.core.structure.decisionTree import DecisionTree
 from pyxai.sources.learning.learner import Learner, NoneData
-from pyxai.sources.core.structure.type import LearnerType, EvaluationOutput
+from pyxai.sources.core.structure.type import LearnerType, EvaluationOutput, OperatorCondition
 
 class LightGBM(Learner):
     """
@@ -37,6 +37,9 @@ class LightGBM(Learner):
         return str(LightGBM.__name__)
 
 
+    def thread_options(self, output, n_threads):
+        return {"n_jobs": n_threads}
+
     def fit_and_predict_DT_CLS(self, instances_training, instances_test, labels_training, labels_test, learner_options):
         raise NotImplementedError("Decision Tree with classification is not implemented for LightGBM.")
         
@@ -94,44 +97,60 @@ class LightGBM(Learner):
 
     def results_to_trees(self, id_solver_results):
         bt = self.learner_information[id_solver_results].raw_model.booster_
-        
-        bt_json = self.BT_to_JSON(bt)
-
         decision_trees = []
-        target_class = 0
-        for i, tree_JSON in enumerate(bt_json["tree_info"]):
-            tree_JSON = tree_JSON['tree_structure']
-            root = self.recuperate_nodes(tree_JSON)
-            decision_trees.append(DecisionTree(self.n_features, root, target_class=[target_class], id_solver_results=id_solver_results))
-            
+        for tree_arrays in self.BT_to_arrays(bt):
+            decision_trees.append(self.arrays_to_DT(tree_arrays, [0], id_solver_results))
         return decision_trees
 
 
-    def recuperate_nodes(self, tree_JSON):
-        if "split_feature" in tree_JSON:
-            id_feature = int(tree_JSON["split_feature"])
-            threshold = tree_JSON["threshold"]
-            if tree_JSON["decision_type"] != '<=':
-                raise NotImplementedError()
-            decision_node = DecisionNode(int(id_feature + 1), threshold=threshold, left=None, right=None)
-            if "left_child" in tree_JSON: # It is the good, right for yes, left for no
-                child = tree_JSON["left_child"]
-                decision_node.left = LeafNode(float(child["leaf_value"])) if "leaf_value" in child else self.recuperate_nodes(child)
-            if "right_child" in tree_JSON:
-                child = tree_JSON["right_child"]
-                decision_node.right = LeafNode(float(child["leaf_value"])) if "leaf_value" in child else self.recuperate_nodes(child)
-            return decision_node
-        elif "leaf_value" in tree_JSON:
+    def arrays_to_DT(self, tree_arrays, target_class, id_solver_results):
+        """
+        Convert a tree given by the arrays of the model string: the decision nodes are numbered from 0 (the root) and the leaves are given by
+        the negative children (the leaf ~child). In the node table, the leaves are put after the decision nodes. The tree is built from these
+        arrays: its nodes are only created if they are used.
+        """
+        leaf_values = tree_arrays["leaf_value"]
+        if int(tree_arrays["num_leaves"][0]) == 1:
             # Special case when the tree is just a leaf, this append when no split is realized by the solver, but the weight have to be take into account
-            return LeafNode(float(tree_JSON["leaf_value"]))
-
+            return DecisionTree.from_arrays(self.n_features, [-1], [0.0], OperatorCondition.GE, [-1], [-1], leaf_values[:1],
+                                            target_class=target_class, id_solver_results=id_solver_results)
+        if numpy.any(tree_arrays["decision_type"].astype(numpy.int64) & 1):  # categorical split
+            raise NotImplementedError("The categorical splits of LightGBM are not implemented.")
+        n_decision_nodes = len(tree_arrays["split_feature"])
+        leaves = numpy.full(len(leaf_values), -1, dtype=numpy.int64)
+
+        def children(column):
+            # The row of each child in the node table, -1 for a leaf
+            children = tree_arrays[column].astype(numpy.int64)
+            return numpy.where(children >= 0, children, n_decision_nodes + numpy.bitwise_not(children))
+
+        # It is the good, right for yes, left for no
+        return DecisionTree.from_arrays(self.n_features, numpy.concatenate((tree_arrays["split_feature"].astype(numpy.int64), leaves)),
+                                        numpy.concatenate((tree_arrays["threshold"], numpy.zeros(len(leaf_values)))), OperatorCondition.GE,
+                                        numpy.concatenate((children("left_child"), leaves)), numpy.concatenate((children("right_child"), leaves)),
+                                        numpy.concatenate((numpy.zeros(n_decision_nodes), leaf_values)),
+                                        target_class=target_class, id_solver_results=id_solver_results)
+
+
+    def BT_to_arrays(self, BT):
+        """
+        Return, for each tree of the booster, the arrays of its model string (model_to_string()): a dict key -> numpy array of floats
+        (split_feature, threshold, decision_type, left_child, right_child, leaf_value, ...).
+        """
+        model_string = BT.model_to_string()
+        model_string = model_string[:model_string.find("\nend of trees")]
+        trees = []
+        for tree_string in model_string.split("\nTree=")[1:]:
+            tree_arrays = {}
+            for line in tree_string.split("\n")[1:]:
+                key, _, value = line.partition("=")
+                if key in ("num_leaves", "split_feature", "threshold", "decision_type", "left_child", "right_child", "leaf_value", "is_linear"):
+                    tree_arrays[key] = numpy.array(value.split(), dtype=numpy.float64)
+            if len(tree_arrays.get("is_linear", ())) != 0 and tree_arrays["is_linear"][0] != 0:
+                raise NotImplementedError("The linear trees of LightGBM are not implemented.")
+            trees.append(tree_arrays)
+        return trees
 
-    def BT_to_JSON(self, BT):
-        #save_names = BT.feature_name()
-        #BT.feature_name_ = None
-        xgboost_JSON = BT.dump_model()
-        #BT.feature_name_ = save_names
-        return xgboost_JSON
 
     def save_model(self, learner_information, filename):
         #learner_information.raw_model.booster_.save_model(filename + ".model")
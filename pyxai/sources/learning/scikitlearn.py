@@ -6,7 +6,7 @@ from sklearn.ensemble import RandomForestClassifier
 from sklearn.tree import DecisionTreeClassifier, export_text
 from pyxai import Tools
 
-from pyxai.sources.core.structure.decisionTree import DecisionTree, DecisionNode, LeafNode
+from pyxai.sources.core.structure.decisionTree import DecisionTree
 from pyxai.sources.core.structure.randomForest import RandomForest
 from pyxai.sources.learning.learner import Learner, NoneData
 from pyxai.sources.core.structure.type import OperatorCondition, LearnerType, EvaluationOutput
@@ -30,6 +30,9 @@ class Scikitlearn(Learner):
     def get_learner_name():
         return str(Scikitlearn.__name__)
 
+    def thread_options(self, output, n_threads):
+        return {"n_jobs": n_threads} if output == EvaluationOutput.RF else {}  # a decision tree uses only one thread
+
     def fit_and_predict_DT_CLS(self, instances_training, instances_test, labels_training, labels_test, learner_options):
         if "seed" in learner_options.keys():
             learner_options["random_state"] = learner_options["seed"]
@@ -134,21 +137,14 @@ class Scikitlearn(Learner):
         - For us, we take the argmax of the number of trees that predict a class.
         - sklearn does a average of lists of probabilities. 
         However, the predictions are 99% identical.  
+
+        The tree is built from the arrays of sk_raw_tree: its nodes are only created if they are used.
         """
-        nodes = {i: DecisionNode(int(feature + 1), threshold=sk_raw_tree.threshold[i], operator=OperatorCondition.GT, left=None, right=None)
-                 for i, feature in enumerate(sk_raw_tree.feature) if feature >= 0}
-        for i in range(len(sk_raw_tree.feature)):
-            if i in nodes:
-                # Set left and right of each node
-                id_left = sk_raw_tree.children_left[i]
-                id_right = sk_raw_tree.children_right[i]
-
-                nodes[i].left = nodes[id_left] if id_left in nodes else LeafNode(numpy.argmax(sk_raw_tree.value[id_left][0]))
-                nodes[i].right = nodes[id_right] if id_right in nodes else LeafNode(numpy.argmax(sk_raw_tree.value[id_right][0]))
-        
-        root = nodes[0] if 0 in nodes else LeafNode(numpy.argmax(sk_raw_tree.value[0][0]))
-        return DecisionTree(sk_tree.n_features_in_, root, sk_tree.classes_, id_solver_results=id_solver_results,
-                            learner_information=self.learner_information[id_solver_results])
+        leaves = sk_raw_tree.feature < 0
+        return DecisionTree.from_arrays(sk_tree.n_features_in_, sk_raw_tree.feature, sk_raw_tree.threshold, OperatorCondition.GT,
+                                        numpy.where(leaves, -1, sk_raw_tree.children_left), numpy.where(leaves, -1, sk_raw_tree.children_right),
+                                        numpy.argmax(sk_raw_tree.value[:, 0, :], axis=1), target_class=sk_tree.classes_,
+                                        id_solver_results=id_solver_results, learner_information=self.learner_information[id_solver_results])
 
     def save_model(self, learner_information, filename):
         file = open(filename + ".model", 'wb')
@@ -8,7 +8,7 @@ import numpy
 from pyxai import Tools
 from pyxai.sources.core.structure.boostedTrees import BoostedTrees, BoostedTreesRegression
 from pyxai.sources.core.structure.randomForest import RandomForest
-from pyxai.sources.core.structure.decisionTree import DecisionTree, DecisionNode, LeafNode
+from pyxai.sources.core.structure.decisionTree import DecisionTree
 from pyxai.sources.learning.learner import Learner, NoneData
 from pyxai.sources.core.structure.type import OperatorCondition, LearnerType, EvaluationOutput
 
@@ -36,6 +36,9 @@ class Xgboost(Learner):
     def get_learner_name():
         return str(Xgboost.__name__)
 
+    def thread_options(self, output, n_threads):
+        return {"n_jobs": n_threads}
+
     def fit_and_predict_DT_CLS(self, instances_training, instances_test, labels_training, labels_test, learner_options):
         raise NotImplementedError("Decision Tree with classification is not implemented for XGBoost.")
         
@@ -125,50 +128,42 @@ class Xgboost(Learner):
         
     def results_to_trees(self, id_solver_results):
         xgb_BT = self.learner_information[id_solver_results].raw_model.get_booster()
-        xgb_JSON = self.xgboost_BT_to_JSON(xgb_BT)
+        xgb_model = self.xgboost_BT_to_raw_model(xgb_BT)
+        multi_classes = self.learner_type == LearnerType.Classification and self.n_labels > 2  # Special case for a 2-classes prediction !
         decision_trees = []
-        target_class = 0
-        for i, tree_JSON in enumerate(xgb_JSON):
-            #print(tree_JSON)
-            #exit(0)
-            tree_JSON = json.loads(tree_JSON)
-            
-            root = self.recuperate_nodes(tree_JSON)
-            
-            decision_trees.append(DecisionTree(self.n_features, root, target_class=[target_class], id_solver_results=id_solver_results))
-            if self.learner_type == LearnerType.Classification and self.n_labels > 2:  # Special case for a 2-classes prediction !
-                target_class = target_class + 1 if target_class != self.n_labels - 1 else 0
-            
+        for xgb_tree, target_class in zip(xgb_model["trees"], xgb_model["tree_info"]):
+            decision_trees.append(self.raw_tree_to_DT(xgb_tree, [target_class if multi_classes else 0], id_solver_results))
         return decision_trees
 
-    def recuperate_nodes(self, tree_JSON):
-        if "children" in tree_JSON:
-            assert tree_JSON["split"] in self.id_features, "A feature is not correct during the parsing from xgb_JSON to DT !"
-            id_feature = self.id_features[tree_JSON["split"]]
-            threshold = tree_JSON["split_condition"]
-            decision_node = DecisionNode(int(id_feature + 1), operator=OperatorCondition.GE, threshold=threshold, left=None, right=None)
-            id_right = tree_JSON["no"]  # It is the inverse here, right for no, left for yes
-            for child in tree_JSON["children"]:
-                if child["nodeid"] == id_right:
-                    decision_node.right = self.recuperate_nodes(child)
-                else:
-                    decision_node.left = self.recuperate_nodes(child)
-                    
-            return decision_node
-        elif "leaf" in tree_JSON:
-            # Special case when the tree is just a leaf, this append when no split is realized by the solver, but the weight have to be take into account
-            #print("ess1:", tree_JSON["leaf"])
-            #print("ess2:", numpy.float64(tree_JSON["leaf"]))
-            #exit(0)
-            return LeafNode(tree_JSON["leaf"])
-
-
-    def xgboost_BT_to_JSON(self, xgboost_BT):
-        save_names = xgboost_BT.feature_names
-        xgboost_BT.feature_names = None
-        xgboost_JSON = xgboost_BT.get_dump(with_stats=True, dump_format="json")
-        xgboost_BT.feature_names = save_names
-        return xgboost_JSON
+
+    def raw_tree_to_DT(self, xgb_tree, target_class, id_solver_results):
+        """
+        Convert a tree of the raw model: the node i is a leaf if left_children[i] is -1 (its weight is then split_conditions[i]), otherwise
+        it goes to left_children[i] (yes) when the feature split_indices[i] is less than split_conditions[i], and to right_children[i] (no)
+        otherwise. The tree is built from these arrays: its nodes are only created if they are used.
+        """
+        if any(xgb_tree["split_type"]):
+            raise NotImplementedError("The categorical splits of XGBoost are not implemented.")
+        lefts = numpy.asarray(xgb_tree["left_children"], dtype=numpy.int64)
+        features = numpy.asarray(xgb_tree["split_indices"], dtype=numpy.int64)
+        conditions = numpy.asarray(xgb_tree["split_conditions"], dtype=numpy.float64)
+        assert numpy.all(features[lefts != -1] < self.n_features), "A feature is not correct during the parsing from the xgboost model to DT !"
+        # It is the inverse here, right for no, left for yes
+        return DecisionTree.from_arrays(self.n_features, features, conditions, OperatorCondition.GE, lefts, xgb_tree["right_children"], conditions,
+                                        target_class=target_class, id_solver_results=id_solver_results)
+
+
+    def xgboost_BT_to_raw_model(self, xgboost_BT):
+        """
+        Return the trees of the booster and the class of each tree (tree_info), read in its raw model (the JSON format of save_raw(): the
+        nodes of each tree are given by arrays).
+        """
+        gradient_booster = json.loads(xgboost_BT.save_raw(raw_format="json"))["learner"]["gradient_booster"]
+        if gradient_booster["name"] == "dart":
+            gradient_booster = gradient_booster["gbtree"]
+        if gradient_booster["name"] != "gbtree":
+            raise NotImplementedError("The booster " + gradient_booster["name"] + " of XGBoost is not implemented (it has no trees).")
+        return gradient_booster["model"]
 
     def save_model(self, learner_information, filename):
         learner_information.raw_model.save_model(filename + ".model")
@@ -182,39 +177,3 @@ class Xgboost(Learner):
             raise ValueError("learner_type is unknown:", str(self.learner_type))
         learner.load_model(model_file)
         return learner
-
-    def results_to_trees2(self, id_solver_results):
-        dataframe = self.learner_information[id_solver_results].raw_model.get_booster().trees_to_dataframe()
-        n_trees = self.learner_information[id_solver_results].raw_model.n_estimators
-        #print("dataframe:", dataframe)
-        #dataframe.info()
-        #print("n_trees:", n_trees)
-        decision_trees = []
-        target_class = 0
-        for i in range(n_trees) :
-            dataframe_tree = dataframe.loc[dataframe['Tree'] == i]
-            root = self.recuperate_nodes2(dataframe_tree, dataframe_tree.index.values[0])
-            decision_trees.append(DecisionTree(self.n_features, root, target_class=[target_class], id_solver_results=id_solver_results))
-            if self.n_labels > 2:  # Special case for a 2-classes prediction !
-                target_class = target_class + 1 if target_class != self.n_labels - 1 else 0
-        return decision_trees
-
-    def recuperate_nodes2(self, dataframe_tree, id):
-        if dataframe_tree["Feature"][id] == "Leaf":
-            return LeafNode(dataframe_tree["Gain"][id])
-        else:
-            id_feature = self.id_features[dataframe_tree["Feature"][id]]
-            
-            threshold = dataframe_tree["Split"][id]
-            #print("kiki", dataframe_tree["Split"][id].options.display.precision)
-            #exit(0)
-            decision_node = DecisionNode(int(id_feature + 1), threshold=threshold, operator=OperatorCondition.LT, left=None, right=None)
-
-            id_right = dataframe_tree["Yes"][id]
-            id_left = dataframe_tree["No"][id]
-            id_right = dataframe_tree.index[dataframe_tree['ID'] == id_right].tolist()[0]
-            id_left = dataframe_tree.index[dataframe_tree['ID'] == id_left].tolist()[0]
-            
-            decision_node.right = LeafNode(dataframe_tree["Gain"][id_right]) if dataframe_tree["Feature"][id_right] == "Leaf" else self.recuperate_nodes2(dataframe_tree, id_right)
-            decision_node.left = LeafNode(dataframe_tree["Gain"][id_left]) if dataframe_tree["Feature"][id_left] == "Leaf" else self.recuperate_nodes2(dataframe_tree, id_left)
-            return decision_node
\ No newline at end of file
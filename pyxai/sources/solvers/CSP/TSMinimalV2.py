@@ -17,19 +17,41 @@ class TSMinimal():
         return int(weight * pow(10, 9))
 
 
-    def get_leaves(self, trees):
+    @staticmethod
+    def compute_nodes_with_leaves(node, reduced_nodes):
+        # Same as DecisionTree.compute_nodes_with_leaves, the reduced nodes (see BoostedTrees.reduce_trees) being leaves
+        output = []
+        left_is_leaf = node.left.is_leaf() or node.left in reduced_nodes
+        right_is_leaf = node.right.is_leaf() or node.right in reduced_nodes
+        if left_is_leaf or right_is_leaf:
+            output.append(node)
+        if not left_is_leaf:
+            output += TSMinimal.compute_nodes_with_leaves(node.left, reduced_nodes)
+        if not right_is_leaf:
+            output += TSMinimal.compute_nodes_with_leaves(node.right, reduced_nodes)
+        return output
+
+
+    def get_leaves(self, trees, reduced_trees):
         leaves = []
-        for tree in trees:
+        for tree, reduced_nodes in zip(trees, reduced_trees):
             leaves_current_tree = []
-            if tree.is_leaf():
-                leaves_current_tree.append((tree.root, tree.root, self.weight_float_to_int(tree.root.value)))
+
+            def is_leaf(node):
+                return node.is_leaf() or node in reduced_nodes
+
+            def value(node):
+                return self.weight_float_to_int(reduced_nodes[node] if node in reduced_nodes else node.value)
+
+            if is_leaf(tree.root):
+                leaves_current_tree.append((tree.root, tree.root, value(tree.root)))
             else:
-                nodes = tree.compute_nodes_with_leaves(tree.root)
+                nodes = self.compute_nodes_with_leaves(tree.root, reduced_nodes)
                 for node in nodes:
-                    if node.right.is_leaf():
-                        leaves_current_tree.append((node.right, node, self.weight_float_to_int(node.right.value)))
-                    if node.left.is_leaf():
-                        leaves_current_tree.append((node.left, node, self.weight_float_to_int(node.left.value)))
+                    if is_leaf(node.right):
+                        leaves_current_tree.append((node.right, node, value(node.right)))
+                    if is_leaf(node.left):
+                        leaves_current_tree.append((node.left, node, value(node.left)))
             leaves.append(leaves_current_tree)
         return leaves
 
@@ -57,13 +79,13 @@ class TSMinimal():
     def create_model_minimal_abductive_BT(self, implicant, BTs, prediction, n_classes, implicant_id_features, from_reason):
 
         trees = BTs.forest
-        BTs.reduce_trees(implicant, prediction)
+        reduced_trees = BTs.reduce_trees(implicant, prediction)
         idVariableToLiteral = {abs(v): v for v in implicant}
         literalToPosition = {v: i for i, v in enumerate(implicant)}
         nVariables = len(implicant)
         map_id_features = {feature: [i for i, v in enumerate(implicant) if implicant_id_features[i] == feature] for feature in implicant_id_features}
         nTrees = len(trees)
-        leaves = self.get_leaves(trees)
+        leaves = self.get_leaves(trees, reduced_trees)
         data_classes = [tree.target_class for tree in trees]
         specialValues = self.get_special_values(nTrees, leaves, n_classes, prediction, data_classes)
         maxNLeaves = max([len(leaves[i]) for i in range(nTrees)])
@@ -175,9 +197,6 @@ class TSMinimal():
         else:
             minimize(Sum(s))
 
-        # keep trees in initial state
-        BTs.remove_reduce_trees()
-
 
     def solve(self, time_limit=None, upper_bound=-1):
 
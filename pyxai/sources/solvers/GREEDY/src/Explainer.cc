@@ -11,6 +11,9 @@
 #include <random>
 #include <iostream>
 #include <chrono>
+#include <thread>
+#include <atomic>
+#include <mutex>
 #include "Tree.h"
 #include "bcp/ProblemTypes.h"
 
@@ -18,7 +21,113 @@ static bool abs_compare(int a, int b) { return (std::abs(a) < std::abs(b)); }
 
 void pyxai::Explainer::addTree(PyObject *tree_obj) {
     Tree *tree = new Tree(tree_obj, _type);
+    tree->propagator = theory_propagator;
     trees.push_back(tree);
+    clear_workers();
+}
+
+
+void pyxai::Explainer::addTrees(std::vector<Tree *> &new_trees) {
+    for(Tree *tree : new_trees)
+        tree->propagator = theory_propagator;
+    trees.insert(trees.end(), new_trees.begin(), new_trees.end());
+    clear_workers();
+}
+
+
+pyxai::Explainer::~Explainer() {
+    clear_workers();
+    for(Tree *tree : trees)
+        delete tree;
+    delete theory_propagator;
+}
+
+
+void pyxai::Explainer::set_theory(std::vector<std::vector<Lit> > &clauses, unsigned int n_variables) {
+    // The propagator of the previous theory (or the fake one of compute_reason) is replaced, no theory if there is no clause
+    theory_clauses = clauses;
+    theory_n_variables = clauses.empty() ? 0 : n_variables;
+    delete theory_propagator;
+    theory_propagator = nullptr;
+    if(theory_n_variables != 0) {
+        pyxai::Problem problem(clauses, n_variables, std::cout, false);
+        theory_propagator = new pyxai::Propagator(problem, false);
+    }
+    for(pyxai::Tree *t : trees)
+        t->propagator = theory_propagator;
+    clear_workers();
+}
+
+
+pyxai::Explainer *pyxai::Explainer::clone() {
+    Explainer *explainer = new Explainer(n_classes, _type);
+    explainer->n_iterations = n_iterations;
+    explainer->time_limit = time_limit;
+    explainer->lower_bound = lower_bound;
+    explainer->upper_bound = upper_bound;
+    explainer->base_score = base_score;
+    explainer->excluded_features = excluded_features;
+    for(Tree *tree : trees)
+        explainer->trees.push_back(tree->clone());
+    if(theory_n_variables != 0)
+        explainer->set_theory(theory_clauses, theory_n_variables);
+    return explainer;
+}
+
+
+void pyxai::Explainer::clear_workers() {
+    for(Explainer *worker : workers)
+        delete worker;
+    workers.clear();
+}
+
+
+void pyxai::Explainer::compute_reason_batch(std::vector<std::vector<int> > &instances, std::vector<int> &predictions,
+                                            std::vector<int> &excluded_variables, std::vector<std::pair<double, double> > &intervals,
+                                            long seed, unsigned int n_threads,
+                                            std::vector<std::vector<int> > &reasons, std::vector<char> &found, std::string &error) {
+    // intervals (regression) is empty or gives the interval of each instance
+    // Each thread works on its own copy of the trees (their states change during the computation of a reason)
+    n_threads = std::max(1u, std::min(n_threads, (unsigned int)instances.size()));
+    while(workers.size() < n_threads)
+        workers.push_back(clone());
+    std::set<int> excluded(excluded_variables.begin(), excluded_variables.end());
+    reasons.assign(instances.size(), std::vector<int>());
+    found.assign(instances.size(), false); // char and not bool: the threads write in different elements at the same time
+    std::atomic<unsigned int> next(0);
+    std::mutex error_mutex;
+
+    auto run = [&](Explainer *worker) {
+        worker->n_iterations = n_iterations;
+        worker->time_limit = time_limit;
+        worker->lower_bound = lower_bound;
+        worker->upper_bound = upper_bound;
+        worker->base_score = base_score;
+        std::vector<int> reason;
+        for(unsigned int i = next++; i < instances.size(); i = next++) {
+            // The excluded literals are the ones of the instance built on the excluded variables
+            worker->excluded_features.clear();
+            for(int l : instances[i])
+                if(excluded.count(std::abs(l)) != 0)
+                    worker->excluded_features.push_back(l);
+            if(!intervals.empty())
+                worker->set_interval(intervals[i].first, intervals[i].second);
+            try {
+                found[i] = worker->compute_reason_conditions(instances[i], predictions[i], reason, seed);
+                reasons[i] = reason;
+            } catch(std::exception &e) {
+                std::lock_guard<std::mutex> lock(error_mutex);
+                error = e.what();
+            }
+        }
+    };
+
+    std::vector<std::thread> threads;
+    for(unsigned int t = 1; t < n_threads; t++)
+        threads.emplace_back(run, workers[t]);
+    run(workers[0]);
+    for(std::thread &thread : threads)
+        thread.join();
 }
 
 void pyxai::Explainer::initializeBeforeOneRun(std::vector<bool> &polarity_instance, std::vector<bool> &active_lits,
@@ -36,17 +145,24 @@ void pyxai::Explainer::initializeBeforeOneRun(std::vector<bool> &polarity_instan
     }
 }
 
-bool pyxai::Explainer::compute_reason_conditions(std::vector<int> &instance, int prediction, std::vector<int> &reason, long seed) {
+void pyxai::Explainer::restart_propagator() {
     if(theory_propagator == nullptr) {// No theory exists. Create a fake propagator
         theory_propagator = new Propagator();
         for(pyxai::Tree *t : trees)
             t->propagator = theory_propagator;
     }
+    theory_propagator->restart(); // A previous call can stop before restarting it (excluded features that can not be removed)
+}
+
+
+bool pyxai::Explainer::compute_reason_conditions(std::vector<int> &instance, int prediction, std::vector<int> &reason, long seed) {
+    restart_propagator();
 
     int max = abs(*std::max_element(instance.begin(), instance.end(), abs_compare));
     reason.clear();
     int n_current_iterations = 0;
-    pyxai::TimerHelper::initializeTime();
+    // A local clock: several explainers can compute reasons at the same time (see compute_reason_batch)
+    std::chrono::steady_clock::time_point start = std::chrono::steady_clock::now();
     std::vector<bool> polarity_instance(max + 1, true);
     std::vector<bool> active_lits(max + 1, false);
 
@@ -127,7 +243,7 @@ bool pyxai::Explainer::compute_reason_conditions(std::vector<int> &instance, int
         }
         n_current_iterations++;
 
-        if ((time_limit != 0 && pyxai::TimerHelper::realTime() > time_limit)
+        if ((time_limit != 0 && std::chrono::duration<double>(std::chrono::steady_clock::now() - start).count() > time_limit)
             || (time_limit == 0 && n_current_iterations > n_iterations))
             return true;
     }
@@ -277,9 +393,11 @@ bool pyxai::Explainer::compute_reason_features(std::vector<int> &instance, std::
     // TODO CHECK FOR FEATURES : V2......
     if (_type != pyxai::Classifier_BT)
         assert(false);
+    restart_propagator(); // The nodes read the propagator (a clone without theory has none yet)
     int max = abs(*std::max_element(instance.begin(), instance.end(), abs_compare));
     int n_current_iterations = 0;
-    pyxai::TimerHelper::initializeTime();
+    // A local clock, as in compute_reason_conditions: several explainers can compute reasons at the same time
+    std::chrono::steady_clock::time_point start = std::chrono::steady_clock::now();
     std::vector<bool> polarity_instance(max + 1, true);
     std::vector<bool> active_lits(max + 1, false);
 
@@ -313,6 +431,7 @@ bool pyxai::Explainer::compute_reason_features(std::vector<int> &instance, std::
         std::shuffle(std::begin(order), std::end(order), std::default_random_engine());
         for (auto l: instance) active_lits[abs(l)] = true; // Init
         current_size = order.size();
+        initializeBeforeOneRun(polarity_instance, active_lits, prediction);
 
         for (int feature: order) {
             std::vector<int> &lits = features_to_lits[feature];
@@ -341,7 +460,7 @@ bool pyxai::Explainer::compute_reason_features(std::vector<int> &instance, std::
         }
         n_current_iterations++;
 
-        if ((time_limit != 0 && pyxai::TimerHelper::realTime() > time_limit)
+        if ((time_limit != 0 && std::chrono::duration<double>(std::chrono::steady_clock::now() - start).count() > time_limit)
             || (time_limit == 0 && n_current_iterations > n_iterations))
             return true;
     }
@@ -8,6 +8,8 @@
 #include <Python.h>
 #include <vector>
 #include <map>
+#include <string>
+#include <mutex>
 #include<algorithm>
 
 #include "Tree.h"
@@ -28,11 +30,26 @@ namespace pyxai {
         double upper_bound;
         double base_score;
 
+        std::vector<std::vector<Lit> > theory_clauses; // Kept to build the propagators of the workers
+        unsigned int theory_n_variables = 0;
+        std::vector<Explainer *> workers; // Copies of this explainer used by compute_reason_batch (one for each thread)
+        std::mutex mutex; // Locked by the Python wrapper during each call: the wrapper releases the GIL during the computations
+
         Explainer(int _n_classes, Type t) : n_classes(_n_classes), _type(t), n_iterations(50), time_limit(0), base_score(0.5) {}
+        ~Explainer();
 
 
         void addTree(PyObject *tree_obj);
+        void addTrees(std::vector<Tree *> &new_trees);
         std::vector<Tree*> trees;
+        void set_theory(std::vector<std::vector<Lit> > &clauses, unsigned int n_variables);
+        Explainer *clone();
+        void clear_workers();
+        void compute_reason_batch(std::vector<std::vector<int> > &instances, std::vector<int> &predictions,
+                                  std::vector<int> &excluded_variables, std::vector<std::pair<double, double> > &intervals,
+                                  long seed, unsigned int n_threads,
+                                  std::vector<std::vector<int> > &reasons, std::vector<char> &found, std::string &error);
+        void restart_propagator();
         bool compute_reason_conditions(std::vector<int> &instance, int prediction, std::vector<int> &reason, long seed);
         void initializeBeforeOneRun(std::vector<bool> & polarity_instance, std::vector<bool>&active_litd, int prediction);
         void propagateActiveLits( std::vector<int> &order, std::vector<bool> &polarity_instance, std::vector<bool> &active_lits);
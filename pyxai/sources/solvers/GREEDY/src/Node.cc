@@ -102,4 +102,13 @@ double pyxai::Node::extremum_true_branch(bool get_min) {
 int pyxai::Node::nb_nodes() {
     if(is_leaf()) return 1;
     return 1 + true_branch->nb_nodes() + false_branch->nb_nodes();
-}
\ No newline at end of file
+}
+
+pyxai::Node *pyxai::Node::clone(Tree *t) {
+    Node *node = new Node(*this);
+    node->tree = t;
+    if(false_branch != nullptr) node->false_branch = false_branch->clone(t);
+    if(true_branch != nullptr) node->true_branch = true_branch->clone(t);
+    t->all_nodes.push_back(node);
+    return node;
+}
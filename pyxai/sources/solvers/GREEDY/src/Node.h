@@ -61,6 +61,8 @@ namespace pyxai {
 
         int nb_nodes();
 
+        Node *clone(Tree *t); // A deep copy of the node and its children, that belongs to the tree t
+
         // Methods only related to Classifier_BT
         double compute_weight(std::vector<bool> &instance, std::vector<bool> &active_lits, bool get_min);
 
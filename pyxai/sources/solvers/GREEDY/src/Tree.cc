@@ -85,6 +85,27 @@ pyxai::Node *pyxai::Tree::parse_recurrence(PyObject *tree_obj, Type _type) {
 }
 
 
+pyxai::Tree::Tree(Type _t, unsigned int _target_class, long long first, long long last, const long long *lefts, const long long *rights,
+                  const long long *id_binaries, const double *values): _type(_t), target_class(_target_class) {
+    // The children are given by their rows (-1 for a leaf): all the nodes are created, then linked
+    std::vector<Node *> nodes(last - first);
+    for(long long row = first; row < last; row++) {
+        Node *node = _type == Classifier_BT || _type == Regression_BT ? new Node(values[row], this) : new Node((int)values[row], this);
+        if(lefts[row] >= 0)
+            node->lit = (int)id_binaries[row];
+        nodes[row - first] = node;
+        all_nodes.push_back(node);
+    }
+    for(long long row = first; row < last; row++) {
+        if(lefts[row] >= 0) {
+            nodes[row - first]->false_branch = nodes[lefts[row] - first];
+            nodes[row - first]->true_branch = nodes[rights[row] - first];
+        }
+    }
+    root = nodes[0];
+}
+
+
 void pyxai::Tree::initialize_BT(std::vector<bool> &instance, bool get_min) {
     for(Node *n : all_nodes)
         n->artificial_leaf = false;
@@ -113,6 +134,21 @@ bool pyxai::Tree::is_implicant(std::vector<bool> &instance, std::vector<bool> &a
     return true;
 }
 
+pyxai::Tree::~Tree() {
+    for(Node *n : all_nodes)
+        delete n;
+}
+
+
+pyxai::Tree *pyxai::Tree::clone() {
+    Tree *tree = new Tree(_type);
+    tree->n_classes = n_classes;
+    tree->target_class = target_class;
+    tree->root = root->clone(tree);
+    return tree;
+}
+
+
 void pyxai::Tree::display(Type _type) { root->display(_type); std::cout << std::endl;}
 
 int pyxai::Tree::nb_nodes() { return root->nb_nodes();}
@@ -54,6 +54,13 @@ namespace pyxai {
           root = parse(tree_obj, _t);
         }
 
+        // The rows first to last - 1 of a node table (see add_trees in bt_wrapper.cc), the root being the row first
+        Tree(Type _t, unsigned int _target_class, long long first, long long last, const long long *lefts, const long long *rights,
+             const long long *id_binaries, const double *values);
+
+        explicit Tree(Type _t): _type(_t) {}
+        Tree *clone(); // A deep copy of the nodes (without the propagator)
+
         void display(Type _type);
         ~Tree();
         Node* parse(PyObject *tree_obj, Type _type);
@@ -6,6 +6,8 @@
 #define CPP_CODE_BT_WRAPPER_H
 
 #include<Python.h>
+#include <string>
+#include <mutex>
 #include "Node.h"
 #include "Explainer.h"
 
@@ -25,8 +27,13 @@ static PyObject* vectorToTuple_Int(const std::vector<int> &data) {
 }
 
 
+static void delete_explainer(PyObject *capsule) {
+    delete (pyxai::Explainer *) PyCapsule_GetPointer(capsule, NULL);
+}
+
+
 static PyObject *void_to_pyobject(void *ptr) {
-    return PyCapsule_New(ptr, NULL, NULL);
+    return PyCapsule_New(ptr, NULL, delete_explainer);
 }
 
 
@@ -35,6 +42,16 @@ static void *pyobject_to_void(PyObject *obj) {
 }
 
 
+// Lock an explainer without holding the GIL: the thread that holds the lock can be waiting for the GIL.
+static std::unique_lock<std::mutex> lock_explainer(pyxai::Explainer *explainer) {
+    std::unique_lock<std::mutex> lock(explainer->mutex, std::defer_lock);
+    Py_BEGIN_ALLOW_THREADS
+    lock.lock();
+    Py_END_ALLOW_THREADS
+    return lock;
+}
+
+
 PyObject *new_classifier_RF(PyObject *self, PyObject *args) {
     long val;
     if (!PyArg_ParseTuple(args, "L", &val))
@@ -75,8 +92,9 @@ static PyObject *add_tree(PyObject *self, PyObject *args) {
     }
     // Get pointer to the class
     pyxai::Explainer *explainer = (pyxai::Explainer *) pyobject_to_void(class_obj);
+    std::unique_lock<std::mutex> lock = lock_explainer(explainer);
     explainer->addTree(tree_obj);
-    return Py_None;
+    Py_RETURN_NONE;
 }
 
 
@@ -89,8 +107,9 @@ static PyObject *set_base_score(PyObject *self, PyObject *args) {
 
     // Get pointer to the class
     pyxai::Explainer *explainer = (pyxai::Explainer *) pyobject_to_void(class_obj);
+    std::unique_lock<std::mutex> lock = lock_explainer(explainer);
     explainer->base_score = bs;
-    return Py_None;
+    Py_RETURN_NONE;
 }
 
 static PyObject *set_interval(PyObject *self, PyObject *args) {
@@ -103,8 +122,9 @@ static PyObject *set_interval(PyObject *self, PyObject *args) {
 
     // Get pointer to the class
     pyxai::Explainer *explainer = (pyxai::Explainer *) pyobject_to_void(class_obj);
+    std::unique_lock<std::mutex> lock = lock_explainer(explainer);
     explainer->set_interval(lower_bound, upper_bound);
-    return Py_None;
+    Py_RETURN_NONE;
 }
 
 static PyObject *set_excluded(PyObject *self, PyObject *args) {
@@ -119,17 +139,17 @@ static PyObject *set_excluded(PyObject *self, PyObject *args) {
         return NULL;
     }
 
-    pyxai::Explainer *explainer = (pyxai::Explainer *) pyobject_to_void(class_obj);
-    explainer->excluded_features.clear();
-    // Convert the vector of the instance
-
+    std::vector<int> excluded;
     Py_ssize_t size_obj = PyTuple_Size(vector_excluded_obj);
     for(int i = 0; i < size_obj; i++) {
         PyObject *value_obj = PyTuple_GetItem(vector_excluded_obj, i);
-        explainer->excluded_features.push_back(PyLong_AsLong(value_obj));
+        excluded.push_back(PyLong_AsLong(value_obj));
     }
 
-    return Py_None;
+    pyxai::Explainer *explainer = (pyxai::Explainer *) pyobject_to_void(class_obj);
+    std::unique_lock<std::mutex> lock = lock_explainer(explainer);
+    explainer->excluded_features = excluded;
+    Py_RETURN_NONE;
 }
 
 static PyObject *set_theory(PyObject *self, PyObject *args) {
@@ -155,8 +175,10 @@ static PyObject *set_theory(PyObject *self, PyObject *args) {
         std::vector<Lit> c;
         PyObject *value_obj = PyTuple_GetItem(vector_theory, i);
         Py_ssize_t size_obj = PyTuple_Size(value_obj);
-        if (size_obj != 2)
-            throw std::logic_error("The clauses of the theory must be of size 2 (binary).");
+        if (size_obj < 1) {
+            PyErr_Format(PyExc_ValueError, "The clauses of the theory must not be empty !");
+            return NULL;
+        }
         for(int i = 0; i < size_obj; i++) {
             long l = PyLong_AsLong(PyTuple_GetItem(value_obj, i));
             if(max < std::abs(l)) max = std::abs(l);
@@ -164,11 +186,9 @@ static PyObject *set_theory(PyObject *self, PyObject *args) {
         }
         clauses.push_back(c);
     }
-    pyxai::Problem problem(clauses, max, std::cout, false);
-    explainer->theory_propagator = new pyxai::Propagator(problem, false);
-    for(pyxai::Tree *t : explainer->trees)
-        t->propagator = explainer->theory_propagator;
-    return Py_None;
+    std::unique_lock<std::mutex> lock = lock_explainer(explainer);
+    explainer->set_theory(clauses, max);
+    Py_RETURN_NONE;
 }
 
 
@@ -176,12 +196,21 @@ static PyObject *compute_reason(PyObject *self, PyObject *args) {
     PyObject *class_obj;
     PyObject *vector_instance_obj;
     PyObject *vector_features_obj;
+    PyObject *vector_excluded_obj = NULL;
+    PyObject *interval_obj = NULL;
     long prediction;
     long n_iterations;
     long time_limit;
     long features_expressivity;
     long seed;
-    if (!PyArg_ParseTuple(args, "OOOLLLLL", &class_obj, &vector_instance_obj, &vector_features_obj, &prediction, &n_iterations, &time_limit, &features_expressivity, &seed))
+    double lower_bound = 0, upper_bound = 0;
+    if (!PyArg_ParseTuple(args, "OOOLLLLL|OO", &class_obj, &vector_instance_obj, &vector_features_obj, &prediction, &n_iterations, &time_limit, &features_expressivity, &seed, &vector_excluded_obj, &interval_obj))
+        return NULL;
+
+    // The interval (regression) is given with the instance: it is set under the lock of the explainer, with the computation
+    if (interval_obj == Py_None)
+        interval_obj = NULL;
+    if (interval_obj != NULL && !PyArg_ParseTuple(interval_obj, "dd", &lower_bound, &upper_bound))
         return NULL;
 
     if (!PyTuple_Check(vector_instance_obj)) {
@@ -196,9 +225,16 @@ static PyObject *compute_reason(PyObject *self, PyObject *args) {
         return NULL;
     }
 
+    if (vector_excluded_obj != NULL && !PyTuple_Check(vector_excluded_obj)) {
+        PyErr_Format(PyExc_TypeError,
+                     "The last argument must be a tuple representing the excluded features !");
+        return NULL;
+    }
+
     std::vector<int> reason;
     std::vector<int> instance;
     std::vector<int> features;
+    std::vector<int> excluded;
 
     // Convert the vector of the instance 
     Py_ssize_t size_obj = PyTuple_Size(vector_instance_obj);
@@ -214,23 +250,242 @@ static PyObject *compute_reason(PyObject *self, PyObject *args) {
         features.push_back(PyLong_AsLong(value_obj));
     }
 
+    // Convert the excluded features (given with the instance, they do not depend on a previous call to set_excluded)
+    if (vector_excluded_obj != NULL) {
+        size_obj = PyTuple_Size(vector_excluded_obj);
+        for(int i = 0; i < size_obj; i++)
+            excluded.push_back(PyLong_AsLong(PyTuple_GetItem(vector_excluded_obj, i)));
+    }
+
     // Get pointer to the class
     pyxai::Explainer *explainer = (pyxai::Explainer *) pyobject_to_void(class_obj);
-    explainer->set_n_iterations(n_iterations);
-    explainer->set_time_limit(time_limit);
-    bool ret;
-    if (features_expressivity == 1)
-      ret = explainer->compute_reason_features(instance, features, prediction, reason);
-    else
-      ret = explainer->compute_reason_conditions(instance, prediction, reason, seed);
+    bool ret = false;
+    std::string error;
+
+    // The computation only uses the C++ vectors: the GIL is released, the explainer is locked.
+    Py_BEGIN_ALLOW_THREADS
+    {
+        std::lock_guard<std::mutex> lock(explainer->mutex);
+        explainer->set_n_iterations(n_iterations);
+        explainer->set_time_limit(time_limit);
+        if (vector_excluded_obj != NULL)
+            explainer->excluded_features = excluded;
+        if (interval_obj != NULL)
+            explainer->set_interval(lower_bound, upper_bound);
+        try {
+            if (features_expressivity == 1)
+                ret = explainer->compute_reason_features(instance, features, prediction, reason);
+            else
+                ret = explainer->compute_reason_conditions(instance, prediction, reason, seed);
+        } catch(std::exception &e) {
+            error = e.what();
+        }
+    }
+    Py_END_ALLOW_THREADS
 
+    if (!error.empty()) {
+        PyErr_SetString(PyExc_RuntimeError, error.c_str());
+        return NULL;
+    }
     if(ret == false)
-        return Py_None;
+        Py_RETURN_NONE;
 
     return vectorToTuple_Int(reason);
 }
 
 
+static PyObject *clone(PyObject *self, PyObject *args) {
+    PyObject *class_obj;
+    if (!PyArg_ParseTuple(args, "O", &class_obj))
+        return NULL;
+
+    pyxai::Explainer *explainer = (pyxai::Explainer *) pyobject_to_void(class_obj);
+    std::unique_lock<std::mutex> lock = lock_explainer(explainer);
+    return void_to_pyobject(explainer->clone());
+}
+
+
+// Read a C-contiguous buffer of 64 bits integers (a NumPy array of dtype int64), or of 64 bits floats (dtype float64) if floating, with the
+// given number of dimensions.
+static bool get_int64_buffer(PyObject *obj, int ndim, Py_buffer *view, const char *name, bool floating = false) {
+    if (PyObject_GetBuffer(obj, view, PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) != 0)
+        return false;
+    bool ok = view->ndim == ndim && view->itemsize == 8 && view->format != NULL
+              && (floating ? std::string(view->format) == "d" : std::string(view->format) == "l" || std::string(view->format) == "q");
+    if (!ok) {
+        PyBuffer_Release(view);
+        PyErr_Format(PyExc_TypeError, "The %s must be a %d-D C-contiguous buffer of 64 bits %s !", name, ndim, floating ? "floats" : "integers");
+    }
+    return ok;
+}
+
+
+// Add all the trees of a model in one call, from the node table of its compiled forest (see CompiledForest): the rows of the tree i are
+// roots[i] to roots[i + 1] - 1 (the last tree ends with the table), lefts and rights give the rows of the children (-1 for a leaf),
+// id_binaries the variable of each decision node and values the value of each leaf.
+static PyObject *add_trees(PyObject *self, PyObject *args) {
+    PyObject *class_obj;
+    PyObject *objs[6];
+    if (!PyArg_ParseTuple(args, "OOOOOOO", &class_obj, &objs[0], &objs[1], &objs[2], &objs[3], &objs[4], &objs[5]))
+        return NULL;
+
+    const char *names[6] = {"roots", "lefts", "rights", "id_binaries", "values", "target_classes"};
+    Py_buffer views[6];
+    for (int i = 0; i < 6; i++) {
+        if (!get_int64_buffer(objs[i], 1, &views[i], names[i], i == 4)) {
+            for (int j = 0; j < i; j++)
+                PyBuffer_Release(&views[j]);
+            return NULL;
+        }
+    }
+    const long long *roots = (const long long *) views[0].buf, *lefts = (const long long *) views[1].buf;
+    const long long *rights = (const long long *) views[2].buf, *id_binaries = (const long long *) views[3].buf;
+    const double *values = (const double *) views[4].buf;
+    const long long *target_classes = (const long long *) views[5].buf;
+    Py_ssize_t n_trees = views[0].shape[0], n_rows = views[1].shape[0];
+
+    std::string error;
+    if (views[5].shape[0] != n_trees)
+        error = "There must be one target class for each tree !";
+    if (views[2].shape[0] != n_rows || views[3].shape[0] != n_rows || views[4].shape[0] != n_rows)
+        error = "The lefts, rights, id_binaries and values must have one element for each row !";
+    for (Py_ssize_t i = 0; i < n_trees && error.empty(); i++) {
+        long long first = roots[i], last = i + 1 < n_trees ? roots[i + 1] : n_rows;
+        if (first < 0 || first >= last || last > n_rows)
+            error = "The roots must be increasing rows of the table !";
+        for (long long row = first; row < last && error.empty(); row++)
+            if (lefts[row] >= 0 && (lefts[row] <= row || lefts[row] >= last || rights[row] <= row || rights[row] >= last))
+                error = "The children of a node must be rows of its tree after it !";
+    }
+    if (!error.empty()) {
+        for (int i = 0; i < 6; i++)
+            PyBuffer_Release(&views[i]);
+        PyErr_SetString(PyExc_ValueError, error.c_str());
+        return NULL;
+    }
+
+    pyxai::Explainer *explainer = (pyxai::Explainer *) pyobject_to_void(class_obj);
+    std::vector<pyxai::Tree *> trees;
+    Py_BEGIN_ALLOW_THREADS
+    for (Py_ssize_t i = 0; i < n_trees; i++)
+        trees.push_back(new pyxai::Tree(explainer->_type, (unsigned int) target_classes[i], roots[i], i + 1 < n_trees ? roots[i + 1] : n_rows,
+                                        lefts, rights, id_binaries, values));
+    Py_END_ALLOW_THREADS
+    for (int i = 0; i < 6; i++)
+        PyBuffer_Release(&views[i]);
+    std::unique_lock<std::mutex> lock = lock_explainer(explainer);
+    explainer->addTrees(trees);
+    Py_RETURN_NONE;
+}
+
+
+static PyObject *compute_reason_batch(PyObject *self, PyObject *args) {
+    PyObject *class_obj;
+    PyObject *implicants_obj;
+    PyObject *predictions_obj;
+    PyObject *excluded_obj;
+    long n_iterations;
+    long time_limit;
+    long seed;
+    long n_threads;
+    PyObject *intervals_obj = NULL;
+    if (!PyArg_ParseTuple(args, "OOOOLLLL|O", &class_obj, &implicants_obj, &predictions_obj, &excluded_obj, &n_iterations, &time_limit, &seed, &n_threads, &intervals_obj))
+        return NULL;
+    if (intervals_obj == Py_None)
+        intervals_obj = NULL;
+
+    if (!PyTuple_Check(excluded_obj)) {
+        PyErr_Format(PyExc_TypeError, "The fourth argument must be a tuple representing the excluded variables !");
+        return NULL;
+    }
+
+    Py_buffer implicants_view, predictions_view;
+    if (!get_int64_buffer(implicants_obj, 2, &implicants_view, "implicants"))
+        return NULL;
+    if (!get_int64_buffer(predictions_obj, 1, &predictions_view, "predictions")) {
+        PyBuffer_Release(&implicants_view);
+        return NULL;
+    }
+    Py_ssize_t n_rows = implicants_view.shape[0], n_columns = implicants_view.shape[1];
+    if (predictions_view.shape[0] != n_rows) {
+        PyBuffer_Release(&implicants_view);
+        PyBuffer_Release(&predictions_view);
+        PyErr_Format(PyExc_ValueError, "There must be one prediction for each implicant !");
+        return NULL;
+    }
+
+    // Convert the inputs (a zero in an implicant is a missing literal)
+    std::vector<std::vector<int> > instances(n_rows);
+    std::vector<int> predictions(n_rows);
+    const long long *implicants_data = (const long long *) implicants_view.buf;
+    const long long *predictions_data = (const long long *) predictions_view.buf;
+    for (Py_ssize_t i = 0; i < n_rows; i++) {
+        for (Py_ssize_t j = 0; j < n_columns; j++)
+            if (implicants_data[i * n_columns + j] != 0)
+                instances[i].push_back((int) implicants_data[i * n_columns + j]);
+        predictions[i] = (int) predictions_data[i];
+    }
+    PyBuffer_Release(&implicants_view);
+    PyBuffer_Release(&predictions_view);
+
+    // The interval of each instance (regression): a (n_rows, 2) buffer of floats, one line (lower_bound, upper_bound) for each implicant
+    std::vector<std::pair<double, double> > intervals;
+    if (intervals_obj != NULL) {
+        Py_buffer intervals_view;
+        if (!get_int64_buffer(intervals_obj, 2, &intervals_view, "intervals", true))
+            return NULL;
+        if (intervals_view.shape[0] != n_rows || intervals_view.shape[1] != 2) {
+            PyBuffer_Release(&intervals_view);
+            PyErr_Format(PyExc_ValueError, "There must be one interval (lower bound, upper bound) for each implicant !");
+            return NULL;
+        }
+        const double *intervals_data = (const double *) intervals_view.buf;
+        for (Py_ssize_t i = 0; i < n_rows; i++)
+            intervals.push_back(std::make_pair(intervals_data[2 * i], intervals_data[2 * i + 1]));
+        PyBuffer_Release(&intervals_view);
+    }
+
+    std::vector<int> excluded_variables;
+    Py_ssize_t size_obj = PyTuple_Size(excluded_obj);
+    for (int i = 0; i < size_obj; i++)
+        excluded_variables.push_back(PyLong_AsLong(PyTuple_GetItem(excluded_obj, i)));
+
+    pyxai::Explainer *explainer = (pyxai::Explainer *) pyobject_to_void(class_obj);
+    std::vector<std::vector<int> > reasons;
+    std::vector<char> found;
+    std::string error;
+
+    Py_BEGIN_ALLOW_THREADS
+    {
+        std::lock_guard<std::mutex> lock(explainer->mutex);
+        explainer->set_n_iterations(n_iterations);
+        explainer->set_time_limit(time_limit);
+        explainer->compute_reason_batch(instances, predictions, excluded_variables, intervals, seed, n_threads, reasons, found, error);
+    }
+    Py_END_ALLOW_THREADS
+
+    if (!error.empty()) {
+        PyErr_SetString(PyExc_RuntimeError, error.c_str());
+        return NULL;
+    }
+
+    PyObject *result = PyTuple_New(n_rows);
+    if (!result)
+        return NULL;
+    for (Py_ssize_t i = 0; i < n_rows; i++) {
+        PyObject *reason;
+        if (found[i]) {
+            reason = vectorToTuple_Int(reasons[i]);
+        } else {
+            Py_INCREF(Py_None);
+            reason = Py_None;
+        }
+        PyTuple_SET_ITEM(result, i, reason);
+    }
+    return result;
+}
+
+
 // See https://gist.github.com/physacco/2e1b52415f3a964ad2a542a99bebed8f
 
 // Method definition object for this extension, these arguments mean:
@@ -246,9 +501,12 @@ static PyMethodDef module_methods[] = {
         {"new_classifier_RF", new_classifier_RF, METH_VARARGS, "Create a Classifier_RF explainer."},
         {"new_regression_BT", new_regression_BT, METH_VARARGS, "Create a regression BT explainer."},
         {"add_tree",          add_tree,          METH_VARARGS, "Add a tree."},
+        {"add_trees",         add_trees,         METH_VARARGS, "Add the trees of a node table (NumPy arrays)."},
         {"set_excluded",      set_excluded,      METH_VARARGS, "Set excluded features"},
         {"set_theory",        set_theory,        METH_VARARGS, "Set the theory"},
         {"compute_reason",    compute_reason,    METH_VARARGS, "Compute a reason"},
+        {"clone",             clone,             METH_VARARGS, "Copy an explainer (its trees, theory and parameters)"},
+        {"compute_reason_batch", compute_reason_batch, METH_VARARGS, "Compute a reason for each implicant of a batch, with several threads"},
         {"set_interval",      set_interval,      METH_VARARGS, "Set the interval (useful for regression)"},
         {"set_base_score",      set_base_score,  METH_VARARGS, "Set the base score (useful for regression)"},
         {NULL,             NULL,                 0,            NULL}
@@ -1,50 +1,102 @@
 import time
+from threading import Timer
 
 from pysat.examples.rc2 import RC2
 from pysat.pb import *
 
+from pyxai.sources.core.explainer.Explainer import Explainer
+from pyxai.sources.core.structure.literalSet import LiteralSet
 from pyxai.sources.solvers.MAXSAT.MAXSATSolver import MAXSATSolver
 
 
 # from pysat.pb import PBEnc
 
 class RC2MAXSATsolver(MAXSATSolver):
+    """
+    In-process MaxSAT solver based on the RC2 solver of PySAT.
+    The RC2 session is created at the first call to solve() and kept for the next ones: the clauses added afterwards (for example the
+    blocking clauses of an enumeration) are given to this session, that keeps what it has learnt. Such clauses must only use variables
+    already present in the formula before the first call to solve().
+    """
 
     def __init__(self):
         super().__init__()
+        self._rc2 = None
+
+
+    def __del__(self):
+        if self._rc2 is not None:
+            self._rc2.delete()
+
+
+    def add_soft_clause(self, clause, weight):
+        if self._rc2 is not None:
+            assert all(abs(lit) <= self.WCNF.nv for lit in clause), "New variables can not be added once the solver is started."
+            self._rc2.add_clause(clause, weight=weight)
+        super().add_soft_clause(clause, weight)
+
+
+    def add_hard_clause(self, clause):
+        if self._rc2 is not None:
+            assert all(abs(lit) <= self.WCNF.nv for lit in clause), "New variables can not be added once the solver is started."
+            self._rc2.add_clause(clause)
+        super().add_hard_clause(clause)
 
 
     def add_soft_clauses_implicant(self, implicant):
         for lit in implicant:
-            self.WCNF.append([-lit], weight=1)
+            self.add_soft_clause([-lit], weight=1)
 
 
     def add_hard_clauses(self, tree_CNF, implicant=None):
+        if implicant is not None:
+            implicant = LiteralSet.of(implicant)
         for clause in tree_CNF:  # hard
             if implicant is not None:
                 new_clause = [lit for lit in clause if lit in implicant]
                 assert new_clause != [], "This clause cannot be empty"
-                self.WCNF.append(new_clause)
+                self.add_hard_clause(new_clause)
             else:
-                self.WCNF.append(clause)
+                self.add_hard_clause(clause)
 
 
     def add_atmost(self, implicant, sufficient_reason):
-        self.WCNF.extend(
-            PBEnc.atmost(lits=implicant, top_id=self.WCNF.nv + 1, bound=len(sufficient_reason)).clauses)
+        for clause in PBEnc.atmost(lits=implicant, top_id=self.WCNF.nv + 1, bound=len(sufficient_reason)).clauses:
+            self.add_hard_clause(clause)
 
 
     def add_clause(self, clause):
-        self.WCNF.append(clause)
+        self.add_hard_clause(clause)
 
 
     def solve_implicant(self, implicant):
-        result = RC2(self.WCNF).compute()
-        return None if result is None else [lit for lit in result if lit in implicant]
-
-
-    def solve(self, *, time_limit=0):
+        _, model, _ = self.solve()
+        if model is None:
+            return None
+        implicant = LiteralSet.of(implicant)
+        return [lit for lit in model if lit in implicant]
+
+
+    def solve(self, *, time_limit=None):
+        """
+        Return a tuple (status, model, time_used), the model being None if the hard clauses are unsatisfiable. When the time limit (in seconds,
+        None for no limit) is reached, the call is interrupted and the tuple is ("TIMEOUT", None, Explainer.TIMEOUT): the session can be
+        called again.
+        """
         time_used = - time.time()
-        result = RC2(self.WCNF).compute()
+        if self._rc2 is None:
+            self._rc2 = RC2(self.WCNF)
+        if time_limit is None:
+            result = self._rc2.compute()
+        else:
+            if time_limit <= 0:
+                return "TIMEOUT", None, Explainer.TIMEOUT
+            timer = Timer(time_limit, self._rc2.interrupt)
+            timer.start()
+            result = self._rc2.compute(expect_interrupt=True)
+            timer.cancel()
+            if self._rc2.interrupted:
+                self._rc2.clear_interrupt()
+                return "TIMEOUT", None, Explainer.TIMEOUT
         time_used += time.time()
-        return (None, None, None) if result is None else ("OPTIMUM FOUND", [lit for lit in result], time_used)
+        return (None, None, time_used) if result is None else ("OPTIMUM", [lit for lit in result], time_used)
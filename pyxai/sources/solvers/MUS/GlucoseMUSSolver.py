@@ -0,0 +1,72 @@
+import time
+from threading import Timer
+
+from pysat.solvers import Glucose4
+
+from pyxai.sources.core.explainer.Explainer import Explainer
+
+
+class GlucoseMUSSolver:
+    """
+    In-process MUS extraction: a deletion-based algorithm over soft literals, with a single Glucose instance that is called with assumptions
+    (the hard clauses are loaded only once and the learnt clauses are kept from one call to the next).
+    """
+
+    def __init__(self):
+        self.glucose = Glucose4()
+
+
+    def __del__(self):
+        self.glucose.delete()
+
+
+    def add_hard_clauses(self, clauses):
+        self.glucose.append_formula(clauses)
+
+
+    def _solve(self, assumptions, deadline):
+        if deadline is None:
+            return self.glucose.solve(assumptions=assumptions)
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return None
+        timer = Timer(remaining, self.glucose.interrupt)
+        timer.start()
+        result = self.glucose.solve_limited(assumptions=assumptions, expect_interrupt=True)
+        timer.cancel()
+        self.glucose.clear_interrupt()
+        return result
+
+
+    def solve(self, soft_literals, time_limit=None):
+        """
+        Compute a subset of soft_literals that is minimal w.r.t. set inclusion and that is inconsistent with the hard clauses.
+
+        Return a tuple (mus, status, time_used). When the time limit is reached, mus is a subset of soft_literals that is inconsistent with the
+        hard clauses but that is perhaps not minimal, and time_used is Explainer.TIMEOUT. When soft_literals are consistent with the hard
+        clauses, mus is None.
+        """
+        time_used = -time.time()
+        deadline = None if time_limit is None else time.time() + time_limit
+        result = self._solve(list(soft_literals), deadline)
+        if result is True:
+            return None, "SAT", time_used + time.time()
+        if result is None:
+            return list(soft_literals), "TIMEOUT", Explainer.TIMEOUT
+
+        core = set(self.glucose.get_core())
+        candidates = [lit for lit in soft_literals if lit in core]
+        necessary = []
+        while len(candidates) != 0:
+            lit = candidates.pop()
+            result = self._solve(necessary + candidates, deadline)
+            if result is None:
+                return necessary + candidates + [lit], "TIMEOUT", Explainer.TIMEOUT
+            if result is True:
+                # lit is necessary to keep the inconsistency
+                necessary.append(lit)
+            else:
+                # Refine the candidates with the new core
+                core = set(self.glucose.get_core())
+                candidates = [candidate for candidate in candidates if candidate in core]
+        return necessary, "MUS", time_used + time.time()
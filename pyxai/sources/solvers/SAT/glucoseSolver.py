@@ -1,4 +1,6 @@
+import atexit
 import time
+import weakref
 from threading import Timer
 
 from pysat.solvers import Glucose4
@@ -8,25 +10,38 @@ def interrupt(s):
     s.interrupt()
 
 
+# Solvers kept by the explainers: they are deleted before the interpreter tears down the PySAT bindings.
+_living_solvers = weakref.WeakSet()
+
+
+@atexit.register
+def _delete_living_solvers():
+    for solver in list(_living_solvers):
+        solver.glucose.delete()
+
+
 class GlucoseSolver:
 
     def __init__(self):
         self.glucose = Glucose4()
+        _living_solvers.add(self)
 
 
     def add_clauses(self, clauses):
         self.glucose.append_formula(clauses)
 
 
-    def solve(self, time_limit=None):
+    def solve(self, time_limit=None, assumptions=()):
         time_used = -time.time()
 
         if time_limit is not None:
             timer = Timer(time_limit, interrupt, [self.glucose])
             timer.start()
-            result = self.glucose.solve_limited(expect_interrupt=True)
+            result = self.glucose.solve_limited(assumptions=assumptions, expect_interrupt=True)
+            timer.cancel()
+            self.glucose.clear_interrupt()
         else:
-            result = self.glucose.solve()
+            result = self.glucose.solve(assumptions=assumptions)
         time_used += time.time()
         return None if not result else self.glucose.get_model(), time_used
 
@@ -0,0 +1,120 @@
+from pysat.solvers import Glucose4
+
+from pyxai.sources.core.tools.encoding import CNFencoding
+from pyxai.sources.solvers.SAT.glucoseSolver import GlucoseSolver
+
+
+class ImplicantSolver(GlucoseSolver):
+    """
+    A Glucose instance loaded once with a CNF (that does not depend on an instance) in order to compute the implicants of many instances.
+
+    The literals of the binary variables (1 to n_variables) are split in two variables (dual-rail encoding): rail(l) is true when the literal l
+    is used to satisfy the clauses. For an instance, the rails of the literals that are not in its binary representation are switched off by
+    assumptions, so the models give the implicants of the CNF built from the literals of the instance. The blocking clauses of an instance are
+    guarded by a selector, which is deactivated when the next instance is set. These retired clauses (and selectors) stay in the solver: when
+    there are more than MAX_RETIRED_CLAUSES of them, the solver is built again from the CNF.
+
+    When prime is True, the encoding also forces each used literal to be the only used literal of one of the clauses: the implicants are then
+    prime implicants (see Jabbour et al., Enumerating Prime Implicants of Propositional Formulae in Conjunctive Normal Form. JELIA 2014).
+    """
+
+    MAX_RETIRED_CLAUSES = 10000
+
+    def __init__(self, cnf, n_variables, *, prime=False):
+        super().__init__()
+        self.n_variables = n_variables
+        self._cnf = cnf
+        self._prime = prime
+        self._load()
+
+
+    def _load(self):
+        # Variables of the CNF greater than n_variables (auxiliary variables) keep their id, the negative rails come after them.
+        self.offset_negative_rails = max(CNFencoding.compute_max_id_variable(self._cnf), self.n_variables)
+        self.top_id = self.offset_negative_rails + self.n_variables
+        clauses = [[self.rail(lit) for lit in clause] for clause in self._cnf]
+        self.add_clauses(clauses)
+        if self._prime:
+            self._add_minimality(clauses)
+        self._selector = None
+        self._assumptions = []
+        self._binary_representation = ()
+        self._n_clauses_of_instances = 0  # The selectors and blocking clauses added since the solver is loaded
+
+
+    def rail(self, lit):
+        if abs(lit) > self.n_variables:
+            return lit
+        return lit if lit > 0 else self.offset_negative_rails - lit
+
+
+    def _new_variable(self):
+        self.top_id += 1
+        return self.top_id
+
+
+    def _add_minimality(self, clauses):
+        rails = set(range(1, self.n_variables + 1)) | set(range(self.offset_negative_rails + 1, self.offset_negative_rails + self.n_variables + 1))
+        justifications = {rail: [] for rail in rails}
+        justified = set()
+        for clause in clauses:
+            for rail in clause:
+                if rail not in rails or rail in justified:
+                    continue
+                others = [other for other in clause if other != rail]
+                if len(others) == 0:
+                    justified.add(rail)
+                elif len(others) == 1:
+                    justifications[rail].append(-others[0])
+                else:
+                    # new_variable => all the other literals of the clause are not used
+                    new_variable = self._new_variable()
+                    self.add_clauses([[-new_variable, -other] for other in others])
+                    justifications[rail].append(new_variable)
+        self.add_clauses([[-rail] + justifications[rail] for rail in rails if rail not in justified])
+
+
+    def set_instance(self, binary_representation, excluded_literals=()):
+        if self._n_clauses_of_instances > ImplicantSolver.MAX_RETIRED_CLAUSES:
+            # Forget the retired clauses: a new Glucose instance with only the CNF
+            self.glucose.delete()
+            self.glucose = Glucose4()
+            self._load()
+        elif self._selector is not None:
+            self.add_clauses([[-self._selector]])
+        self._selector = self._new_variable()
+        self._n_clauses_of_instances += 1
+        self._binary_representation = binary_representation
+        self._assumptions = [self._selector]
+        self._assumptions += [-self.rail(-lit) for lit in binary_representation if abs(lit) <= self.n_variables]
+        self._assumptions += [-self.rail(lit) for lit in excluded_literals]
+
+
+    def solve(self, time_limit=None):
+        """
+        Return a tuple (model, time_used), model being None if there is no more implicant for the current instance.
+        """
+        return super().solve(time_limit, assumptions=self._assumptions)
+
+
+    def implicant(self, model):
+        """
+        The literals of the binary representation used in the model.
+        """
+        return [lit for lit in self._binary_representation if model[self.rail(lit) - 1] > 0]
+
+
+    def block_model(self, model):
+        """
+        Forbid, for the current instance, the same use of the literals of the binary representation.
+        """
+        self.add_clauses([[-self._selector] + [-model[self.rail(lit) - 1] for lit in self._binary_representation]])
+        self._n_clauses_of_instances += 1
+
+
+    def block_implicant(self, implicant):
+        """
+        Forbid, for the current instance, the implicant and its supersets.
+        """
+        self.add_clauses([[-self._selector] + [-self.rail(lit) for lit in implicant]])
+        self._n_clauses_of_instances += 1
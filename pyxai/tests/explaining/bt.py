@@ -1,5 +1,6 @@
 from pyxai import Builder, Learning, Explainer, Tools
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 
 Tools.set_verbose(0)
 
@@ -24,6 +25,137 @@ class TestBT(unittest.TestCase):
             self.assertTrue(explainer.is_tree_specific_reason(tree_specific_reason))
 
 
+    def test_tree_specific_batch(self):
+        learner, model = self.init()
+        explainer = Explainer.initialize(model, features_type={"numerical": Learning.DEFAULT})
+        explainer.set_excluded_features(['Female'])
+        instances = [instance for instance, prediction in learner.get_instances(model, n=20)]
+        tree_specific_reasons = []
+        for instance in instances:
+            explainer.set_instance(instance)
+            tree_specific_reasons.append(explainer.tree_specific_reason())
+        self.assertEqual(explainer.tree_specific_reason_batch(instances, n_threads=3), tree_specific_reasons)
+        # The excluded features are taken into account when no instance is set
+        other = Explainer.initialize(model, features_type={"numerical": Learning.DEFAULT})
+        other.set_excluded_features(['Female'])
+        self.assertEqual(other.tree_specific_reason_batch(instances, n_threads=3), tree_specific_reasons)
+
+
+    def test_features_expressivity_threads(self):
+        # compute_reason releases the GIL: reasons with ReasonExpressivity.Features and a time limit computed at the same time with
+        # several C++ explainers, each one with its own clock
+        import c_explainer
+        import time
+        from pyxai.sources.core.structure.type import ReasonExpressivity
+        learner, model = self.init()
+        explainer = Explainer.initialize(model)
+        instances = [instance for instance, prediction in learner.get_instances(model, n=4)]
+        explainer.set_instance(instances[0])
+        explainer.tree_specific_reason()  # builds the C++ explainer
+
+        def compute(instance):
+            handle = c_explainer.clone(explainer.c_BT)
+            binary_representation = model.instance_to_binaries(instance)
+            prediction = model.predict_instance(instance)
+            start = time.time()
+            reason = c_explainer.compute_reason(handle, binary_representation, model.get_id_features(binary_representation), prediction, 0,
+                                                1, int(ReasonExpressivity.Features), 0, ())
+            return binary_representation, prediction, reason, time.time() - start
+
+        with ThreadPoolExecutor(max_workers=len(instances)) as executor:
+            results = list(executor.map(compute, instances))
+        for instance, (binary_representation, prediction, reason, duration) in zip(instances, results):
+            self.assertTrue(duration < 10)
+            self.assertTrue(set(reason) <= set(binary_representation))
+            explainer.set_instance(instance)
+            self.assertEqual(explainer.target_prediction, prediction)
+            self.assertTrue(explainer.is_implicant(reason))
+
+        learner, model = self.init()
+        explainer = Explainer.initialize(model, features_type={"numerical": Learning.DEFAULT})
+        clauses = model.theory_clauses()
+        self.assertIs(model.theory_clauses(), clauses)
+        self.assertEqual(list(clauses), model.get_theory(None))
+        explainer_without_theory = Explainer.initialize(model)
+        for instance, prediction in learner.get_instances(model, n=10):
+            explainer.set_instance(instance)
+            reason = explainer.tree_specific_reason()
+            self.assertIs(explainer._c_theory[1], clauses)
+            new_explainer = Explainer.initialize(model, instance, features_type={"numerical": Learning.DEFAULT})
+            self.assertEqual(reason, new_explainer.tree_specific_reason())
+            # The theory is removed from the C++ explainer when it is deactivated
+            explainer.deactivate_theory()
+            explainer_without_theory.set_instance(instance)
+            self.assertEqual(explainer.tree_specific_reason(), explainer_without_theory.tree_specific_reason())
+            explainer.activate_theory()
+        self.assertIs(model.theory_clauses(), clauses)
+
+
+    def test_theory_encodings(self):
+        learner, model = self.init()
+        origins = ["African_American", "Asian", "Hispanic", "Native_American", "Other"]
+        features_type = {"numerical": ["Number_of_Priors"], "categorical": {"Origin*": origins}, "binary": Learning.DEFAULT}
+        encodings = (Explainer.PAIRWISE, Explainer.SEQUENTIAL_COUNTER, Explainer.LADDER, Explainer.BITWISE)
+        explainers = [Explainer.initialize(model, features_type=features_type, theory_encoding=encoding) for encoding in encodings]
+        n_binaries = len(model.map_id_binaries_to_features) - 1
+        one_hot = [id_binary for id_binaries in model.map_categorical_features_one_hot.values() for id_binary in id_binaries]
+        # One clause for each pair of categories, without auxiliary variables
+        pairwise = model.theory_clauses(Explainer.PAIRWISE)
+        self.assertEqual(sum(1 for clause in pairwise if all(-lit in one_hot for lit in clause)), len(one_hot) * (len(one_hot) - 1) // 2)
+        self.assertTrue(all(abs(lit) <= n_binaries for clause in pairwise for lit in clause))
+        # The auxiliary variables are numbered after top_id
+        clauses = model.theory_clauses(Explainer.SEQUENTIAL_COUNTER, top_id=n_binaries + 100)
+        self.assertTrue(all(abs(lit) <= n_binaries or abs(lit) > n_binaries + 100 for clause in clauses for lit in clause))
+        self.assertTrue(any(abs(lit) > n_binaries + 100 for clause in clauses for lit in clause))
+        for instance, prediction in learner.get_instances(model, n=10):
+            results = []
+            for explainer in explainers:
+                explainer.set_instance(instance)
+                reason = explainer.tree_specific_reason(n_iterations=5)
+                results.append((reason, explainer.is_tree_specific_reason(reason), sorted(explainer.extend_reason_with_theory(list(reason)))))
+            for result in results[1:]:
+                self.assertEqual(result, results[0])
+
+
+    def test_weight_bounds(self):
+        learner, model = self.init()
+        explainer = Explainer.initialize(model)
+        fingerprint = model.fingerprint()
+        for instance, prediction in learner.get_instances(model, n=10):
+            explainer.set_instance(instance)
+            reason = explainer.tree_specific_reason()
+            min_weights, max_weights = model.weight_bounds(reason)
+            for tree, min_weight, max_weight in zip(model.forest, min_weights, max_weights):
+                values = tree.compiled_tree.reachable_values(reason)
+                self.assertEqual((min(values), max(values)), (min_weight, max_weight))
+            reduced_trees = model.reduce_trees(explainer.binary_representation, explainer.target_prediction)
+            self.assertEqual(len(reduced_trees), len(model.forest))
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                self.assertTrue(all(executor.map(explainer.is_implicant, [reason] * 8)))
+        self.assertEqual(model.fingerprint(), fingerprint)
+
+
+    def test_tree_specific_threads(self):
+        # Several explainers share the same C++ explainer, the computations are done without the GIL
+        learner, model = self.init()
+        explainer = Explainer.initialize(model)
+        explainer.set_excluded_features(['Female'])
+        instances = [instance for instance, prediction in learner.get_instances(model, n=20)]
+        tree_specific_reasons = []
+        for instance in instances:
+            explainer.set_instance(instance)
+            tree_specific_reasons.append(explainer.tree_specific_reason())
+
+        def compute(instance):
+            other = Explainer.initialize(model, instance)
+            other.set_excluded_features(['Female'])
+            other.c_BT = explainer.c_BT
+            return other.tree_specific_reason()
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            self.assertEqual(list(executor.map(compute, instances)), tree_specific_reasons)
+
+
     def test_excluded(self):
         learner, model = self.init()
         explainer = Explainer.initialize(model)
@@ -26,6 +26,37 @@ class TestDT(unittest.TestCase):
                 self.assertTrue(explainer.is_sufficient_reason(sr))
 
 
+    def test_sufficients_incremental(self):
+        # The solver kept by the explainer gives the same reasons as a new explainer
+        learner, model = self.init()
+        explainer = Explainer.initialize(model)
+        instances = learner.get_instances(model, n=10)
+        for instance, prediction in instances:
+            explainer.set_instance(instance)
+            sufficient_reasons = explainer.sufficient_reason(n=Explainer.ALL)
+            new_explainer = Explainer.initialize(model, instance)
+            self.assertEqual(set(sufficient_reasons), set(new_explainer.sufficient_reason(n=Explainer.ALL)))
+            for sr in sufficient_reasons:
+                self.assertTrue(explainer.is_sufficient_reason(sr))
+
+
+    def test_is_reason_theory(self):
+        # With the theory, the extensions of a reason that are not consistent with the features are not taken into account
+        learner, model = self.init()
+        explainer = Explainer.initialize(model)
+        explainer_theory = Explainer.initialize(model, features_type={"numerical": Learning.DEFAULT})
+        for instance, prediction in learner.get_instances(model, n=10):
+            explainer.set_instance(instance)
+            explainer_theory.set_instance(instance)
+            for sr in explainer.sufficient_reason(n=10):
+                self.assertTrue(explainer_theory.is_reason(sr))
+                for lit in sr:
+                    reason = [other for other in sr if other != lit]
+                    if explainer_theory.is_reason(reason):
+                        self.assertFalse(explainer.is_reason(reason))
+                    self.assertFalse(explainer.is_sufficient_reason(reason))
+
+
     def test_contrastives(self):
         learner, model = self.init()
         explainer = Explainer.initialize(model)
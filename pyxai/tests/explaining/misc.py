@@ -1,5 +1,7 @@
 from pyxai import Builder, Learning, Explainer, Tools
 from pyxai.sources.core.explainer.Explainer import Explainer as exp
+import random
+import tempfile
 import unittest
 
 Tools.set_verbose(0)
@@ -36,5 +38,114 @@ class TestMisc(unittest.TestCase):
         self.assertTrue(exp.format([[1]], n=2) == ((1,),))
 
 
+    def test_explain_batch(self):
+        learner, model = self.init()
+        explainer = Explainer.initialize(model, features_type={"numerical": Learning.DEFAULT})
+        instances = [instance for instance, _ in learner.get_instances(model, n=20)]
+        serial = []
+        for instance in instances:
+            explainer.set_instance(instance)
+            serial.append(explainer.sufficient_reason())
+        history = {key: list(value) for key, value in explainer._history.items()}
+        explainer.set_instance(instances[0])
+        self.assertEqual(list(explainer.explain_batch(instances, method="sufficient_reason", n_jobs=1)), serial)
+        self.assertEqual(list(explainer.explain_batch(instances, method="sufficient_reason", n_jobs=2, chunksize=3)), serial)
+        # The instance and the history of the explainer do not change
+        self.assertEqual(tuple(explainer.instance), tuple(instances[0]))
+        self.assertEqual({key: list(value) for key, value in explainer._history.items()}, history)
+        # The generator can be closed before the end
+        batch = explainer.explain_batch(instances, method="sufficient_reason", n_jobs=2, chunksize=1)
+        self.assertEqual(next(batch), serial[0])
+        batch.close()
+        with self.assertRaises(ValueError):
+            explainer.explain_batch(instances, method="unknown_reason")
+
+
+    def test_incremental_implicant(self):
+        # The incremental check has to give the same answers as is_implicant() (iris: 3 classes)
+        random.seed(0)
+        for library, output in ((Learning.Scikitlearn, Learning.DT), (Learning.Scikitlearn, Learning.RF), (Learning.Xgboost, Learning.BT)):
+            learner = library("tests/iris.csv", learner_type=Learning.CLASSIFICATION)
+            model = learner.evaluate(method=Learning.HOLD_OUT, output=output)
+            explainer = Explainer.initialize(model)
+            for instance, _ in learner.get_instances(model, n=5):
+                explainer.set_instance(instance)
+                binary_representation = list(explainer.binary_representation)
+                incremental_implicant = explainer._incremental_implicant(binary_representation)
+                literals = set(binary_representation)
+                for _ in range(100):
+                    literal = random.choice(binary_representation)
+                    if literal in literals:
+                        incremental_implicant.remove(literal)
+                        literals.remove(literal)
+                    else:
+                        incremental_implicant.add(literal)
+                        literals.add(literal)
+                    self.assertEqual(incremental_implicant.is_implicant(), explainer.is_implicant(tuple(literals)))
+                literals = set(literal for literal in binary_representation if random.random() < 0.8)
+                incremental_implicant.set_literals(literals)
+                self.assertEqual(incremental_implicant.is_implicant(), explainer.is_implicant(tuple(literals)))
+
+
+    def test_cache(self):
+        learner, model = self.init()
+        explainer = Explainer.initialize(model)
+        instances = [instance for instance, _ in learner.get_instances(model, n=20)]
+        expected = []
+        for instance in instances:
+            explainer.set_instance(instance)
+            expected.append((explainer.sufficient_reason(n=3), explainer.minimal_sufficient_reason()))
+
+        with tempfile.TemporaryDirectory() as directory:
+            explainer.activate_cache(maxsize=8, directory=directory)
+            for _ in range(2):
+                for instance, reasons in zip(instances, expected):
+                    explainer.set_instance(instance)
+                    self.assertEqual((explainer.sufficient_reason(n=3), explainer.minimal_sufficient_reason()), reasons)
+            self.assertTrue(explainer.cache.hits >= 2 * len(instances) - 16)
+            self.assertTrue(len(explainer.cache) <= 8)
+
+            # A new explainer finds the explanations in the directory
+            other = Explainer.initialize(model)
+            other.activate_cache(directory=directory)
+            other.set_instance(instances[0])
+            self.assertEqual(other.sufficient_reason(n=3), expected[0][0])
+            self.assertEqual(other.cache.hits, 1)
+            self.assertEqual(other.sufficient_reason(n=2), expected[0][0][:2])
+            self.assertEqual(other.cache.misses, 1)
+        explainer.deactivate_cache()
+        self.assertIsNone(explainer.cache)
+
+
+    def test_cache_instance_dependent(self):
+        # The Shapley weights depend on the values of the instance, not only on its binary representation
+        learner, model = self.init()
+        explainer = Explainer.initialize(model)
+        explainer.activate_cache()
+        for instance, _ in learner.get_instances(model, n=5):
+            explainer.set_instance(instance)
+            binary_representation = explainer.binary_representation
+            explainer.preferred_sufficient_reason(method=Explainer.SHAPLEY)
+            misses = explainer.cache.misses
+            explainer.preferred_sufficient_reason(method=Explainer.SHAPLEY)
+            self.assertEqual(explainer.cache.misses, misses)
+
+            other = instance.copy()
+            other[0] += 1e-9
+            explainer.set_instance(other)
+            if tuple(explainer.binary_representation) != tuple(binary_representation):
+                continue
+            explainer.preferred_sufficient_reason(method=Explainer.SHAPLEY)
+            self.assertEqual(explainer.cache.misses, misses + 1)
+            # The other explanations only depend on the binary representation
+            explainer.set_instance(instance)
+            explainer.sufficient_reason()
+            misses = explainer.cache.misses
+            explainer.set_instance(other)
+            explainer.sufficient_reason()
+            self.assertEqual(explainer.cache.misses, misses)
+        explainer.deactivate_cache()
+
+
 if __name__ == '__main__':
     unittest.main(verbosity=1)
@@ -35,5 +35,58 @@ class TestDT(unittest.TestCase):
             self.assertTrue(explainer.is_reason(sufficient_reason))
         
 
+class TestRegressionBTBuilder(unittest.TestCase):
+
+    def init(self):
+        node1_1 = Builder.DecisionNode(1, operator=Builder.GT, threshold=3000, left=1500, right=1750)
+        node1_2 = Builder.DecisionNode(1, operator=Builder.GT, threshold=2000, left=1000, right=node1_1)
+        node1_3 = Builder.DecisionNode(1, operator=Builder.GT, threshold=1000, left=0, right=node1_2)
+        tree1 = Builder.DecisionTree(5, node1_3)
+        node2_1 = Builder.DecisionNode(5, operator=Builder.EQ, threshold=1, left=100, right=250)
+        node2_2 = Builder.DecisionNode(4, operator=Builder.EQ, threshold=1, left=-100, right=node2_1)
+        node2_3 = Builder.DecisionNode(2, operator=Builder.EQ, threshold=1, left=node2_2, right=250)
+        tree2 = Builder.DecisionTree(5, node2_3)
+        node3_1 = Builder.DecisionNode(3, operator=Builder.EQ, threshold=1, left=500, right=250)
+        node3_2 = Builder.DecisionNode(3, operator=Builder.EQ, threshold=1, left=250, right=100)
+        node3_3 = Builder.DecisionNode(1, operator=Builder.GE, threshold=2000, left=0, right=node3_1)
+        node3_4 = Builder.DecisionNode(4, operator=Builder.EQ, threshold=1, left=node3_3, right=node3_2)
+        tree3 = Builder.DecisionTree(5, node3_4)
+        return Builder.BoostedTreesRegression([tree1, tree2, tree3])
+
+
+    def test_interval_given_with_the_instance(self):
+        import c_explainer
+        explainer = Explainer.initialize(self.init(), (2200, 0, 0, 1, 1))
+        for lower_bound, upper_bound in ((1500, 2500), (1000, 3000), (2000, 2100)):
+            explainer.set_interval(lower_bound, upper_bound)
+            reason = explainer.tree_specific_reason(n_iterations=1, seed=0)
+            self.assertTrue(explainer.is_tree_specific_reason(reason))
+            # An interval set before the computation (by another thread, for instance) is not used
+            c_explainer.set_interval(explainer.c_BT, 0, 0)
+            self.assertEqual(explainer.tree_specific_reason(n_iterations=1, seed=0), reason)
+
+
+    def test_tree_specific_batch(self):
+        model = self.init()
+        instances = [(2200, 0, 0, 1, 1), (3500, 1, 0, 0, 1), (500, 0, 1, 1, 0), (2200, 0, 0, 1, 1)]
+        intervals = [(1500, 2500), (1000, 3000), (-1000, 1000), (2000, 2100)]
+        explainer = Explainer.initialize(model)
+        expected = []
+        for instance, (lower_bound, upper_bound) in zip(instances, intervals):
+            explainer.set_instance(instance)
+            explainer.set_interval(lower_bound, upper_bound)
+            expected.append(explainer.tree_specific_reason(n_iterations=1, seed=0))
+        self.assertEqual(explainer.tree_specific_reason_batch(instances, intervals, n_iterations=1, seed=0, n_threads=2), expected)
+
+        # By default, the interval of an instance is its prediction
+        expected = []
+        for instance in instances:
+            explainer.set_instance(instance)
+            expected.append(explainer.tree_specific_reason(n_iterations=1, seed=0))
+        self.assertEqual(explainer.tree_specific_reason_batch(instances, n_iterations=1, seed=0), expected)
+        self.assertRaises(ValueError, explainer.tree_specific_reason_batch, instances, intervals[:2])
+        self.assertRaises(TypeError, model.predict_proba_batch, instances)
+
+
 if __name__ == '__main__':
     unittest.main(verbosity=2)
@@ -1,4 +1,6 @@
 from pyxai import Builder, Learning, Explainer, Tools
+from pyxai.sources.core.structure.type import Encoding
+import random
 import unittest
 
 Tools.set_verbose(0)
@@ -22,10 +24,29 @@ class TestRF(unittest.TestCase):
         for instance, prediction in instances:
             explainer.set_instance(instance)
             sufficient_reason = explainer.sufficient_reason(time_limit=5)
-            #if explainer.elapsed_time == Explainer.TIMEOUT:
-            #    self.assertTrue(explainer.is_reason(sufficient_reason))
-            #else:
-            #    self.assertTrue(explainer.is_sufficient_reason(sufficient_reason) != False)
+            if explainer.elapsed_time == Explainer.TIMEOUT:
+                self.assertTrue(explainer.is_reason(sufficient_reason))
+            else:
+                self.assertTrue(explainer.is_sufficient_reason(sufficient_reason))
+
+
+    def test_is_reason(self):
+        # The check is exact: when a reason is refused, the model of the solver is a counterexample
+        learner, model = self.init()
+        explainer = Explainer.initialize(model)
+        random.seed(0)
+        for instance, prediction in learner.get_instances(model, n=10):
+            explainer.set_instance(instance)
+            self.assertTrue(explainer.is_reason(explainer.binary_representation))
+            n_variables = len(explainer.binary_representation)
+            for _ in range(10):
+                reason = [lit for lit in explainer.binary_representation if random.random() < 0.5]
+                if explainer.is_reason(reason):
+                    continue
+                solver = explainer._reason_solvers[(explainer.target_prediction, False)]
+                counterexample = solver.solve(assumptions=reason)[0][:n_variables]
+                self.assertTrue(set(reason) <= set(counterexample))
+                self.assertFalse(explainer.is_implicant(counterexample))
 
 
     def test_majoritary(self):
@@ -38,6 +59,31 @@ class TestRF(unittest.TestCase):
             self.assertTrue(explainer.is_majoritary_reason(majoritary_reason))
 
 
+    def test_majoritaries(self):
+        learner, model = self.init()
+        explainer = Explainer.initialize(model)
+        instances = learner.get_instances(model, n=10)
+        for instance, prediction in instances:
+            explainer.set_instance(instance)
+            majoritary_reasons = explainer.majoritary_reason(n=5)
+            self.assertTrue(len(majoritary_reasons) > 0)
+            for majoritary_reason in majoritary_reasons:
+                self.assertTrue(explainer.is_implicant(majoritary_reason))
+        # The solver kept by the explainer is loaded only once for each prediction
+        self.assertTrue(len(explainer._implicant_solvers) <= model.n_classes)
+
+
+    def test_majoritary_batch(self):
+        learner, model = self.init()
+        explainer = Explainer.initialize(model)
+        instances = [instance for instance, prediction in learner.get_instances(model, n=20)]
+        majoritary_reasons = []
+        for instance in instances:
+            explainer.set_instance(instance)
+            majoritary_reasons.append(explainer.majoritary_reason())
+        self.assertEqual(explainer.majoritary_reason_batch(instances, n_threads=3), majoritary_reasons)
+
+
     def test_minimal_majoritary(self):
         learner, model = self.init()
         explainer = Explainer.initialize(model)  # ), features_type={"numerical": Learning.DEFAULT})
@@ -59,6 +105,17 @@ class TestRF(unittest.TestCase):
             self.assertTrue(len(contrastive_reason) == 0 or explainer.is_contrastive_reason(contrastive_reason))
 
 
+    def test_cnf_cache(self):
+        learner, model = self.init()
+        explainer = Explainer.initialize(model)
+        for instance, prediction in learner.get_instances(model, n=10):
+            explainer.set_instance(instance)
+            cnf = model.to_CNF(instance, explainer.binary_representation, explainer.target_prediction, tree_encoding=Encoding.MUS)
+            self.assertIs(cnf, model.to_CNF(instance, explainer.binary_representation, explainer.target_prediction, tree_encoding=Encoding.MUS))
+            model._cnf_cache.clear()
+            self.assertEqual(cnf, model.to_CNF(instance, explainer.binary_representation, explainer.target_prediction, tree_encoding=Encoding.MUS))
+
+
     def test_excluded(self):
         learner, model = self.init()
         explainer = Explainer.initialize(model)
@@ -70,10 +127,9 @@ class TestRF(unittest.TestCase):
             self.assertFalse(explainer.reason_contains_features(sufficient_reason, 'Hispanic'))
             self.assertFalse(explainer.reason_contains_features(sufficient_reason, 'African_American'))
 
-            contrastives_reasons = explainer.minimal_contrastive_reason(time_limit=2)
-            for sr in contrastives_reasons:
-                self.assertFalse(explainer.reason_contains_features(sr, 'Hispanic'))
-                self.assertFalse(explainer.reason_contains_features(sr, 'African_American'))
+            contrastive_reason = explainer.minimal_contrastive_reason(time_limit=2)
+            self.assertFalse(explainer.reason_contains_features(contrastive_reason, 'Hispanic'))
+            self.assertFalse(explainer.reason_contains_features(contrastive_reason, 'African_American'))
 
         explainer.set_excluded_features(['Female'])
         for instance, prediction in instances:
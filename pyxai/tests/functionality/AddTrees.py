@@ -0,0 +1,48 @@
+from pyxai import Explainer, Learning, Tools
+import c_explainer
+import numpy
+import unittest
+
+Tools.set_verbose(0)
+
+
+class TestAddTrees(unittest.TestCase):
+
+    def test_same_reasons(self):
+        for learner, output in ((Learning.Scikitlearn, Learning.RF), (Learning.Xgboost, Learning.BT)):
+            learner = learner("tests/iris.csv", learner_type=Learning.CLASSIFICATION)
+            model = learner.evaluate(method=Learning.HOLD_OUT, output=output, n_estimators=10)
+            for instance, _ in learner.get_instances(model, n=10):
+                explainer = Explainer.initialize(model, instance)
+                tuples_explainer = Explainer.initialize(model, instance)
+                # The trees given one by one as nested tuples
+                if output == Learning.RF:
+                    tuples_explainer.c_RF = c_explainer.new_classifier_RF(model.n_classes)
+                    for tree in model.forest:
+                        c_explainer.add_tree(tuples_explainer.c_RF, tree.raw_data_for_CPP())
+                    self.assertEqual(explainer.majoritary_reason(n_iterations=5, seed=1),
+                                     tuples_explainer.majoritary_reason(n_iterations=5, seed=1))
+                else:
+                    tuples_explainer.c_BT = c_explainer.new_classifier_BT(model.n_classes)
+                    for tree in model.forest:
+                        c_explainer.add_tree(tuples_explainer.c_BT, tree.raw_data_for_CPP())
+                    self.assertEqual(explainer.tree_specific_reason(n_iterations=5, seed=1),
+                                     tuples_explainer.tree_specific_reason(n_iterations=5, seed=1))
+
+
+    def test_wrong_arrays(self):
+        handle = c_explainer.new_classifier_RF(2)
+        rows = numpy.zeros(3, dtype=numpy.int64)
+        with self.assertRaises(ValueError):
+            c_explainer.add_trees(handle, numpy.array([0]), numpy.array([5, -1, -1]), numpy.array([2, -1, -1]), rows, numpy.zeros(3),
+                                  numpy.array([0]))
+        with self.assertRaises(ValueError):
+            c_explainer.add_trees(handle, numpy.array([0, 1]), numpy.array([1, -1, -1]), numpy.array([2, -1, -1]), rows, numpy.zeros(3),
+                                  numpy.array([0]))
+        with self.assertRaises(TypeError):
+            c_explainer.add_trees(handle, numpy.array([0]), numpy.array([1, -1, -1]), numpy.array([2, -1, -1]), rows, rows, numpy.array([0]))
+
+
+if __name__ == '__main__':
+    print("Tests: " + TestAddTrees.__name__ + ":")
+    unittest.main()
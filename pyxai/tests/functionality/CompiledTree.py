@@ -0,0 +1,133 @@
+from pyxai import Builder, Learning, Tools
+from pyxai.sources.core.structure.compiledTree import CompiledTree, LEAF
+import numpy
+import random
+import unittest
+
+Tools.set_verbose(0)
+
+
+class TestCompiledTree(unittest.TestCase):
+
+    def test_builder(self):
+        node_1 = Builder.DecisionNode(1, operator=Builder.LT, threshold=2, left=0, right=1)
+        node_2 = Builder.DecisionNode(2, operator=Builder.EQ, threshold=1, left=node_1, right=0)
+        tree = Builder.DecisionTree(2, node_2)
+        self.assertEqual(tree.compiled_tree.n_nodes, 5)
+        self.assertEqual(tree.predict_instance([1, 0]), 1)
+        self.assertEqual(tree.predict_instance([3, 0]), 0)
+        self.assertEqual(tree.predict_instance([1, 1]), 0)
+        self.assertTrue(tree.is_implicant((-1, 2), 1))
+        self.assertFalse(tree.is_implicant((-1,), 1))
+        self.assertEqual(tree.get_reachable_classes((1,), 1), {0})
+        self.assertEqual(tree.get_reachable_classes((-1,), 1), {0, 1})
+        self.assertEqual(Builder.DecisionTree(1, Builder.LeafNode(1)).predict_instance([5]), 1)
+
+
+    def test_set_root(self):
+        node_1 = Builder.DecisionNode(1, operator=Builder.LT, threshold=2, left=0, right=1)
+        node_2 = Builder.DecisionNode(2, operator=Builder.EQ, threshold=1, left=node_1, right=0)
+        tree = Builder.DecisionTree(2, node_2)
+        fingerprint = tree.fingerprint()
+        self.assertEqual(tree.to_CNF((1, 2), 0), ((1, -2),))
+        tree.root = node_1  # the compiled tree, the CNF and the fingerprint are the ones of the new nodes
+        self.assertEqual(tree.compiled_tree.n_nodes, 3)
+        self.assertEqual(tree.nodes, [node_1])
+        self.assertIsNone(node_1.parent)
+        self.assertEqual(tree.predict_instance([1, 1]), 1)
+        self.assertTrue(tree.is_implicant((2,), 1))
+        self.assertNotEqual(tree.fingerprint(), fingerprint)
+        self.assertEqual(tree.to_CNF((1, 2), 0), ((-2,),))
+
+
+    def test_same_as_nodes(self):
+        learner = Learning.Scikitlearn("tests/compas.csv", learner_type=Learning.CLASSIFICATION)
+        model = learner.evaluate(method=Learning.HOLD_OUT, output=Learning.RF, n_estimators=10)
+        map_features_to_id_binaries = model.map_features_to_id_binaries
+        for instance, _ in learner.get_instances(model, n=20):
+            binary_representation = model.instance_to_binaries(instance)
+            partial = [literal for literal in binary_representation if random.random() < 0.5]
+            for tree in model.forest:
+                self.assertEqual(tree.predict_instance(instance), tree.root.take_decisions_instance(instance))
+                self.assertEqual(tree.take_decisions_binary_representation(binary_representation),
+                                 tree.root.take_decisions_binary_representation(binary_representation, map_features_to_id_binaries))
+                for target_prediction in (0, 1):
+                    self.assertEqual(tree.is_implicant(partial, target_prediction),
+                                     tree.root.is_implicant(partial, target_prediction, map_features_to_id_binaries))
+
+
+    def test_from_arrays(self):
+        learner = Learning.Scikitlearn("tests/compas.csv", learner_type=Learning.CLASSIFICATION)
+        model = learner.evaluate(method=Learning.HOLD_OUT, output=Learning.RF, n_estimators=10)
+        instances = [instance for instance, _ in learner.get_instances(model, n=20)]
+        predictions = [model.predict_instance(instance) for instance in instances]
+        for tree in model.forest:
+            self.assertIsNone(tree._root)  # the nodes are not created by the conversion
+            compiled_tree = tree.compiled_tree
+            nodes_compiled_tree = CompiledTree(tree.root, tree.get_id_variable)
+            self.assertEqual(len(tree.nodes), int(numpy.count_nonzero(compiled_tree.features != LEAF)))
+            for column in ("features", "thresholds", "operators", "lefts", "rights", "values", "id_binaries"):
+                self.assertTrue(numpy.array_equal(getattr(compiled_tree, column), getattr(nodes_compiled_tree, column), equal_nan=True))
+            tree.compile()
+        self.assertEqual([model.predict_instance(instance) for instance in instances], predictions)
+
+        # The rows can be in any order (the root being the row 0), and the tree can be a leaf
+        tree = Builder.DecisionTree.from_arrays(2, [1, -1, 0, -1, -1], [2.5, 0, 0.5, 0, 0], Builder.GT, [2, -1, 3, -1, -1], [1, -1, 4, -1, -1],
+                                                [0, 1, 0, 0, 1])
+        self.assertEqual([tree.predict_instance(instance) for instance in ([0, 3], [0, 2], [1, 2])], [1, 0, 1])
+        self.assertEqual(tree.compiled_tree.lefts.tolist(), [1, 2, -1, -1, -1])
+        self.assertEqual(str(tree.root.left), str(Builder.DecisionNode(1, operator=Builder.GT, threshold=0.5, left=0, right=1)))
+        self.assertEqual(Builder.DecisionTree.from_arrays(1, [-1], [0], Builder.GT, [-1], [-1], [1]).predict_instance([5]), 1)
+
+
+    def test_predict_batch(self):
+        for learner, output in ((Learning.Scikitlearn("tests/iris.csv", learner_type=Learning.CLASSIFICATION), Learning.RF),
+                                (Learning.Xgboost("tests/iris.csv", learner_type=Learning.CLASSIFICATION), Learning.BT),
+                                (Learning.Xgboost("tests/compas.csv", learner_type=Learning.CLASSIFICATION), Learning.BT)):
+            model = learner.evaluate(method=Learning.HOLD_OUT, output=output)
+            instances = learner.data
+            predictions = [model.predict_instance(instance) for instance in instances]
+            self.assertEqual(list(model.predict_batch(instances)), predictions)
+            self.assertEqual(list(numpy.argmax(model.predict_proba_batch(instances), axis=1)), predictions)
+            if output == Learning.BT:
+                self.assertTrue(numpy.allclose(model.predict_proba_batch(instances[:10]),
+                                               [model.compute_probabilities_instance(instance) for instance in instances[:10]]))
+            with self.assertRaises(ValueError):
+                model.predict_batch(instances[0])
+
+
+    def test_instances_to_binaries(self):
+        node = Builder.DecisionNode(1, operator=Builder.GE, threshold=0.5, left=0, right=1)
+        for i, operator in enumerate([Builder.GE, Builder.GT, Builder.LE, Builder.LT, Builder.EQ, Builder.NEQ] * 2):
+            node = Builder.DecisionNode(1 + i % 2, operator=operator, threshold=float(i % 4), left=node, right=i % 2)
+        tree = Builder.DecisionTree(2, node)
+        instances = [[v1, v2] for v1 in (-1, 0, 0.5, 1, 3, 4) for v2 in (0, 1.5, 2, 3)]
+        signs = tree.instances_to_binaries(instances)
+        self.assertEqual(signs.shape, (len(instances), len(tree.map_id_binaries_to_features) - 1))
+        for instance, instance_signs in zip(instances, signs):
+            binary_representation = tree.instance_to_binaries(instance)
+            self.assertEqual(binary_representation, tuple(int(sign) * (i + 1) for i, sign in enumerate(instance_signs)))
+            for literal in binary_representation:
+                id_feature, operator, threshold = tree.map_id_binaries_to_features[abs(literal)]
+                satisfied = Builder.DecisionTree(2, Builder.DecisionNode(id_feature, operator=operator, threshold=threshold, left=0, right=1)).predict_instance(instance)
+                self.assertEqual(literal > 0, satisfied == 1)
+        partial = tree.instance_to_binaries([None, 2])
+        self.assertTrue(all(tree.map_id_binaries_to_features[abs(literal)][0] == 2 for literal in partial))
+
+        # The binarizer follows the content of map_features_to_id_binaries, not the identity of the dict
+        binarizer = tree._get_binarizer()
+        tree.map_features_to_id_binaries = dict(tree.map_features_to_id_binaries)
+        self.assertIs(tree._get_binarizer(), binarizer)
+        condition_1, condition_2 = list(tree.map_features_to_id_binaries.keys())[:2]
+        values_1, values_2 = tree.map_features_to_id_binaries[condition_1], tree.map_features_to_id_binaries[condition_2]
+        values_1[0], values_2[0] = values_2[0], values_1[0]  # Same number of conditions, other id_binaries
+        for instance, instance_signs in zip(instances, signs):
+            expected = [int(sign) * (i + 1) for i, sign in enumerate(instance_signs)]
+            expected[values_1[0] - 1], expected[values_2[0] - 1] = (int(instance_signs[values_2[0] - 1]) * values_1[0],
+                                                                    int(instance_signs[values_1[0] - 1]) * values_2[0])
+            self.assertEqual(tree.instance_to_binaries(instance), tuple(expected))
+            self.assertEqual(list(tree.instances_to_binaries([instance])[0]), [numpy.sign(lit) for lit in expected])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=1)
@@ -9,6 +9,8 @@ import random
 import functools
 import operator
 import copy
+import tempfile
+from pyxai.sources.learning.dataset_reader import DatasetReader
 
 Tools.set_verbose(0)
 
@@ -93,6 +95,76 @@ class TestGetInstances(unittest.TestCase):
                     self.assertEqual(true_instance[j][k],instance[j][k])
                 
 
+    def test_get_instances_streaming(self):
+        # Reading the dataset file by blocks (with or without cache) gives the same instances as the loaded dataset
+        dataset = "tests/compas.csv"
+        learner = Learning.Scikitlearn(dataset, learner_type=Learning.CLASSIFICATION)
+        model = learner.evaluate(method=Learning.HOLD_OUT, output=Learning.DT)
+        chunk_size = DatasetReader.CHUNK_SIZE
+        DatasetReader.CHUNK_SIZE = 100
+        try:
+            with tempfile.TemporaryDirectory() as cache_directory:
+                for cache in (None, cache_directory, cache_directory):
+                    for options in (dict(n=10), dict(n=10, seed=3), dict(n=20, indexes=Learning.TEST, seed=2), dict(n=30, correct=False),
+                                    dict(n=5, predictions=[1], seed=4)):
+                        expected = learner.get_instances(model, details=True, **options)
+                        data = learner.data
+                        learner.data = None
+                        instances = learner.get_instances(model, dataset=dataset, details=True, cache_directory=cache, **options)
+                        learner.data = data
+                        self.assertEqual([details["index"] for details in expected], [details["index"] for details in instances])
+                        for details, expected_details in zip(instances, expected):
+                            self.assertEqual(list(details["instance"]), list(expected_details["instance"]))
+                            self.assertEqual(details["prediction"], expected_details["prediction"])
+        finally:
+            DatasetReader.CHUNK_SIZE = chunk_size
+
+
+    def test_get_instances_one_pass(self):
+        # With shuffled rows and no index to select, the dataset file is read once, and its labels are encoded only once
+        dataset = "tests/compas.csv"
+        learner = Learning.Scikitlearn(dataset, learner_type=Learning.CLASSIFICATION)
+        model = learner.evaluate(method=Learning.HOLD_OUT, output=Learning.DT)
+        expected = learner.get_instances(model, n=50, seed=3, correct=False, details=True)
+        learner.data = None
+        blocks = DatasetReader.blocks
+        n_passes = []
+
+        def counted_blocks(reader):
+            n_passes.append(1)
+            yield from blocks(reader)
+
+        DatasetReader.blocks = counted_blocks
+        try:
+            for _ in range(2):
+                instances = learner.get_instances(model, dataset=dataset, n=50, seed=3, correct=False, details=True)
+                self.assertEqual([details["index"] for details in instances], [details["index"] for details in expected])
+                self.assertEqual(len(n_passes), 1)
+                n_passes.clear()
+            dict_labels = learner.dict_labels
+            learner.get_instances(model, dataset=dataset, n=5)
+            self.assertIs(learner.dict_labels, dict_labels)
+        finally:
+            DatasetReader.blocks = blocks
+
+        reader = DatasetReader(dataset)
+        self.assertTrue(reader.read_rows([50, 3, 50]).equals(pandas.read_csv(dataset).iloc[[50, 3, 50]].reset_index(drop=True)))
+
+
+    def test_get_instances_batches(self):
+        # The predictions done by batches select the same instances as the predictions done one instance at a time
+        learner = Learning.Scikitlearn("tests/compas.csv", learner_type=Learning.CLASSIFICATION)
+        model = learner.evaluate(method=Learning.HOLD_OUT, output=Learning.RF, n_estimators=10)
+        for options in (dict(n=50, correct=False), dict(n=50, correct=True, seed=1), dict(n=20, predictions=[0]), dict(correct=False, indexes=Learning.TEST)):
+            expected = learner.get_instances(model, details=True, batch_size=1, **options)
+            instances = learner.get_instances(model, details=True, batch_size=64, **options)
+            self.assertEqual([(details["index"], details["prediction"]) for details in expected],
+                             [(details["index"], details["prediction"]) for details in instances])
+            for details in instances:
+                if options.get("correct") is not None:
+                    self.assertEqual(details["prediction"] == details["label"], options["correct"])
+
+
     def do_import(self, dataset, learner_type):
         data, labels, feature_names = self.load_dataset(dataset, learner_type)
         results = self.cross_validation(data, labels, learner_type, n_trees=5)
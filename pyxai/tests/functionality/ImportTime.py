@@ -0,0 +1,49 @@
+import os
+import subprocess
+import sys
+import unittest
+
+import pyxai
+
+
+class TestImportTime(unittest.TestCase):
+    # Modules only needed by some methods (preferred reasons, CSP/MIP solvers, C++ explainer, visualization)
+    LAZY_MODULES = ("matplotlib", "shap", "wordfreq", "sklearn.metrics", "pycsp3", "ortools", "docplex", "c_explainer")
+
+
+    def run_python(self, code):
+        # A new interpreter, in order to not see the modules already imported by the other tests.
+        pyxai_parent = os.path.dirname(os.path.dirname(os.path.abspath(pyxai.__file__)))
+        environment = dict(os.environ)
+        environment["PYTHONPATH"] = os.pathsep.join([pyxai_parent] + [p for p in [environment.get("PYTHONPATH")] if p])
+        process = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=environment)
+        self.assertEqual(process.returncode, 0, process.stderr)
+        return process.stdout.split()
+
+
+    def test_lazy_imports(self):
+        code = "import sys, time\n" \
+               "start = time.perf_counter()\n" \
+               "from pyxai import Explainer, Builder, Tools\n" \
+               "print(time.perf_counter() - start)\n" \
+               "print(*[module for module in " + repr(self.LAZY_MODULES) + " if module in sys.modules])"
+        output = self.run_python(code)
+        import_time, loaded = float(output[0]), output[1:]
+        self.assertEqual(loaded, [])
+        self.assertLess(import_time, 2)
+
+
+    def test_loaded_on_first_use(self):
+        code = "import sys\n" \
+               "from pyxai import Explainer\n" \
+               "from pyxai.sources.core.tools.utils import compute_weight\n" \
+               "from pyxai.sources.core.structure.type import PreferredReasonMethod\n" \
+               "class LearnerInformation: feature_names = ['house', 'car']\n" \
+               "print(*compute_weight(PreferredReasonMethod.WordFrequency, None, None, LearnerInformation()))\n" \
+               "print('wordfreq' in sys.modules)"
+        output = self.run_python(code)
+        self.assertEqual(output[-1], "True")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=1)
@@ -0,0 +1,49 @@
+from pyxai.sources.core.structure.literalSet import LiteralSet
+import pickle
+import random
+import unittest
+
+
+class TestLiteralSet(unittest.TestCase):
+
+    def test_literals(self):
+        literals = LiteralSet((3, -1, 5))
+        self.assertEqual(tuple(literals), (3, -1, 5))
+        self.assertEqual(len(literals), 3)
+        self.assertTrue(-1 in literals)
+        self.assertFalse(1 in literals)
+        self.assertFalse(8 in literals)
+        self.assertEqual(literals.index(5), 2)
+        self.assertEqual(literals.literal(1), -1)
+        self.assertEqual(literals.sign(4), 0)
+        self.assertRaises(ValueError, literals.index, 4)
+
+        literals.add(-3)  # replaces 3 at the same position
+        literals.add(12)
+        self.assertEqual(tuple(literals), (-3, -1, 5, 12))
+        literals.remove(-1)
+        literals.discard(7)
+        self.assertEqual(tuple(literals), (-3, 5, 12))
+        self.assertRaises(KeyError, literals.remove, 3)
+        self.assertEqual(tuple(pickle.loads(pickle.dumps(literals))), (-3, 5, 12))
+        self.assertEqual(tuple(-literals), (3, -5, -12))
+        self.assertEqual(list(literals.signs_of([0, 3, 5, 40])), [0, -1, 1, 0])
+
+
+    def test_same_as_sets(self):
+        random.seed(0)
+        for _ in range(100):
+            first = [random.choice([1, -1]) * id_variable for id_variable in random.sample(range(1, 30), 10)]
+            second = [random.choice([1, -1]) * id_variable for id_variable in random.sample(range(1, 40), 10)]
+            self.assertEqual(set(LiteralSet(first) & LiteralSet(second)), set(first) & set(second))
+            self.assertEqual(set(LiteralSet(first) - second), set(first) - set(second))
+            self.assertEqual(LiteralSet(first) <= LiteralSet(second), set(first) <= set(second))
+            if any(-literal in second for literal in first):
+                self.assertRaises(ValueError, LiteralSet(first).union, second)
+            else:
+                self.assertEqual(set(LiteralSet(first) | second), set(first) | set(second))
+            self.assertEqual(tuple(LiteralSet(first) - second), tuple(literal for literal in first if literal not in second))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,54 @@
+from pyxai import Explainer, Learning, Tools
+from pyxai.sources.core.structure.sharedModel import SharedModel
+import numpy
+import pickle
+import unittest
+
+Tools.set_verbose(0)
+
+
+class TestSharedModel(unittest.TestCase):
+
+    def test_same_model(self):
+        for learner, output in ((Learning.Scikitlearn, Learning.RF), (Learning.Xgboost, Learning.BT)):
+            learner = learner("tests/iris.csv", learner_type=Learning.CLASSIFICATION)
+            model = learner.evaluate(method=Learning.HOLD_OUT, output=output, n_estimators=10)
+            shared_model = SharedModel(model)
+            try:
+                shared = shared_model.model(model.learner_information)
+                self.assertEqual(model.fingerprint(), shared.fingerprint())
+                self.assertTrue(numpy.shares_memory(shared.forest[0].compiled_tree.features, shared_model.arrays["features"]))
+                instances = numpy.asarray([instance for instance, _ in learner.get_instances(model, n=20)])
+                self.assertTrue(numpy.array_equal(model.predict_batch(instances), shared.predict_batch(instances)))
+                for level, shared_level in zip(model.compiled_forest.levels, shared.compiled_forest.levels):
+                    self.assertTrue(numpy.array_equal(level, shared_level))
+                for instance in instances:
+                    self.assertEqual(model.predict_instance(instance), shared.predict_instance(instance))
+                    implicant = model.instance_to_binaries(instance)
+                    self.assertEqual(model.compiled_forest.weight_bounds(implicant)[0].tolist(),
+                                     shared.compiled_forest.weight_bounds(implicant)[0].tolist())
+            finally:
+                shared_model.unlink()
+
+
+    def test_pickle(self):
+        learner = Learning.Scikitlearn("tests/iris.csv", learner_type=Learning.CLASSIFICATION)
+        model = learner.evaluate(method=Learning.HOLD_OUT, output=Learning.RF, n_estimators=10)
+        shared_model = SharedModel(model)
+        try:
+            shared = shared_model.model(model.learner_information)
+            instances = [instance for instance, _ in learner.get_instances(model, n=5)]
+            explainer = Explainer.initialize(shared, instances[0])
+            # The node tables are not pickled: only the name of the block
+            self.assertLess(len(pickle.dumps(explainer)), len(pickle.dumps(Explainer.initialize(model, instances[0]))))
+            copy = pickle.loads(pickle.dumps(explainer))
+            self.assertIs(copy._random_forest.forest[0].compiled_tree._shared[0], shared_model)
+            self.assertEqual(list(explainer.explain_batch(instances, method="majoritary_reason", n_jobs=2)),
+                             [Explainer.initialize(model, instance).majoritary_reason() for instance in instances])
+        finally:
+            shared_model.unlink()
+
+
+if __name__ == '__main__':
+    print("Tests: " + TestSharedModel.__name__ + ":")
+    unittest.main()
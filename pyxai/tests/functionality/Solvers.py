@@ -0,0 +1,109 @@
+from pyxai.sources.core.explainer.Explainer import Explainer
+from pyxai.sources.solvers.MAXSAT.RC2solver import RC2MAXSATsolver
+from pyxai.sources.solvers.MUS.GlucoseMUSSolver import GlucoseMUSSolver
+from pyxai.sources.solvers.SAT.implicantSolver import ImplicantSolver
+from pysat.solvers import Glucose4
+import time
+import unittest
+
+
+def pigeon_hole(n):
+    """
+    Clauses putting n + 1 pigeons in n holes: (each pigeon in a hole, at most one pigeon per hole, number of variables).
+    """
+    var = lambda pigeon, hole: pigeon * n + hole + 1
+    at_least = [[var(pigeon, hole) for hole in range(n)] for pigeon in range(n + 1)]
+    at_most = [[-var(p, hole), -var(q, hole)] for hole in range(n) for p in range(n + 1) for q in range(p + 1, n + 1)]
+    return at_least, at_most, (n + 1) * n
+
+
+class TestSolvers(unittest.TestCase):
+
+    def test_mus_minimal(self):
+        hard_clauses = [[-1, -2], [-2, -3], [-1, 3], [-4, 5], [-5, -6], [-4, 6]]
+        soft_literals = [1, 2, 3, 4, 5, 7]
+        solver = GlucoseMUSSolver()
+        solver.add_hard_clauses(hard_clauses)
+        mus, status, time_used = solver.solve(soft_literals)
+        self.assertEqual(status, "MUS")
+        self.assertTrue(set(mus) <= set(soft_literals))
+        with Glucose4(bootstrap_with=hard_clauses) as glucose:
+            self.assertFalse(glucose.solve(assumptions=mus))
+            for lit in mus:
+                self.assertTrue(glucose.solve(assumptions=[other for other in mus if other != lit]))
+
+        # The solver is reused from one call to the next
+        mus, status, time_used = solver.solve([2, 5, 7])
+        self.assertIsNone(mus)
+        self.assertEqual(status, "SAT")
+
+
+    def test_mus_timeout(self):
+        at_least, at_most, n_variables = pigeon_hole(11)
+        selector = n_variables + 1
+        solver = GlucoseMUSSolver()
+        solver.add_hard_clauses([clause + [-selector] for clause in at_least] + at_most)
+        start = time.time()
+        mus, status, time_used = solver.solve([selector], time_limit=0.2)
+        self.assertLess(time.time() - start, 5)
+        self.assertEqual(status, "TIMEOUT")
+        self.assertEqual(time_used, Explainer.TIMEOUT)
+        self.assertEqual(mus, [selector])
+
+
+    def test_maxsat_optimum(self):
+        solver = RC2MAXSATsolver()
+        solver.add_hard_clauses([[-1, -2], [-2, -3]])
+        solver.add_soft_clause([1], weight=1)
+        solver.add_soft_clause([2], weight=3)
+        solver.add_soft_clause([3], weight=1)
+        status, model, time_used = solver.solve(time_limit=10)
+        self.assertEqual(status, "OPTIMUM")
+        self.assertEqual(model[:3], [-1, 2, -3])
+        self.assertNotEqual(time_used, Explainer.TIMEOUT)
+
+
+    def test_maxsat_timeout(self):
+        at_least, at_most, _ = pigeon_hole(11)
+        solver = RC2MAXSATsolver()
+        solver.add_hard_clauses(at_most)
+        for clause in at_least:
+            solver.add_soft_clause(clause, weight=1)
+        start = time.time()
+        self.assertEqual(solver.solve(time_limit=0.2), ("TIMEOUT", None, Explainer.TIMEOUT))
+        self.assertLess(time.time() - start, 5)
+        self.assertEqual(solver.solve(time_limit=0), ("TIMEOUT", None, Explainer.TIMEOUT))
+
+
+    def test_implicant_solver_reloaded(self):
+        # The retired clauses of the previous instances are forgotten by building the solver again, with the same implicants
+        def implicants(solver, binary_representation):
+            solver.set_instance(binary_representation)
+            result = []
+            while True:
+                model, _ = solver.solve()
+                if model is None:
+                    return sorted(result)
+                result.append(sorted(solver.implicant(model)))
+                solver.block_implicant(result[-1])
+
+        cnf = [[1, 2], [-3, 4], [2, -4, 5]]
+        instances = [(1, 2, 3, 4, 5), (1, -2, -3, 4, 5), (-1, 2, 3, 4, -5), (1, 2, -3, -4, 5)]
+        max_retired_clauses = ImplicantSolver.MAX_RETIRED_CLAUSES
+        ImplicantSolver.MAX_RETIRED_CLAUSES = 5
+        try:
+            solver = ImplicantSolver(cnf, 5, prime=True)
+            glucoses = []  # References kept: the ids of the Glucose instances can not be reused
+            for _ in range(5):
+                for instance in instances:
+                    if solver.glucose not in glucoses:
+                        glucoses.append(solver.glucose)
+                    self.assertEqual(implicants(solver, instance), implicants(ImplicantSolver(cnf, 5, prime=True), instance))
+            self.assertTrue(len(glucoses) > 1)
+            self.assertTrue(solver.top_id < ImplicantSolver(cnf, 5, prime=True).top_id + 20)
+        finally:
+            ImplicantSolver.MAX_RETIRED_CLAUSES = max_retired_clauses
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=3)
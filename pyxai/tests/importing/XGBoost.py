@@ -28,6 +28,23 @@ class TestImportXGBoost(unittest.TestCase):
         self.do_import("tests/winequality-red.csv", Learning.REGRESSION)
 
 
+    def test_import_BT_thresholds(self):
+        # Instances with a feature equal to a threshold of the model: they have to go to the same leaves as in XGBoost
+        data, labels, feature_names = self.load_dataset("tests/iris.csv", Learning.CLASSIFICATION)
+        xgb_model = xgboost.XGBClassifier(n_estimators=20, max_depth=4).fit(data, labels)
+        learner, model = Learning.import_models(xgb_model)
+        self.assertEqual(len(model.forest), 20 * 3)
+        instances = []
+        for tree in model.forest:
+            for id_feature, _, threshold in tree.map_features_to_id_binaries.keys():
+                instance = numpy.array(data[len(instances) % len(data)], dtype=float)
+                instance[id_feature - 1] = threshold
+                instances.append(instance)
+        predictions = xgb_model.predict(numpy.array(instances))
+        for instance, prediction in zip(instances, predictions):
+            self.assertEqual(prediction, model.predict_instance(instance))
+
+
     def do_import(self, dataset, learner_type):
         data, labels, feature_names = self.load_dataset(dataset, learner_type)
         results = self.cross_validation(data, labels, learner_type, n_trees=5)
@@ -42,6 +42,22 @@ class TestLearningScikitlearn(unittest.TestCase):
             self.assertEqual(model.raw_model.get_params()["random_state"], 0)
 
 
+    def test_evaluate_n_jobs(self):
+        for method in (Learning.K_FOLDS, Learning.LEAVE_ONE_GROUP_OUT):
+            learner = Learning.Scikitlearn("tests/iris.csv", learner_type=Learning.CLASSIFICATION)
+            models = learner.evaluate(method=method, output=Learning.RF, n_estimators=10, max_depth=4)
+            learner_parallel = Learning.Scikitlearn("tests/iris.csv", learner_type=Learning.CLASSIFICATION)
+            models_parallel = learner_parallel.evaluate(method=method, output=Learning.RF, n_jobs=2, n_estimators=10, max_depth=4)
+            self.assertEqual(len(models), len(models_parallel))
+            for model, model_parallel in zip(models, models_parallel):
+                self.assertEqual(model.learner_information.metrics, model_parallel.learner_information.metrics)
+                self.assertEqual(list(model.learner_information.test_index), list(model_parallel.learner_information.test_index))
+                self.assertEqual(model_parallel.raw_model.get_params()["random_state"], 0)
+                self.assertIn(model_parallel.learner_information, learner_parallel.learner_information)
+                for instance in learner.data[:20]:
+                    self.assertEqual(model.predict_instance(instance), model_parallel.predict_instance(instance))
+
+
     def test_prediction_dermatology(self):
         self.prediction(Learning.Scikitlearn("tests/dermatology.csv", learner_type=Learning.CLASSIFICATION))
 
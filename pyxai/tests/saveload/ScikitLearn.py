@@ -54,6 +54,21 @@ class TestSaveLoadScikitlearn(unittest.TestCase):
         self.launch_load("tests/iris.csv")
         shutil.rmtree("try_save")
 
+    def test_native_RF(self):
+        learner = Learning.Scikitlearn("tests/iris.csv", learner_type=Learning.CLASSIFICATION)
+        models = learner.evaluate(method=Learning.K_FOLDS, output=Learning.RF)
+        learner.save(models, "try_save", native=True)
+        learner, loaded_models = Learning.load(models_directory="try_save", dataset="tests/iris.csv")
+        for model, loaded_model in zip(models, loaded_models):
+            self.assertEqual(model.fingerprint(), loaded_model.fingerprint())
+            self.assertEqual(model.map_id_binaries_to_features, loaded_model.map_id_binaries_to_features)
+            self.assertIsNone(loaded_model.raw_model)
+            for (instance, prediction) in learner.get_instances(model=loaded_model, n=10, indexes=Learning.TEST):
+                self.assertEqual(model.predict_instance(instance), prediction)
+                self.assertEqual(loaded_model.predict_instance(instance), prediction)
+                self.assertEqual(loaded_model.predict_implicant(model.instance_to_binaries(instance)), prediction)
+        shutil.rmtree("try_save")
+
     def launch_save(self, dataset, method, output):
         learner = Learning.Scikitlearn(dataset, learner_type=Learning.CLASSIFICATION)
         models = learner.evaluate(method=method, output=output, test_size=0.2)
@@ -6,6 +6,12 @@ import platform
 
 from pyxai.tests.functionality.GetInstances import *
 from pyxai.tests.functionality.ToFeatures import *
+from pyxai.tests.functionality.CompiledTree import *
+from pyxai.tests.functionality.ImportTime import *
+from pyxai.tests.functionality.LiteralSet import *
+from pyxai.tests.functionality.SharedModel import *
+from pyxai.tests.functionality.AddTrees import *
+from pyxai.tests.functionality.Solvers import *
 from pyxai.tests.learning.ScikitLearn import *
 from pyxai.tests.learning.LightGBM import *
 from pyxai.tests.learning.XGBoost import *
@@ -26,6 +32,12 @@ def linux_tests():
     suite = unittest.TestSuite()
     suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestToFeatures))
     suite.addTest(unittest.makeSuite(TestGetInstances))
+    suite.addTest(unittest.makeSuite(TestCompiledTree))
+    suite.addTest(unittest.makeSuite(TestImportTime))
+    suite.addTest(unittest.makeSuite(TestLiteralSet))
+    suite.addTest(unittest.makeSuite(TestSharedModel))
+    suite.addTest(unittest.makeSuite(TestAddTrees))
+    suite.addTest(unittest.makeSuite(TestSolvers))
     
     suite.addTest(unittest.makeSuite(TestLearningScikitlearn))
     suite.addTest(unittest.makeSuite(TestLearningXGBoost))
@@ -42,6 +54,7 @@ def linux_tests():
     suite.addTest(unittest.makeSuite(TestDT))
     suite.addTest(unittest.makeSuite(TestRF))
     suite.addTest(unittest.makeSuite(TestBT))
+    suite.addTest(unittest.makeSuite(TestRegressionBTBuilder))
     return suite
 
 def windows_tests():